@@ -1,6 +1,13 @@
 import os
+import time
 from flask import Flask
-from app.db import init_db
+from app.db import db, init_db
+from app.metrics import init_metrics
+from app.cache import init_cache
+from app.aggregates import init_aggregates
+from app.search import init_search
+from app.admission import init_admission
+from app.group_commit import init_group_commit
 from app.routes import bp as api_bp
 from app.config import Config
 from app.logger import logger
@@ -11,6 +18,7 @@ from app.logger import logger
 
 def create_app(config_class=Config):
     """Create and configure the Flask application"""
+    started = time.perf_counter()
     app = Flask(__name__)
     app.config.from_object(config_class)
     
@@ -20,8 +28,16 @@ def create_app(config_class=Config):
     except OSError:
         pass
     
-    # Initialize extensions
-    init_db(app)
+    # Initialize extensions, timing each step for the startup report
+    timings = {}
+    for name, init in (('init_db', init_db), ('init_search', init_search), ('init_aggregates', init_aggregates),
+                       ('init_cache', init_cache), ('init_admission', init_admission),
+                       ('init_group_commit', init_group_commit)):
+        step = time.perf_counter()
+        init(app)
+        timings[name] = time.perf_counter() - step
+    with app.app_context():
+        init_metrics(app, db.engine)
     
     # Register blueprints
     app.register_blueprint(api_bp, url_prefix='/api')
@@ -31,7 +47,11 @@ def create_app(config_class=Config):
     def health_check():
         return {'status': 'healthy', 'service': 'BMS API'}
     
+    timings['total'] = time.perf_counter() - started
+    app.extensions['startup_timings'] = timings
+
     # Log application startup
-    logger.info("application_started", config=app.config.get('ENV', 'development'))
+    logger.info("application_started", config=app.config.get('ENV', 'development'),
+                startup_ms=round(timings['total'] * 1000, 1))
     
     return app
\ No newline at end of file
@@ -0,0 +1,191 @@
+import math
+import threading
+import time
+from collections import OrderedDict
+from typing import Callable, Optional, Tuple
+from flask import current_app, g, jsonify, request
+from app.config import Config
+from app.logger import logger
+
+WRITE_METHODS = frozenset({'POST', 'PUT', 'PATCH', 'DELETE'})
+
+# Never shed, so probes and metric scrapes still answer while the API is overloaded
+EXEMPT_ENDPOINTS = frozenset({'api.health_check', 'api.metrics'})
+
+
+class RateLimiter:
+    """Per-client token buckets: `rate` requests per second, bursts of up to `burst`.
+
+    Only the `max_clients` most recently seen clients keep a bucket; a
+    client whose bucket was dropped starts again with a full one.
+    """
+
+    def __init__(self, rate: float, burst: int, max_clients: int = 10000,
+                 clock: Callable[[], float] = time.monotonic):
+        self.rate = rate
+        self.burst = max(burst, 1)
+        self.max_clients = max_clients
+        self._clock = clock
+        self._buckets = OrderedDict()  # client -> (tokens, last refill)
+        self._lock = threading.Lock()
+
+    def acquire(self, client: str) -> float:
+        """Take a token for `client`: 0.0 when granted, else seconds until one is available"""
+        now = self._clock()
+        with self._lock:
+            tokens, stamp = self._buckets.pop(client, (self.burst, now))
+            tokens = min(self.burst, tokens + (now - stamp) * self.rate)
+            if tokens >= 1:
+                tokens -= 1
+                wait = 0.0
+            else:
+                wait = (1 - tokens) / self.rate
+            self._buckets[client] = (tokens, now)
+            if len(self._buckets) > self.max_clients:
+                self._buckets.popitem(last=False)
+        return wait
+
+
+class ConcurrencyLimiter:
+    """At most `limit` holders at once (0 = unlimited).
+
+    When all slots are taken, up to `queue_size` callers wait at most
+    `timeout` seconds for one; anyone beyond that is refused immediately.
+    Arrivals queue behind existing waiters rather than overtaking them.
+    """
+
+    def __init__(self, limit: int, queue_size: int, timeout: float):
+        self.limit = limit
+        self.queue_size = queue_size
+        self.timeout = timeout
+        self.in_flight = 0
+        self.waiting = 0
+        self._cond = threading.Condition()
+
+    def acquire(self) -> Optional[str]:
+        """None once a slot is held, else the reason it was refused ('queue_full' or 'queue_timeout')"""
+        with self._cond:
+            if self.limit <= 0 or (self.in_flight < self.limit and not self.waiting):
+                self.in_flight += 1
+                return None
+            if self.waiting >= self.queue_size:
+                return 'queue_full'
+            self.waiting += 1
+            try:
+                if not self._cond.wait_for(lambda: self.in_flight < self.limit, self.timeout):
+                    return 'queue_timeout'
+            finally:
+                self.waiting -= 1
+            self.in_flight += 1
+            return None
+
+    def release(self) -> None:
+        with self._cond:
+            self.in_flight -= 1
+            self._cond.notify()
+
+
+class AdmissionController:
+    """Decides whether an API request runs now, waits briefly, or is turned away.
+
+    Each client first spends a token from its bucket (429 when empty), then
+    takes a read or write slot. Writes get their own, smaller cap because
+    SQLite serialises them anyway: extra concurrent writers only wait on the
+    database lock while holding a thread. Requests that find no slot and no
+    room in the short wait queue get a 503 straight away.
+    """
+
+    def __init__(self, rate: float = 0.0, burst: int = 1, max_reads: int = 0, max_writes: int = 0,
+                 queue_size: int = 0, queue_timeout: float = 0.0, retry_after: int = 1,
+                 max_clients: int = 10000):
+        self.rate_limiter = RateLimiter(rate, burst, max_clients) if rate > 0 else None
+        self.reads = ConcurrencyLimiter(max_reads, queue_size, queue_timeout)
+        self.writes = ConcurrencyLimiter(max_writes, queue_size, queue_timeout)
+        self.retry_after = retry_after
+        self._lock = threading.Lock()
+        self._counts = {'admitted': 0, 'rate_limited': 0, 'queue_full': 0, 'queue_timeout': 0}
+
+    def admit(self, client: str, write: bool) -> Optional[Tuple[int, int, str]]:
+        """None once a slot is held (give it back with `release`), else (status, Retry-After seconds, reason)"""
+        if self.rate_limiter is not None:
+            wait = self.rate_limiter.acquire(client)
+            if wait > 0:
+                self._count('rate_limited')
+                return 429, max(1, math.ceil(wait)), 'rate_limited'
+        reason = (self.writes if write else self.reads).acquire()
+        if reason is not None:
+            self._count(reason)
+            return 503, self.retry_after, reason
+        self._count('admitted')
+        return None
+
+    def release(self, write: bool) -> None:
+        (self.writes if write else self.reads).release()
+
+    def _count(self, key: str) -> None:
+        with self._lock:
+            self._counts[key] += 1
+
+    def stats(self) -> dict:
+        """In-flight and waiting requests per kind, plus admitted and rejected counts"""
+        with self._lock:
+            counts = dict(self._counts)
+        counts.update(reads_in_flight=self.reads.in_flight, writes_in_flight=self.writes.in_flight,
+                      reads_waiting=self.reads.waiting, writes_waiting=self.writes.waiting)
+        counts['rejected'] = counts['rate_limited'] + counts['queue_full'] + counts['queue_timeout']
+        return counts
+
+
+def init_admission(app):
+    """Attach an admission controller to the Flask app unless ADMISSION_ENABLED is off"""
+    def setting(key):
+        return app.config.get(key, getattr(Config, key))
+
+    if not setting('ADMISSION_ENABLED'):
+        app.extensions['admission'] = None
+        return
+    app.extensions['admission'] = AdmissionController(
+        rate=float(setting('RATE_LIMIT_PER_SECOND')),
+        burst=int(setting('RATE_LIMIT_BURST')),
+        max_reads=int(setting('MAX_CONCURRENT_READS')),
+        max_writes=int(setting('MAX_CONCURRENT_WRITES')),
+        queue_size=int(setting('ADMISSION_QUEUE_SIZE')),
+        queue_timeout=float(setting('ADMISSION_QUEUE_TIMEOUT')),
+        retry_after=int(setting('ADMISSION_RETRY_AFTER')),
+    )
+
+def get_admission() -> Optional[AdmissionController]:
+    """The current app's admission controller, or None when disabled or outside an app context"""
+    try:
+        return current_app.extensions.get('admission')
+    except RuntimeError:
+        return None
+
+def _client_key() -> str:
+    """ADMISSION_CLIENT_HEADER (e.g. an API key header) when set and sent, else the remote address"""
+    header = current_app.config.get('ADMISSION_CLIENT_HEADER', Config.ADMISSION_CLIENT_HEADER)
+    return (header and request.headers.get(header)) or request.remote_addr or 'unknown'
+
+def admit_request():
+    """before_request hook: hold a read or write slot for the request, or answer 429/503"""
+    controller = get_admission()
+    if controller is None or request.endpoint in EXEMPT_ENDPOINTS:
+        return None
+    write = request.method in WRITE_METHODS
+    client = _client_key()
+    rejection = controller.admit(client, write)
+    if rejection is None:
+        g._admission = write
+        return None
+    status, retry_after, reason = rejection
+    logger.info("request_rejected", reason=reason, client=client, method=request.method, path=request.path)
+    message = 'Rate limit exceeded' if status == 429 else 'Server busy, try again later'
+    return jsonify({'error': message}), status, {'Retry-After': str(retry_after)}
+
+def release_request(exc=None):
+    """teardown_request hook: give back the slot taken by `admit_request`"""
+    if '_admission' in g:
+        write = g.pop('_admission')
+        controller = get_admission()
+        if controller is not None:
+            controller.release(write)
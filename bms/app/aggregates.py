@@ -0,0 +1,182 @@
+from datetime import datetime
+from typing import Dict, Iterable, List, Tuple
+import click
+from flask import current_app
+from sqlalchemy import Float, delete, func, select, type_coerce
+from sqlalchemy.dialects.postgresql import insert as postgresql_insert
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+from app.config import Config
+from app.db import db, retry_on_lock
+from app.logger import logger
+from app.models import Account, AccountAggregate
+
+# (bucket_size, bucket) of the all-accounts row
+GLOBAL_KEY = (0, 0)
+
+# Balance totals closer than this are considered equal when reconciling
+_TOLERANCE = 0.005
+
+
+def _bucket_size() -> int:
+    """BATCH_SIZE from the Flask app config when available, else from Config"""
+    try:
+        return int(current_app.config.get('BATCH_SIZE', Config.BATCH_SIZE))
+    except RuntimeError:
+        return int(Config.BATCH_SIZE)
+
+def balance_delta_upsert(deltas: Iterable[Tuple[int, int, float]], dialect: str):
+    """(upsert statement, parameter rows) folding the deltas in, or None when nothing changes"""
+    bucket_size = _bucket_size()
+    totals: Dict[Tuple[int, int], List] = {}
+    for account_id, count, balance in deltas:
+        for key in (GLOBAL_KEY, (bucket_size, (account_id - 1) // bucket_size)):
+            entry = totals.setdefault(key, [0, 0.0])
+            entry[0] += count
+            entry[1] += balance
+
+    now = datetime.utcnow()
+    rows = [{'bucket_size': size, 'bucket': bucket, 'account_count': count,
+             'balance_total': round(total, 2), 'updated_at': now}
+            for (size, bucket), (count, total) in totals.items() if count or round(total, 2)]
+    if not rows:
+        return None
+
+    table = AccountAggregate.__table__
+    stmt = (postgresql_insert if dialect == 'postgresql' else sqlite_insert)(table)
+    stmt = stmt.on_conflict_do_update(
+        index_elements=[table.c.bucket_size, table.c.bucket],
+        set_={'account_count': table.c.account_count + stmt.excluded.account_count,
+              'balance_total': func.round(table.c.balance_total + stmt.excluded.balance_total, 2),
+              'updated_at': stmt.excluded.updated_at})
+    return stmt, rows
+
+def apply_balance_deltas(deltas: Iterable[Tuple[int, int, float]]) -> None:
+    """Fold (account_id, count_delta, balance_delta) changes into the aggregates.
+
+    Executes one upsert in the caller's transaction, so the aggregates commit
+    or roll back together with the change they describe.
+    """
+    upsert = balance_delta_upsert(deltas, db.session.get_bind().dialect.name)
+    if upsert is not None:
+        db.session.execute(*upsert)
+
+def summary_select():
+    table = AccountAggregate.__table__
+    return (select(table.c.account_count, type_coerce(table.c.balance_total, Float))
+            .where(table.c.bucket_size == GLOBAL_KEY[0], table.c.bucket == GLOBAL_KEY[1]))
+
+def summary_dict(row) -> dict:
+    count, total = row if row is not None else (0, 0.0)
+    return {'accounts': count, 'total_balance': round(total, 2), 'bucket_size': _bucket_size()}
+
+def get_summary() -> dict:
+    """Account count and balance total over all accounts, from the aggregate table"""
+    return summary_dict(db.session.execute(summary_select()).first())
+
+def bucket_totals_select(after: int = -1, limit: int = 100):
+    table = AccountAggregate.__table__
+    return (select(table.c.bucket, table.c.account_count, type_coerce(table.c.balance_total, Float))
+            .where(table.c.bucket_size == _bucket_size(), table.c.bucket > after, table.c.account_count > 0)
+            .order_by(table.c.bucket)
+            .limit(limit))
+
+def bucket_totals(rows) -> List[dict]:
+    bucket_size = _bucket_size()
+    return [{'bucket': bucket,
+             'first_id': bucket * bucket_size + 1,
+             'last_id': (bucket + 1) * bucket_size,
+             'accounts': count,
+             'total_balance': round(total, 2)}
+            for bucket, count, total in rows]
+
+def list_bucket_totals(after: int = -1, limit: int = 100) -> List[dict]:
+    """One page of per-bucket totals for the current bucket size, in bucket order"""
+    return bucket_totals(db.session.execute(bucket_totals_select(after, limit)))
+
+def _actual_aggregates(bucket_size: int) -> Dict[Tuple[int, int], Tuple[int, float]]:
+    bucket = (Account.id - 1) // bucket_size
+    stmt = (select(bucket, func.count(Account.id), type_coerce(func.sum(Account.balance), Float))
+            .group_by(bucket))
+    actual = {}
+    count_all, total_all = 0, 0.0
+    for num, count, total in db.session.execute(stmt):
+        actual[(bucket_size, num)] = (count, round(total or 0.0, 2))
+        count_all += count
+        total_all += total or 0.0
+    actual[GLOBAL_KEY] = (count_all, round(total_all, 2))
+    return actual
+
+@retry_on_lock
+def reconcile_aggregates(fix: bool = True) -> dict:
+    """Recompute the aggregates from the accounts table and report drift.
+
+    With `fix`, the table is rebuilt from the recomputed values in the same
+    transaction, which also drops rows left over from an older BATCH_SIZE.
+    """
+    bucket_size = _bucket_size()
+    table = AccountAggregate.__table__
+    stored = {(size, bucket): (count, round(total, 2))
+              for size, bucket, count, total in db.session.execute(
+                  select(table.c.bucket_size, table.c.bucket, table.c.account_count,
+                         type_coerce(table.c.balance_total, Float)))}
+    actual = _actual_aggregates(bucket_size)
+
+    drift = []
+    for key in sorted(set(actual) | {key for key in stored if key[0] in (0, bucket_size)}):
+        expected, found = actual.get(key, (0, 0.0)), stored.get(key, (0, 0.0))
+        if expected[0] != found[0] or abs(expected[1] - found[1]) >= _TOLERANCE:
+            drift.append({'bucket_size': key[0], 'bucket': key[1],
+                          'stored': {'accounts': found[0], 'total_balance': found[1]},
+                          'actual': {'accounts': expected[0], 'total_balance': expected[1]}})
+    stale = sum(1 for size, _ in stored if size not in (0, bucket_size))
+
+    if fix:
+        try:
+            now = datetime.utcnow()
+            db.session.execute(delete(table))
+            db.session.execute(table.insert(), [
+                {'bucket_size': size, 'bucket': bucket, 'account_count': count,
+                 'balance_total': total, 'updated_at': now}
+                for (size, bucket), (count, total) in actual.items()])
+            db.session.commit()
+        except Exception:
+            db.session.rollback()
+            raise
+    else:
+        db.session.rollback()
+
+    summary = {'bucket_size': bucket_size, 'buckets': len(actual) - 1, 'drift': drift,
+               'stale_rows': stale, 'fixed': fix}
+    log = logger.warning if drift else logger.info
+    log("aggregates_reconciled", bucket_size=bucket_size, buckets=summary['buckets'],
+        drifted=len(drift), stale_rows=stale, fixed=fix)
+    return summary
+
+def _needs_rebuild() -> bool:
+    """No totals yet, or none for the configured bucket size"""
+    table = AccountAggregate.__table__
+    keys = select(table.c.bucket_size).where(table.c.bucket_size.in_((0, _bucket_size()))).distinct()
+    found = set(db.session.scalars(keys))
+    if 0 not in found:
+        return True
+    has_accounts = db.session.scalar(select(Account.id).limit(1)) is not None
+    return has_accounts and _bucket_size() not in found
+
+def init_aggregates(app) -> None:
+    """Build the aggregates on first start (or a new BATCH_SIZE) and add the CLI command"""
+    with app.app_context():
+        if _needs_rebuild():
+            reconcile_aggregates(fix=True)
+        db.session.remove()
+
+    @app.cli.command('reconcile-aggregates')
+    @click.option('--dry-run', is_flag=True, help="Report drift without rebuilding the table")
+    def reconcile_command(dry_run):
+        """Rebuild the balance aggregates from the accounts table and report drift"""
+        summary = reconcile_aggregates(fix=not dry_run)
+        for entry in summary['drift']:
+            click.echo(f"bucket {entry['bucket_size']}/{entry['bucket']}: "
+                       f"stored {entry['stored']} actual {entry['actual']}")
+        click.echo(f"{len(summary['drift'])} drifted of {summary['buckets']} buckets, "
+                   f"{summary['stale_rows']} stale rows, "
+                   f"{'rebuilt' if summary['fixed'] else 'not rebuilt (dry run)'}")
@@ -0,0 +1,349 @@
+"""asyncio application serving the /api routes with aiohttp.
+
+Handlers are coroutines on one event loop and talk to the database through
+an async SQLAlchemy engine, so a request waiting on SQLite or SMTP holds no
+thread. Startup, configuration, the account cache and the metrics registry
+come from a regular Flask app built by `create_app`; every request runs
+inside its app context, so the shared helpers behave as in the Flask routes.
+"""
+import functools
+import json
+import time
+from aiohttp import web
+from flask import g
+from app import create_app
+from app.async_crud import (
+    create_account, create_accounts_bulk, delete_account, get_account_dict, get_account_dict_by_number,
+    get_summary, iter_account_row_chunks, list_account_rows, list_bucket_totals, list_ledger_entries,
+    search_account_rows, transfer_funds, update_account, update_accounts_bulk
+)
+from app.async_db import create_async_db, create_tables
+from app.cache import get_account_cache
+from app.config import Config
+from app.db import db
+from app.emailer import AsyncEmailSender
+from app.exceptions import (
+    AccountNotFoundError, BMSError, DatabaseBusyError, DuplicateAccountError,
+    InsufficientFundsError, InvalidAccountDataError
+)
+from app.logger import logger
+from app.metrics import PROMETHEUS_MIMETYPE, instrument_engine, subsystem_metrics
+from app.search import next_cursor
+from app.serializers import account_serializer
+from app.validation import (
+    parse_account, parse_account_updates, parse_bulk_change, parse_page, parse_search, parse_transfer
+)
+
+FLASK_APP = web.AppKey('flask_app', object)
+ENGINE = web.AppKey('engine', object)
+SESSIONS = web.AppKey('sessions', object)
+
+NDJSON_MIMETYPE = 'application/x-ndjson'
+
+routes = web.RouteTableDef()
+
+# Same compact, key-sorted output as Flask's jsonify
+_dumps = functools.partial(json.dumps, separators=(',', ':'), sort_keys=True)
+
+
+def _json(data, status: int = 200, headers=None) -> web.Response:
+    return web.json_response(data, status=status, headers=headers, dumps=_dumps)
+
+def _error(message: str, status: int) -> web.Response:
+    return _json({'error': message}, status)
+
+def _config_int(request: web.Request, key: str) -> int:
+    return int(request.app[FLASK_APP].config.get(key, getattr(Config, key)))
+
+def _page(request: web.Request, default_after: int = 0, min_after: int = 0) -> tuple:
+    """(after, limit) from the query string, capped at MAX_PAGE_SIZE"""
+    return parse_page(request.query, _config_int(request, 'PAGE_SIZE'), _config_int(request, 'MAX_PAGE_SIZE'),
+                      default_after, min_after)
+
+def _session(request: web.Request):
+    return request.app[SESSIONS]()
+
+async def _json_body(request: web.Request):
+    """Parsed request body, or None when it is not valid JSON"""
+    try:
+        return await request.json()
+    except ValueError:
+        return None
+
+@web.middleware
+async def app_context_middleware(request: web.Request, handler):
+    """Run the handler in the Flask app context, map BMS errors and record metrics"""
+    flask_app = request.app[FLASK_APP]
+    with flask_app.app_context():
+        g._metrics = [time.perf_counter(), 0, 0.0]
+        try:
+            response = await handler(request)
+        except web.HTTPException as e:
+            response = e
+        except DatabaseBusyError as e:
+            response = _json({'error': str(e)}, 503, headers={'Retry-After': '1'})
+        except BMSError as e:
+            response = _error(str(e), 400)
+        stats = g.pop('_metrics')
+        resource = request.match_info.route.resource
+        route = resource.canonical if resource is not None else 'unmatched'
+        flask_app.extensions['metrics'].observe_request(
+            route, request.method, response.status, time.perf_counter() - stats[0], stats[1], stats[2])
+        if isinstance(response, web.HTTPException) and response.status >= 400:
+            raise response
+        return response
+
+@routes.post('/api/accounts')
+async def create_new_account(request):
+    """Create a new account"""
+    data = await _json_body(request)
+    try:
+        async with _session(request) as session:
+            account = await create_account(session, **parse_account(data))
+        return _json(account, 201)
+    except (KeyError, ValueError, TypeError) as e:
+        return _error(f'Invalid input: {str(e)}', 400)
+    except DuplicateAccountError as e:
+        return _error(str(e), 409)
+
+@routes.get(r'/api/accounts/{account_id:\d+}')
+async def get_account_by_id(request):
+    """Get account by ID"""
+    try:
+        async with _session(request) as session:
+            return _json(await get_account_dict(session, int(request.match_info['account_id'])))
+    except AccountNotFoundError as e:
+        return _error(str(e), 404)
+
+@routes.get('/api/accounts/number/{account_number}')
+async def find_account_by_number(request):
+    """Get account by account number"""
+    try:
+        async with _session(request) as session:
+            return _json(await get_account_dict_by_number(session, request.match_info['account_number']))
+    except AccountNotFoundError as e:
+        return _error(str(e), 404)
+
+@routes.get('/api/accounts')
+async def get_all_accounts(request):
+    """List accounts, optionally paginated by id cursor or streamed as NDJSON"""
+    stream = (request.query.get('format') == 'ndjson'
+              or request.headers.get('Accept', '').split(',')[0].strip() == NDJSON_MIMETYPE)
+    paginate = 'after' in request.query or 'limit' in request.query
+    serializer = account_serializer()
+
+    if not stream and not paginate:
+        async with _session(request) as session:
+            rows = await list_account_rows(session)
+        return web.Response(text=serializer.dumps_list(rows) + '\n', content_type='application/json')
+
+    try:
+        after, limit = _page(request)
+    except ValueError as e:
+        return _error(f'Invalid input: {str(e)}', 400)
+
+    if stream:
+        return await _stream_accounts(request, after, _config_int(request, 'STREAM_CHUNK_SIZE'))
+
+    async with _session(request) as session:
+        rows = await list_account_rows(session, after, limit)
+    next_after = rows[-1].id if len(rows) == limit else None
+    return web.Response(text='{"accounts":' + serializer.dumps_list(rows)
+                        + ',"next_after":' + json.dumps(next_after) + '}\n',
+                        content_type='application/json')
+
+async def _stream_accounts(request, after: int, chunk_size: int) -> web.StreamResponse:
+    """Stream accounts as NDJSON, one keyset query per chunk"""
+    response = web.StreamResponse(headers={'Content-Type': NDJSON_MIMETYPE})
+    await response.prepare(request)
+    encode = account_serializer().to_json
+    count = 0
+    async with _session(request) as session:
+        async for chunk in iter_account_row_chunks(session, after, chunk_size):
+            count += len(chunk)
+            await response.write(''.join(encode(row) + '\n' for row in chunk).encode())
+    await response.write_eof()
+    logger.info("accounts_streamed", count=count, after=after)
+    return response
+
+@routes.get('/api/accounts/summary')
+async def get_accounts_summary(request):
+    """Account count and balance total, read from the maintained aggregates"""
+    async with _session(request) as session:
+        summary = await get_summary(session)
+        if request.query.get('buckets', '').lower() not in ('1', 'true', 'yes'):
+            return _json(summary)
+        try:
+            after, limit = _page(request, default_after=-1, min_after=-1)
+        except ValueError as e:
+            return _error(f'Invalid input: {str(e)}', 400)
+        buckets = await list_bucket_totals(session, after, limit)
+    summary['buckets'] = buckets
+    summary['next_after'] = buckets[-1]['bucket'] if len(buckets) == limit else None
+    return _json(summary)
+
+@routes.get('/api/accounts/search')
+async def search_accounts(request):
+    """Filter accounts by name prefix, full text, balance and dates, sorted and keyset-paginated"""
+    try:
+        criteria, limit = parse_search(request.query, _config_int(request, 'PAGE_SIZE'),
+                                       _config_int(request, 'MAX_PAGE_SIZE'))
+    except ValueError as e:
+        return _error(f'Invalid input: {str(e)}', 400)
+
+    async with _session(request) as session:
+        rows = await search_account_rows(session, criteria, limit)
+    return web.Response(text='{"accounts":' + account_serializer().dumps_list(rows)
+                        + ',"next_cursor":' + json.dumps(next_cursor(rows, criteria['sort'], limit)) + '}\n',
+                        content_type='application/json')
+
+@routes.put(r'/api/accounts/{account_id:\d+}')
+async def update_account_details(request):
+    """Update account details"""
+    data = await _json_body(request)
+    try:
+        async with _session(request) as session:
+            account = await update_account(session, int(request.match_info['account_id']),
+                                           **parse_account_updates(data))
+        return _json(account)
+    except (ValueError, TypeError, AttributeError, InvalidAccountDataError) as e:
+        return _error(str(e), 400)
+    except AccountNotFoundError as e:
+        return _error(str(e), 404)
+
+@routes.delete(r'/api/accounts/{account_id:\d+}')
+async def remove_account(request):
+    """Delete an account"""
+    try:
+        async with _session(request) as session:
+            await delete_account(session, int(request.match_info['account_id']))
+        return web.Response(status=204)
+    except AccountNotFoundError as e:
+        return _error(str(e), 404)
+
+@routes.post('/api/accounts/batch')
+async def create_multiple_accounts(request):
+    """Create multiple accounts in one request"""
+    data = await _json_body(request)
+    if not isinstance(data, list):
+        return _error('Request body must be an array of accounts', 400)
+
+    rows = []
+    positions = []
+    errors = []
+    for idx, account_data in enumerate(data):
+        try:
+            rows.append(parse_account(account_data))
+            positions.append(idx)
+        except (KeyError, ValueError, TypeError, AttributeError) as e:
+            errors.append({'index': idx, 'data': account_data, 'error': str(e)})
+
+    async with _session(request) as session:
+        results, conflicts = await create_accounts_bulk(session, rows)
+    for pos, message in conflicts:
+        idx = positions[pos]
+        errors.append({'index': idx, 'data': data[idx], 'error': message})
+    errors.sort(key=lambda error: error['index'])
+    return _json({'success': results, 'errors': errors}, 201 if results else 400)
+
+@routes.patch('/api/accounts/bulk')
+async def update_multiple_accounts(request):
+    """Apply many account changes in one transaction and return a summary"""
+    data = await _json_body(request)
+    if not isinstance(data, list):
+        return _error('Request body must be an array of changes', 400)
+
+    changes = []
+    positions = []
+    errors = []
+    for idx, change in enumerate(data):
+        try:
+            changes.append(parse_bulk_change(change))
+            positions.append(idx)
+        except (KeyError, ValueError, TypeError) as e:
+            errors.append({'index': idx, 'error': str(e)})
+
+    try:
+        async with _session(request) as session:
+            updated, missing = await update_accounts_bulk(session, changes) if changes else (0, [])
+    except InvalidAccountDataError as e:
+        return _error(str(e), 400)
+    not_found = [{'index': positions[pos], 'id': changes[pos][0]} for pos in missing]
+    return _json({'updated': updated, 'not_found': not_found, 'errors': errors}, 200 if updated else 400)
+
+@routes.post('/api/transfers')
+async def create_transfer(request):
+    """Move money between two accounts"""
+    data = await _json_body(request)
+    try:
+        async with _session(request) as session:
+            transfer = await transfer_funds(session, *parse_transfer(data))
+        return _json(transfer, 201)
+    except (KeyError, ValueError, TypeError) as e:
+        return _error(f'Invalid input: {str(e)}', 400)
+    except InvalidAccountDataError as e:
+        return _error(str(e), 400)
+    except AccountNotFoundError as e:
+        return _error(str(e), 404)
+    except InsufficientFundsError as e:
+        return _error(str(e), 409)
+
+@routes.get(r'/api/accounts/{account_id:\d+}/ledger')
+async def get_account_ledger(request):
+    """Page through an account's ledger entries by id cursor"""
+    try:
+        after, limit = _page(request)
+    except ValueError as e:
+        return _error(f'Invalid input: {str(e)}', 400)
+
+    async with _session(request) as session:
+        entries = await list_ledger_entries(session, int(request.match_info['account_id']), after, limit)
+    next_after = entries[-1]['id'] if len(entries) == limit else None
+    return _json({'entries': entries, 'next_after': next_after})
+
+@routes.get('/api/health')
+async def health_check(request):
+    """Health check endpoint"""
+    return _json({'status': 'healthy'})
+
+@routes.get('/api/metrics')
+async def metrics(request):
+    """Request, database, cache and email metrics in Prometheus text format"""
+    flask_app = request.app[FLASK_APP]
+    extra = subsystem_metrics(flask_app.extensions['async_email'].stats(), get_account_cache())
+    body = flask_app.extensions['metrics'].render(extra)
+    return web.Response(body=body.encode(), headers={'Content-Type': PROMETHEUS_MIMETYPE})
+
+@routes.get('/')
+async def root_health_check(request):
+    return _json({'status': 'healthy', 'service': 'BMS API'})
+
+async def _on_startup(app: web.Application) -> None:
+    # In-memory databases are per engine, so the async engine needs its own tables
+    await create_tables(app[ENGINE])
+
+async def _on_cleanup(app: web.Application) -> None:
+    await app[FLASK_APP].extensions['async_email'].close(timeout=10)
+    await app[ENGINE].dispose()
+
+def create_async_app(config_class=Config) -> web.Application:
+    """Create the aiohttp application serving the same /api routes as the Flask app"""
+    flask_app = create_app(config_class)
+    with flask_app.app_context():
+        # Startup work (tables, aggregates) is done; the sync engine is not used from here on
+        db.engine.dispose()
+
+    engine, sessions = create_async_db(flask_app.config)
+    instrument_engine(flask_app.extensions['metrics'], engine.sync_engine)
+    flask_app.extensions['async_email'] = AsyncEmailSender.from_config(flask_app.config)
+
+    app = web.Application(middlewares=[app_context_middleware])
+    app[FLASK_APP] = flask_app
+    app[ENGINE] = engine
+    app[SESSIONS] = sessions
+    app.add_routes(routes)
+    app.on_startup.append(_on_startup)
+    app.on_cleanup.append(_on_cleanup)
+
+    logger.info("async_application_started", database=engine.url.render_as_string())
+    return app
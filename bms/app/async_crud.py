@@ -0,0 +1,364 @@
+"""Async counterparts of `app.crud` for the aiohttp application.
+
+Every function takes an AsyncSession as its first argument and returns
+plain dicts built by the compiled serializers (no ORM objects), so nothing
+is lazily loaded after the session is gone. Statements, validation and
+cache handling are shared with the synchronous versions.
+"""
+from datetime import datetime
+from typing import AsyncIterator
+from uuid import uuid4
+from flask import current_app
+from sqlalchemy import Float, insert, select, type_coerce
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.ext.asyncio import AsyncSession
+from app.aggregates import (
+    balance_delta_upsert, bucket_totals, bucket_totals_select, summary_dict, summary_select
+)
+from app.async_db import begin_write_async, retry_on_lock_async
+from app.cache import get_account_cache
+from app.config import Config
+from app.crud import (
+    LOOKUP_CHUNK_SIZE, bulk_balance_deltas, bulk_update_statement, group_bulk_changes, invalidate_cached,
+    ledger_rows, merge_bulk_changes, setting, transfer_amount, transfer_leg_statement, transfer_legs,
+    transfer_result
+)
+from app.db import is_lock_error
+from app.emailer import account_created_email, accounts_created_bulk_email
+from app.exceptions import (
+    AccountNotFoundError, DuplicateAccountError, InsufficientFundsError, InvalidAccountDataError
+)
+from app.logger import logger
+from app.models import Account, LedgerEntry
+from app.search import fts_enabled, search_statement
+from app.serializers import account_serializer, ledger_serializer
+
+
+async def _apply_balance_deltas(session: AsyncSession, deltas) -> None:
+    upsert = balance_delta_upsert(deltas, session.bind.dialect.name)
+    if upsert is not None:
+        await session.execute(*upsert)
+
+def _notify(subject_and_body) -> None:
+    """Hand a notification to the app's async email sender without waiting for delivery"""
+    try:
+        recipient = getattr(Config, 'NOTIFICATIONS_EMAIL', None)
+        sender = current_app.extensions.get('async_email')
+        if recipient and sender is not None:
+            sender.send(recipient, *subject_and_body)
+    except Exception as e:
+        logger.warning("notification_failed", error=str(e))
+
+async def _select_account_dict(session: AsyncSession, criterion):
+    serializer = account_serializer()
+    row = (await session.execute(serializer.select().where(criterion))).first()
+    return None if row is None else serializer.to_dict(row)
+
+async def _load_account_dict(session: AsyncSession, account_id: int) -> dict:
+    account = await _select_account_dict(session, Account.id == account_id)
+    if account is None:
+        logger.error("account_not_found", account_id=account_id)
+        raise AccountNotFoundError(f"Account with ID {account_id} not found")
+    return account
+
+async def _load_account_dict_by_number(session: AsyncSession, number: str) -> dict:
+    account = await _select_account_dict(session, Account.number == number)
+    if account is None:
+        logger.error("account_not_found", account_number=number)
+        raise AccountNotFoundError(f"Account with number {number} not found")
+    return account
+
+async def get_account_dict(session: AsyncSession, account_id: int) -> dict:
+    """Get a serialized account by ID, served from the account cache when possible"""
+    cache = get_account_cache()
+    if cache is None or not cache.enabled:
+        return await _load_account_dict(session, account_id)
+    account = cache.get(account_id)
+    if account is None:
+        generation = cache.generation
+        account = await _load_account_dict(session, account_id)
+        cache.put(account, generation)
+    return account
+
+async def get_account_dict_by_number(session: AsyncSession, number: str) -> dict:
+    """Get a serialized account by number, served from the account cache when possible"""
+    cache = get_account_cache()
+    if cache is None or not cache.enabled:
+        return await _load_account_dict_by_number(session, number)
+    account = cache.get_by_number(number)
+    if account is None:
+        generation = cache.generation
+        account = await _load_account_dict_by_number(session, number)
+        cache.put(account, generation)
+    return account
+
+async def list_account_rows(session: AsyncSession, after: int = None, limit: int = None) -> list:
+    """Accounts as Core rows for `account_serializer()`; all of them, or one keyset page"""
+    stmt = account_serializer().select()
+    if after is not None or limit is not None:
+        stmt = stmt.where(Account.id > (after or 0)).order_by(Account.id)
+    if limit is not None:
+        stmt = stmt.limit(limit)
+    return (await session.execute(stmt)).all()
+
+async def iter_account_row_chunks(session: AsyncSession, after: int = 0,
+                                  chunk_size: int = 1000) -> AsyncIterator[list]:
+    """Yield lists of Core account rows in id order, `chunk_size` rows per query"""
+    while True:
+        chunk = await list_account_rows(session, after, chunk_size)
+        if not chunk:
+            return
+        yield chunk
+        if len(chunk) < chunk_size:
+            return
+        after = chunk[-1].id
+
+async def search_account_rows(session: AsyncSession, criteria: dict, limit: int) -> list:
+    """One page of GET /accounts/search as Core rows for `account_serializer()`"""
+    stmt = search_statement(criteria, limit, session.bind.dialect.name, fts_enabled())
+    return (await session.execute(stmt)).all()
+
+def _returning_insert():
+    serializer = account_serializer()
+    return insert(Account.__table__).returning(*serializer.expressions(), sort_by_parameter_order=True)
+
+@retry_on_lock_async
+async def create_account(session: AsyncSession, name: str, number: str, balance: float = 0.0) -> dict:
+    """Create a new account and return it serialized"""
+    try:
+        row = (await session.execute(_returning_insert(), [{'name': name, 'number': number,
+                                                             'balance': balance}])).one()
+        account = account_serializer().to_dict(row)
+        await _apply_balance_deltas(session, [(account['id'], 1, float(balance or 0))])
+        await session.commit()
+    except IntegrityError:
+        await session.rollback()
+        logger.error("account_creation_failed", error="duplicate_number", account_number=number)
+        raise DuplicateAccountError(f"Account with number {number} already exists")
+    except Exception as e:
+        await session.rollback()
+        if is_lock_error(e):
+            raise
+        logger.error("account_creation_failed", error=str(e), account_number=number)
+        raise InvalidAccountDataError(str(e))
+    logger.info("account_created", account_number=number, name=name)
+    _notify(account_created_email(name))
+    return account
+
+async def _existing_numbers(session: AsyncSession, numbers: list[str]) -> set[str]:
+    found = set()
+    for start in range(0, len(numbers), LOOKUP_CHUNK_SIZE):
+        chunk = numbers[start:start + LOOKUP_CHUNK_SIZE]
+        found.update(await session.scalars(select(Account.number).where(Account.number.in_(chunk))))
+    return found
+
+async def _insert_rows(session: AsyncSession, rows: list[dict]) -> list[dict]:
+    """Insert rows with a single executemany inside a savepoint"""
+    to_dict = account_serializer().to_dict
+    async with session.begin_nested():
+        return [to_dict(row) for row in await session.execute(_returning_insert(), rows)]
+
+@retry_on_lock_async
+async def create_accounts_bulk(session: AsyncSession,
+                               rows: list[dict]) -> tuple[list[dict], list[tuple[int, str]]]:
+    """Create many accounts in one transaction, like `crud.create_accounts_bulk`"""
+    errors = []
+    pending = []
+    seen = set()
+    for idx, row in enumerate(rows):
+        if row['number'] in seen:
+            errors.append((idx, f"Account with number {row['number']} already exists"))
+        else:
+            seen.add(row['number'])
+            pending.append((idx, row))
+
+    existing = await _existing_numbers(session, [row['number'] for _, row in pending])
+    if existing:
+        errors.extend((idx, f"Account with number {row['number']} already exists")
+                      for idx, row in pending if row['number'] in existing)
+        pending = [(idx, row) for idx, row in pending if row['number'] not in existing]
+
+    chunk_size = int(setting('BULK_INSERT_CHUNK_SIZE'))
+    created = []
+    try:
+        for start in range(0, len(pending), chunk_size):
+            chunk = pending[start:start + chunk_size]
+            try:
+                created.extend(await _insert_rows(session, [row for _, row in chunk]))
+            except IntegrityError:
+                # A concurrent writer claimed some of these numbers; isolate them
+                for idx, row in chunk:
+                    try:
+                        created.extend(await _insert_rows(session, [row]))
+                    except IntegrityError:
+                        errors.append((idx, f"Account with number {row['number']} already exists"))
+        await _apply_balance_deltas(session, [(account['id'], 1, account['balance']) for account in created])
+        await session.commit()
+    except Exception as e:
+        await session.rollback()
+        if is_lock_error(e):
+            raise
+        logger.error("bulk_account_creation_failed", error=str(e), count=len(rows))
+        raise InvalidAccountDataError(str(e))
+
+    errors.sort()
+    logger.info("accounts_bulk_created", created=len(created), failed=len(errors))
+    if created:
+        _notify(accounts_created_bulk_email([account['name'] for account in created]))
+    return created, errors
+
+async def _current_balance(session: AsyncSession, account_id: int) -> float:
+    """Balance of an existing account; AccountNotFoundError otherwise"""
+    row = (await session.execute(select(Account.id, type_coerce(Account.balance, Float))
+                                 .where(Account.id == account_id))).first()
+    if row is None:
+        logger.error("account_not_found", account_id=account_id)
+        raise AccountNotFoundError(f"Account with ID {account_id} not found")
+    return row[1] or 0.0
+
+@retry_on_lock_async
+async def update_account(session: AsyncSession, account_id: int, **kwargs) -> dict:
+    """Update account details and return the account serialized"""
+    await begin_write_async(session)  # the balance delta is computed from this read
+    try:
+        old_balance = await _current_balance(session, account_id)
+    except AccountNotFoundError:
+        await session.rollback()
+        raise
+    table = Account.__table__
+    try:
+        stmt = (table.update()
+                .where(table.c.id == account_id)
+                .values(updated_at=datetime.utcnow(), **kwargs)
+                .returning(*account_serializer().expressions()))
+        account = account_serializer().to_dict((await session.execute(stmt)).one())
+        if 'balance' in kwargs:
+            await _apply_balance_deltas(session, [(account_id, 0, float(kwargs['balance'] or 0) - old_balance)])
+        await session.commit()
+    except Exception as e:
+        await session.rollback()
+        if is_lock_error(e):
+            raise
+        logger.error("account_update_failed", error=str(e), account_id=account_id)
+        raise InvalidAccountDataError(str(e))
+    invalidate_cached(account_id)
+    logger.info("account_updated", account_id=account_id, updates=kwargs)
+    return account
+
+async def _current_balances(session: AsyncSession, account_ids: list[int]) -> dict[int, float]:
+    found = {}
+    balance = type_coerce(Account.balance, Float)
+    for start in range(0, len(account_ids), LOOKUP_CHUNK_SIZE):
+        chunk = account_ids[start:start + LOOKUP_CHUNK_SIZE]
+        found.update((await session.execute(select(Account.id, balance).where(Account.id.in_(chunk)))).all())
+    return found
+
+@retry_on_lock_async
+async def update_accounts_bulk(session: AsyncSession, changes: list[tuple[int, dict]]) -> tuple[int, list[int]]:
+    """Apply many (account_id, fields) changes in one transaction, like `crud.update_accounts_bulk`"""
+    merged = merge_bulk_changes(changes)
+    await begin_write_async(session)  # the balance deltas are computed from these reads
+    existing = await _current_balances(session, list(merged))
+    not_found = [idx for idx, (account_id, _) in enumerate(changes) if account_id not in existing]
+    groups = group_bulk_changes(merged, existing)
+
+    now = datetime.utcnow()
+    try:
+        for names, params in groups.items():
+            await session.execute(bulk_update_statement(names, now), params)
+        await _apply_balance_deltas(session, bulk_balance_deltas(merged, existing))
+        await session.commit()
+    except Exception as e:
+        await session.rollback()
+        if is_lock_error(e):
+            raise
+        logger.error("bulk_account_update_failed", error=str(e), count=len(changes))
+        raise InvalidAccountDataError(str(e))
+
+    updated = [account_id for account_id in merged if account_id in existing]
+    invalidate_cached(*updated)
+    logger.info("accounts_bulk_updated", updated=len(updated), statements=len(groups),
+                not_found=len(not_found))
+    return len(updated), not_found
+
+@retry_on_lock_async
+async def delete_account(session: AsyncSession, account_id: int) -> None:
+    """Delete an account"""
+    await begin_write_async(session)  # the aggregates lose the balance read here
+    try:
+        balance = await _current_balance(session, account_id)
+    except AccountNotFoundError:
+        await session.rollback()
+        raise
+    table = Account.__table__
+    try:
+        await _apply_balance_deltas(session, [(account_id, -1, -balance)])
+        await session.execute(table.delete().where(table.c.id == account_id))
+        await session.commit()
+    except Exception as e:
+        await session.rollback()
+        if is_lock_error(e):
+            raise
+        logger.error("account_deletion_failed", error=str(e), account_id=account_id)
+        raise InvalidAccountDataError(str(e))
+    invalidate_cached(account_id)
+    logger.info("account_deleted", account_id=account_id)
+
+async def _transfer_failure(session: AsyncSession, account_id: int, amount: float) -> Exception:
+    balance = await session.scalar(select(Account.balance).where(Account.id == account_id))
+    if balance is None:
+        logger.error("account_not_found", account_id=account_id)
+        return AccountNotFoundError(f"Account with ID {account_id} not found")
+    return InsufficientFundsError(f"Account with ID {account_id} has insufficient funds for {amount:.2f}")
+
+@retry_on_lock_async
+async def transfer_funds(session: AsyncSession, from_id: int, to_id: int, amount: float,
+                         memo: str = None) -> dict:
+    """Move `amount` between two accounts, like `crud.transfer_funds`"""
+    amount = transfer_amount(from_id, to_id, amount)
+    now = datetime.utcnow()
+    balances = {}
+    try:
+        for account_id, delta in transfer_legs(from_id, to_id, amount):
+            balance = (await session.execute(transfer_leg_statement(account_id, delta, amount, now))).scalar()
+            if balance is None:
+                raise await _transfer_failure(session, account_id, amount)
+            balances[account_id] = balance
+
+        await _apply_balance_deltas(session, [(from_id, 0, -amount), (to_id, 0, amount)])
+        transfer_id = uuid4().hex
+        await session.execute(insert(LedgerEntry),
+                              ledger_rows(transfer_id, from_id, to_id, amount, balances, memo, now))
+        await session.commit()
+    except (AccountNotFoundError, InsufficientFundsError) as e:
+        await session.rollback()
+        logger.warning("transfer_rejected", error=str(e), from_id=from_id, to_id=to_id, amount=amount)
+        raise
+    except Exception as e:
+        await session.rollback()
+        if is_lock_error(e):
+            raise
+        logger.error("transfer_failed", error=str(e), from_id=from_id, to_id=to_id, amount=amount)
+        raise InvalidAccountDataError(str(e))
+
+    invalidate_cached(from_id, to_id)
+    logger.info("transfer_completed", transfer_id=transfer_id, from_id=from_id, to_id=to_id, amount=amount)
+    return transfer_result(transfer_id, from_id, to_id, amount, balances, memo, now)
+
+async def list_ledger_entries(session: AsyncSession, account_id: int, after: int = 0,
+                              limit: int = 100) -> list[dict]:
+    """One keyset page of an account's ledger as dicts, oldest first"""
+    serializer = ledger_serializer()
+    rows = await session.execute(serializer.select()
+                                 .where(LedgerEntry.account_id == account_id, LedgerEntry.id > after)
+                                 .order_by(LedgerEntry.id)
+                                 .limit(limit))
+    return [serializer.to_dict(row) for row in rows]
+
+async def get_summary(session: AsyncSession) -> dict:
+    """Account count and balance total over all accounts, from the aggregate table"""
+    return summary_dict((await session.execute(summary_select())).first())
+
+async def list_bucket_totals(session: AsyncSession, after: int = -1, limit: int = 100) -> list[dict]:
+    """One page of per-bucket totals for the current bucket size, in bucket order"""
+    return bucket_totals(await session.execute(bucket_totals_select(after, limit)))
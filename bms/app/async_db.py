@@ -0,0 +1,81 @@
+import asyncio
+import functools
+from sqlalchemy.engine import make_url
+from sqlalchemy.exc import OperationalError
+from sqlalchemy.ext.asyncio import AsyncEngine, AsyncSession, async_sessionmaker, create_async_engine
+from sqlalchemy.pool import StaticPool
+from app.db import (
+    WRITE_TRANSACTION, db, engine_options, install_pragmas, install_transaction_control, is_lock_error,
+    is_memory_url, lock_retry_delay, lock_retry_settings
+)
+
+# Sync driver -> asyncio driver for the same database
+ASYNC_DRIVERS = {
+    'sqlite': 'sqlite+aiosqlite',
+    'postgresql': 'postgresql+asyncpg',
+}
+
+
+def async_database_url(url: str) -> str:
+    """The SQLALCHEMY_DATABASE_URI rewritten for its asyncio driver"""
+    parsed = make_url(url)
+    if parsed.get_backend_name() not in ASYNC_DRIVERS:
+        raise ValueError(f"No asyncio driver configured for {parsed.get_backend_name()}")
+    if parsed.get_driver_name() in ('aiosqlite', 'asyncpg'):
+        return url
+    return parsed.set(drivername=ASYNC_DRIVERS[parsed.get_backend_name()]).render_as_string(hide_password=False)
+
+def create_async_db(config) -> tuple[AsyncEngine, async_sessionmaker]:
+    """Async engine and session factory for the configured database.
+
+    Uses the same pool sizing and SQLite pragmas as the Flask engine.
+    Sessions keep loaded values after commit, since async code cannot
+    lazily refresh expired attributes.
+    """
+    url = config['SQLALCHEMY_DATABASE_URI']
+    options = engine_options(config)
+    if is_memory_url(url):
+        options.setdefault('poolclass', StaticPool)
+    engine = create_async_engine(async_database_url(url), **options)
+    install_pragmas(config, engine.sync_engine)
+    install_transaction_control(config, engine.sync_engine)
+    return engine, async_sessionmaker(engine, expire_on_commit=False)
+
+async def create_tables(engine: AsyncEngine) -> None:
+    """Create any missing tables and the search index (needed for in-memory databases)"""
+    # Import models here to ensure they are registered
+    from app.models import Account, AccountAggregate, JobCheckpoint, LedgerEntry, SchemaVersion  # noqa
+
+    from app.search import install_search
+
+    async with engine.begin() as conn:
+        await conn.run_sync(db.metadata.create_all)
+        await conn.run_sync(install_search)
+
+async def begin_write_async(session: AsyncSession) -> None:
+    """`begin_write` for an AsyncSession"""
+    if session.in_transaction():
+        await session.commit()
+    await session.connection(execution_options=WRITE_TRANSACTION)
+
+def retry_on_lock_async(func):
+    """`retry_on_lock` for coroutines whose first argument is an AsyncSession.
+
+    Backs off with `asyncio.sleep`, so other requests keep running while
+    this one waits for the lock.
+    """
+    @functools.wraps(func)
+    async def wrapper(session, *args, **kwargs):
+        retries, backoff = lock_retry_settings()
+        attempt = 0
+        while True:
+            try:
+                return await func(session, *args, **kwargs)
+            except OperationalError as e:
+                if not is_lock_error(e):
+                    raise
+                await session.rollback()
+                delay = lock_retry_delay(func.__name__, e, attempt, retries, backoff)
+                attempt += 1
+                await asyncio.sleep(delay)
+    return wrapper
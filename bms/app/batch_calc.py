@@ -1,22 +1,44 @@
 import asyncio
+from collections import deque
 from concurrent.futures import ThreadPoolExecutor
-from typing import List, Tuple
-from app.models import Account
+from datetime import date, datetime
+from typing import Any, Callable, Iterator, List, Optional, Sequence, Tuple, Union
+from sqlalchemy import Integer, bindparam, cast, func, select, update
+from app.db import db
+from app.models import Account, JobCheckpoint
+from app.cache import get_account_cache
+from app.aggregates import apply_balance_deltas
+from app.snapshot import AccountSnapshot
 from app.config import Config
 from app.logger import logger
 from flask import current_app
 
-def calculate_batch_total(accounts: List[Account]) -> float:
+try:
+    import numpy as np
+except ImportError:  # numpy is optional; accrual falls back to plain integers
+    np = None
+
+def _setting(key: str) -> int:
+    """Integer setting from the Flask app config when available, else from Config"""
+    try:
+        return int(current_app.config.get(key, getattr(Config, key)))
+    except RuntimeError:
+        return int(getattr(Config, key))
+
+def _batch_size() -> int:
+    """Batch size from the Flask app config when available, else from Config"""
+    return _setting('BATCH_SIZE')
+
+def calculate_batch_total(accounts: Union[List[Account], AccountSnapshot]) -> float:
     """Calculate total balance for a batch of accounts"""
+    if isinstance(accounts, AccountSnapshot):
+        return accounts.total()
     return sum(float(account.balance) for account in accounts)
 
-def process_batch_threaded(all_accounts: List[Account]) -> List[Tuple[int, float]]:
+def process_batch_threaded(all_accounts: Union[List[Account], AccountSnapshot]) -> List[Tuple[int, float]]:
     """Process accounts in batches using ThreadPoolExecutor"""
     # Allow overriding batch size via Flask app config when available
-    try:
-        batch_size = int(current_app.config.get('BATCH_SIZE', Config.BATCH_SIZE))
-    except RuntimeError:
-        batch_size = Config.BATCH_SIZE
+    batch_size = _batch_size()
     batches = [all_accounts[i:i + batch_size] for i in range(0, len(all_accounts), batch_size)]
     
     results = []
@@ -42,17 +64,14 @@ def process_batch_threaded(all_accounts: List[Account]) -> List[Tuple[int, float
     
     return sorted(results, key=lambda x: x[0])
 
-async def calculate_batch_total_async(batch_num: int, accounts: List[Account]) -> Tuple[int, float]:
+async def calculate_batch_total_async(batch_num: int,
+                                     accounts: Union[List[Account], AccountSnapshot]) -> Tuple[int, float]:
     """Calculate total balance for a batch of accounts asynchronously"""
-    total = sum(float(account.balance) for account in accounts)
-    return batch_num, total
+    return batch_num, calculate_batch_total(accounts)
 
-async def process_batch_async(all_accounts: List[Account]) -> List[Tuple[int, float]]:
+async def process_batch_async(all_accounts: Union[List[Account], AccountSnapshot]) -> List[Tuple[int, float]]:
     """Process accounts in batches using asyncio"""
-    try:
-        batch_size = int(current_app.config.get('BATCH_SIZE', Config.BATCH_SIZE))
-    except RuntimeError:
-        batch_size = Config.BATCH_SIZE
+    batch_size = _batch_size()
     batches = [all_accounts[i:i + batch_size] for i in range(0, len(all_accounts), batch_size)]
     
     tasks = []
@@ -74,4 +93,233 @@ async def process_batch_async(all_accounts: List[Account]) -> List[Tuple[int, fl
                        error=str(e),
                        processor="async")
     
-    return sorted(results, key=lambda x: x[0])
\ No newline at end of file
+    return sorted(results, key=lambda x: x[0])
+
+def iter_batch_aggregates(batch_size: Optional[int] = None,
+                          batches_per_query: Optional[int] = None) -> Iterator[Tuple[int, int, float]]:
+    """Yield (batch_num, count, total) computed by the database.
+
+    Batch `n` covers ids ``n * batch_size + 1`` to ``(n + 1) * batch_size``.
+    The id space is split into ranges of `batches_per_query` batches and each
+    range is aggregated with one ``GROUP BY`` query over the primary key, so
+    no ORM objects are loaded and each query stays bounded. Batches whose ids
+    were all deleted are skipped.
+    """
+    batch_size = batch_size or _batch_size()
+    batches_per_query = batches_per_query or _setting('SQL_BATCHES_PER_QUERY')
+    min_id, max_id = db.session.execute(select(func.min(Account.id), func.max(Account.id))).one()
+    if min_id is None:
+        return
+
+    batch_num = (Account.id - 1) // batch_size
+    span = batch_size * batches_per_query
+    lo = ((min_id - 1) // batch_size) * batch_size + 1
+    while lo <= max_id:
+        hi = lo + span - 1
+        stmt = (select(batch_num, func.count(Account.id), func.sum(Account.balance))
+                .where(Account.id.between(lo, hi))
+                .group_by(batch_num)
+                .order_by(batch_num))
+        for num, count, total in db.session.execute(stmt):
+            yield num, count, float(total or 0)
+        lo = hi + 1
+
+def process_batch_sql(batch_size: Optional[int] = None) -> List[Tuple[int, float]]:
+    """Process account batches with SUM/COUNT pushed down to the database"""
+    results = []
+    accounts = 0
+    for num, count, total in iter_batch_aggregates(batch_size):
+        results.append((num, total))
+        accounts += count
+    logger.info("batches_aggregated",
+               batches=len(results),
+               accounts=accounts,
+               processor="sql")
+    return results
+
+def _process_chunk(batch_fn: Callable[[Sequence], Any], rows: Sequence, first_batch: int,
+                   batch_size: int) -> List[Tuple[int, Any, Optional[Exception]]]:
+    """Apply `batch_fn` to each `batch_size` slice of a fetched chunk, on a worker thread"""
+    results = []
+    for offset in range(0, len(rows), batch_size):
+        batch_num = first_batch + offset // batch_size
+        try:
+            results.append((batch_num, batch_fn(rows[offset:offset + batch_size]), None))
+        except Exception as e:
+            results.append((batch_num, None, e))
+    return results
+
+def stream_batches(batch_fn: Callable[[Sequence], Any] = calculate_batch_total,
+                   columns: Sequence = (Account.balance,),
+                   batch_size: Optional[int] = None,
+                   chunk_size: Optional[int] = None,
+                   workers: Optional[int] = None,
+                   prefetch: Optional[int] = None,
+                   processor: str = "stream") -> Iterator[Tuple[int, Any]]:
+    """Yield (batch_num, batch_fn(rows)) for consecutive `batch_size` accounts in id order.
+
+    The calling thread reads `chunk_size` rows at a time with keyset queries
+    (``id > last ORDER BY id LIMIT n``) and hands each chunk to a pool of
+    `workers` threads, which apply `batch_fn` to every batch in it. Up to
+    `prefetch` chunks are in flight, so the next chunks are fetched while
+    earlier ones are computed and memory stays bounded by
+    ``prefetch * chunk_size`` rows. Results are yielded in batch order as
+    soon as the head chunk is done.
+
+    `batch_fn` receives a list of rows with ``id`` and `columns` as
+    attributes and runs without an app context. Batches whose function
+    raises are logged and skipped, as in `process_batch_threaded`.
+    """
+    batch_size = batch_size or _batch_size()
+    chunk_size = chunk_size or _setting('BATCH_STREAM_CHUNK_SIZE')
+    workers = workers or _setting('BATCH_STREAM_WORKERS')
+    prefetch = prefetch or _setting('BATCH_STREAM_PREFETCH')
+    # Whole batches per chunk, so no batch straddles two queries
+    chunk_size = max(1, chunk_size // batch_size) * batch_size
+
+    stmt = (select(Account.id, *columns)
+            .where(Account.id > bindparam('after'))
+            .order_by(Account.id)
+            .limit(chunk_size))
+    pending = deque()
+    after, next_batch, exhausted = 0, 0, False
+    with ThreadPoolExecutor(max_workers=workers, thread_name_prefix="batch-stream") as executor:
+        try:
+            while pending or not exhausted:
+                while not exhausted and len(pending) < prefetch:
+                    rows = db.session.execute(stmt, {'after': after}).all()
+                    if rows:
+                        pending.append(executor.submit(_process_chunk, batch_fn, rows, next_batch, batch_size))
+                        next_batch += -(-len(rows) // batch_size)
+                        after = rows[-1].id
+                    exhausted = len(rows) < chunk_size
+                if not pending:
+                    break
+                for batch_num, result, error in pending.popleft().result():
+                    if error is not None:
+                        logger.error("batch_processing_failed",
+                                   batch_num=batch_num,
+                                   error=str(error),
+                                   processor=processor)
+                        continue
+                    logger.info("batch_processed",
+                               batch_num=batch_num,
+                               total=result,
+                               processor=processor)
+                    yield batch_num, result
+        finally:
+            # The consumer stopped early or a query failed: drop chunks not yet started
+            for future in pending:
+                future.cancel()
+
+def process_batch_stream(batch_size: Optional[int] = None) -> List[Tuple[int, float]]:
+    """Process account batches through the streaming pipeline, without loading ORM objects"""
+    return list(stream_batches(batch_size=batch_size))
+
+
+ACCRUAL_JOB = 'interest_accrual'
+
+def compute_accrual_cents(balances_cents: Sequence[int], rates_bp: Sequence[int],
+                          days: int = 1, day_count: int = 365):
+    """Interest in whole cents for parallel arrays of balances and rates.
+
+    Rates are annual percentages expressed in basis points (3.25% -> 325).
+    Everything stays in integers and rounds half away from zero, so results
+    are exact. Uses one numpy array operation when numpy is installed.
+    """
+    denominator = 10000 * day_count
+    if np is not None:
+        numerator = (np.asarray(balances_cents, dtype=np.int64)
+                     * np.asarray(rates_bp, dtype=np.int64) * days)
+        return np.sign(numerator) * ((np.abs(numerator) * 2 + denominator) // (2 * denominator))
+    result = []
+    for balance, rate in zip(balances_cents, rates_bp):
+        numerator = balance * rate * days
+        cents = (abs(numerator) * 2 + denominator) // (2 * denominator)
+        result.append(-cents if numerator < 0 else cents)
+    return result
+
+def _load_checkpoint(job: str, run_key: str) -> JobCheckpoint:
+    """Fetch the job checkpoint, resetting it when a new run starts"""
+    checkpoint = db.session.get(JobCheckpoint, job)
+    if checkpoint is None:
+        checkpoint = JobCheckpoint(job=job, run_key=run_key, last_id=0, completed=False)
+        db.session.add(checkpoint)
+    elif checkpoint.run_key != run_key:
+        checkpoint.run_key = run_key
+        checkpoint.last_id = 0
+        checkpoint.completed = False
+    db.session.commit()
+    return checkpoint
+
+def accrue_interest(run_key: Optional[str] = None, days: int = 1,
+                    day_count: int = 365, chunk_size: Optional[int] = None) -> dict:
+    """Accrue `days` of interest on every account using Account.interest_rate.
+
+    Accounts are streamed in id order, `chunk_size` at a time, as integer cents
+    computed by SQLite. Each chunk's interest is one array operation and is added
+    to the balances with a single executemany UPDATE, committed together
+    with the job checkpoint. Re-running with the same `run_key` (the date by
+    default) resumes after the last committed chunk and never accrues twice.
+    """
+    run_key = run_key or date.today().isoformat()
+    chunk_size = chunk_size or _setting('ACCRUAL_CHUNK_SIZE')
+    checkpoint = _load_checkpoint(ACCRUAL_JOB, run_key)
+    summary = {'run_key': run_key, 'accounts': 0, 'updated': 0, 'interest_cents': 0,
+               'resumed_from': checkpoint.last_id}
+    if checkpoint.completed:
+        logger.info("interest_accrual_skipped", run_key=run_key, reason="already_completed")
+        return summary
+
+    chunk_stmt = (select(Account.id,
+                         cast(func.round(func.coalesce(Account.balance, 0) * 100), Integer),
+                         cast(func.round(func.coalesce(Account.interest_rate, 0) * 100), Integer))
+                  .where(Account.id > bindparam('after'))
+                  .order_by(Account.id)
+                  .limit(chunk_size))
+    # Interest is added to the stored balance rather than overwriting it with one computed
+    # from the chunk SELECT, so a transfer committed in between is not lost
+    table = Account.__table__
+    update_stmt = (update(table)
+                   .where(table.c.id == bindparam('b_id'))
+                   .values(balance=func.round(table.c.balance + bindparam('b_interest'), 2),
+                           updated_at=bindparam('b_updated_at')))
+
+    cache = get_account_cache()
+    after = checkpoint.last_id
+    try:
+        while True:
+            rows = db.session.execute(chunk_stmt, {'after': after}).all()
+            if not rows:
+                break
+            ids, balances, rates = zip(*rows)
+            interest = compute_accrual_cents(balances, rates, days, day_count)
+            now = datetime.utcnow()
+            if np is not None:
+                mask = interest != 0
+                changed = zip(np.asarray(ids)[mask].tolist(), interest[mask].tolist())
+                summary['interest_cents'] += int(interest.sum())
+            else:
+                changed = [(account_id, cents) for account_id, cents in zip(ids, interest) if cents]
+                summary['interest_cents'] += sum(interest)
+            params = [{'b_id': account_id, 'b_interest': cents / 100, 'b_updated_at': now}
+                      for account_id, cents in changed]
+            if params:
+                db.session.execute(update_stmt, params)
+                apply_balance_deltas((param['b_id'], 0, param['b_interest']) for param in params)
+            after = ids[-1]
+            checkpoint.last_id = after
+            db.session.commit()
+            if params and cache is not None:
+                cache.invalidate(*(param['b_id'] for param in params))
+            summary['accounts'] += len(ids)
+            summary['updated'] += len(params)
+        checkpoint.completed = True
+        db.session.commit()
+    except Exception as e:
+        db.session.rollback()
+        logger.error("interest_accrual_failed", error=str(e), run_key=run_key, last_id=after)
+        raise
+
+    logger.info("interest_accrued", **summary)
+    return summary
@@ -0,0 +1,123 @@
+import threading
+import time
+from collections import OrderedDict
+from typing import Optional
+from flask import current_app
+from app.config import Config
+
+
+class AccountCache:
+    """Thread-safe LRU cache of serialized accounts, keyed by id and by number.
+
+    Entries hold `Account.to_dict()` output so cache hits skip the ORM
+    entirely. `max_size` caps the number of accounts kept; `ttl` (seconds)
+    optionally expires entries. Every invalidation bumps a generation
+    counter, and `put` ignores values loaded under an older generation, so
+    a read racing with a write can never re-insert stale data.
+    """
+
+    def __init__(self, max_size: int = 10000, ttl: Optional[float] = None):
+        self.max_size = max_size
+        self.ttl = ttl
+        self._entries = OrderedDict()  # id -> (expires_at, account dict)
+        self._numbers = {}             # number -> id
+        self._lock = threading.Lock()
+        self._generation = 0
+        self._stats = {'hits': 0, 'misses': 0, 'evictions': 0, 'invalidations': 0}
+
+    @property
+    def enabled(self) -> bool:
+        return self.max_size > 0
+
+    @property
+    def generation(self) -> int:
+        return self._generation
+
+    def get(self, account_id: int) -> Optional[dict]:
+        """Return the cached account dict for an id, or None"""
+        with self._lock:
+            return self._lookup(account_id)
+
+    def get_by_number(self, number: str) -> Optional[dict]:
+        """Return the cached account dict for an account number, or None"""
+        with self._lock:
+            account_id = self._numbers.get(number)
+            if account_id is None:
+                self._stats['misses'] += 1
+                return None
+            return self._lookup(account_id)
+
+    def put(self, account: dict, generation: int) -> None:
+        """Cache a serialized account loaded while `generation` was current"""
+        if not self.enabled:
+            return
+        expires_at = time.monotonic() + self.ttl if self.ttl else None
+        with self._lock:
+            if generation != self._generation:
+                return
+            self._drop(account['id'])
+            self._entries[account['id']] = (expires_at, account)
+            self._numbers[account['number']] = account['id']
+            while len(self._entries) > self.max_size:
+                oldest_id, (_, oldest) = self._entries.popitem(last=False)
+                self._numbers.pop(oldest['number'], None)
+                self._stats['evictions'] += 1
+
+    def invalidate(self, *account_ids: int) -> None:
+        """Forget the given accounts (both their id and number keys)"""
+        with self._lock:
+            self._generation += 1
+            for account_id in account_ids:
+                if self._drop(account_id):
+                    self._stats['invalidations'] += 1
+
+    def clear(self) -> None:
+        """Forget every cached account"""
+        with self._lock:
+            self._generation += 1
+            self._stats['invalidations'] += len(self._entries)
+            self._entries.clear()
+            self._numbers.clear()
+
+    def stats(self) -> dict:
+        """Hit/miss/eviction counters plus the current size"""
+        with self._lock:
+            stats = dict(self._stats)
+            stats['size'] = len(self._entries)
+        return stats
+
+    def _lookup(self, account_id: int) -> Optional[dict]:
+        entry = self._entries.get(account_id)
+        if entry is None:
+            self._stats['misses'] += 1
+            return None
+        expires_at, account = entry
+        if expires_at is not None and expires_at <= time.monotonic():
+            self._drop(account_id)
+            self._stats['misses'] += 1
+            return None
+        self._entries.move_to_end(account_id)
+        self._stats['hits'] += 1
+        return account
+
+    def _drop(self, account_id: int) -> bool:
+        entry = self._entries.pop(account_id, None)
+        if entry is None:
+            return False
+        self._numbers.pop(entry[1]['number'], None)
+        return True
+
+
+def init_cache(app):
+    """Attach an account cache to the Flask app"""
+    app.extensions['account_cache'] = AccountCache(
+        max_size=int(app.config.get('ACCOUNT_CACHE_SIZE', Config.ACCOUNT_CACHE_SIZE)),
+        ttl=float(app.config.get('ACCOUNT_CACHE_TTL', Config.ACCOUNT_CACHE_TTL)) or None,
+    )
+
+def get_account_cache() -> Optional[AccountCache]:
+    """The current app's account cache, or None outside an app context"""
+    try:
+        return current_app.extensions.get('account_cache')
+    except RuntimeError:
+        return None
@@ -1,8 +1,23 @@
 import os
-from dotenv import load_dotenv
 
-# Load variables from .env file if present
-load_dotenv()
+
+def _find_dotenv() -> str:
+    """Nearest .env in this package's directory or one of its parents, or ''"""
+    directory = os.path.dirname(os.path.abspath(__file__))
+    while True:
+        candidate = os.path.join(directory, '.env')
+        if os.path.isfile(candidate):
+            return candidate
+        parent = os.path.dirname(directory)
+        if parent == directory:
+            return ''
+        directory = parent
+
+# Load variables from .env file if present; python-dotenv is only imported when there is one
+_dotenv_path = _find_dotenv()
+if _dotenv_path:
+    from dotenv import load_dotenv
+    load_dotenv(_dotenv_path)
 
 class Config:
     # 🔐 Flask / General
@@ -12,15 +27,79 @@ class Config:
     SQLALCHEMY_DATABASE_URI = os.getenv("DATABASE_URL", "sqlite:///bms.db")
     SQLALCHEMY_TRACK_MODIFICATIONS = False
 
+    # SQLite storage profile, applied to every connection (empty value = SQLite default)
+    SQLITE_JOURNAL_MODE = os.getenv("SQLITE_JOURNAL_MODE", "WAL")
+    SQLITE_SYNCHRONOUS = os.getenv("SQLITE_SYNCHRONOUS", "NORMAL")
+    SQLITE_CACHE_SIZE = os.getenv("SQLITE_CACHE_SIZE", "-65536")  # negative = KiB
+    SQLITE_MMAP_SIZE = os.getenv("SQLITE_MMAP_SIZE", "268435456")
+    SQLITE_BUSY_TIMEOUT = os.getenv("SQLITE_BUSY_TIMEOUT", "5000")  # milliseconds
+
+    # Connection pool and lock retry
+    DB_POOL_SIZE = int(os.getenv("DB_POOL_SIZE", 10))
+    DB_MAX_OVERFLOW = int(os.getenv("DB_MAX_OVERFLOW", 20))
+    DB_POOL_TIMEOUT = float(os.getenv("DB_POOL_TIMEOUT", 30))
+    DB_LOCK_RETRIES = int(os.getenv("DB_LOCK_RETRIES", 5))
+    DB_LOCK_RETRY_BACKOFF = float(os.getenv("DB_LOCK_RETRY_BACKOFF", 0.05))
+
     # 📧 Email Configuration (Gmail)
     SMTP_SERVER = os.getenv("SMTP_SERVER", "smtp.gmail.com")
     SMTP_PORT = int(os.getenv("SMTP_PORT", 587))
     SMTP_USERNAME = os.getenv("SMTP_USERNAME", "pratikdhumal312@gmail.com")
     SMTP_PASSWORD = os.getenv("SMTP_PASSWORD", "ocvmmsnpmelojlxz")
     NOTIFICATIONS_EMAIL = os.getenv("NOTIFICATIONS_EMAIL", "jahnavichopparapu@gmail.com")
+    SMTP_USE_TLS = os.getenv("SMTP_USE_TLS", "true").lower() == "true"
+
+    # 📬 Email delivery pool
+    EMAIL_WORKERS = int(os.getenv("EMAIL_WORKERS", 2))
+    EMAIL_QUEUE_SIZE = int(os.getenv("EMAIL_QUEUE_SIZE", 1000))
+    EMAIL_BATCH_SIZE = int(os.getenv("EMAIL_BATCH_SIZE", 20))
+    EMAIL_MAX_RETRIES = int(os.getenv("EMAIL_MAX_RETRIES", 3))
+    EMAIL_RETRY_BACKOFF = float(os.getenv("EMAIL_RETRY_BACKOFF", 0.5))
+    EMAIL_ENQUEUE_TIMEOUT = float(os.getenv("EMAIL_ENQUEUE_TIMEOUT", 0.1))
+    EMAIL_IDLE_TIMEOUT = float(os.getenv("EMAIL_IDLE_TIMEOUT", 30))
 
     # ⚙️ Batch Processing
     BATCH_SIZE = int(os.getenv("BATCH_SIZE", 10))
+    SQL_BATCHES_PER_QUERY = int(os.getenv("SQL_BATCHES_PER_QUERY", 1000))
+    ACCRUAL_CHUNK_SIZE = int(os.getenv("ACCRUAL_CHUNK_SIZE", 50000))
+    # Streaming pipeline: rows per keyset query, compute threads, chunks in flight
+    BATCH_STREAM_CHUNK_SIZE = int(os.getenv("BATCH_STREAM_CHUNK_SIZE", 5000))
+    BATCH_STREAM_WORKERS = int(os.getenv("BATCH_STREAM_WORKERS", 4))
+    BATCH_STREAM_PREFETCH = int(os.getenv("BATCH_STREAM_PREFETCH", 8))
+    # Columnar snapshot: seconds re-read before the updated_at watermark on refresh
+    SNAPSHOT_REFRESH_OVERLAP = float(os.getenv("SNAPSHOT_REFRESH_OVERLAP", 5))
+    BULK_INSERT_CHUNK_SIZE = int(os.getenv("BULK_INSERT_CHUNK_SIZE", 500))
+
+    # ✍️ Group commit: single-account creates/updates from the API are queued to one writer thread,
+    # which commits up to GROUP_COMMIT_MAX_BATCH of them together after waiting at most MAX_DELAY seconds
+    GROUP_COMMIT_ENABLED = os.getenv("GROUP_COMMIT_ENABLED", "false").lower() == "true"
+    GROUP_COMMIT_MAX_BATCH = int(os.getenv("GROUP_COMMIT_MAX_BATCH", 64))
+    GROUP_COMMIT_MAX_DELAY = float(os.getenv("GROUP_COMMIT_MAX_DELAY", 0.002))
+    GROUP_COMMIT_QUEUE_SIZE = int(os.getenv("GROUP_COMMIT_QUEUE_SIZE", 1000))
+    GROUP_COMMIT_ENQUEUE_TIMEOUT = float(os.getenv("GROUP_COMMIT_ENQUEUE_TIMEOUT", 0.1))
+
+    # 🧠 Account cache (size 0 disables it; TTL 0 means no expiry)
+    ACCOUNT_CACHE_SIZE = int(os.getenv("ACCOUNT_CACHE_SIZE", 10000))
+    ACCOUNT_CACHE_TTL = float(os.getenv("ACCOUNT_CACHE_TTL", 0))
+
+    # 📄 Listing / Pagination
+    PAGE_SIZE = int(os.getenv("PAGE_SIZE", 100))
+    MAX_PAGE_SIZE = int(os.getenv("MAX_PAGE_SIZE", 1000))
+    STREAM_CHUNK_SIZE = int(os.getenv("STREAM_CHUNK_SIZE", 1000))
+    # Serve listings from Core rows through the compiled serializer instead of the ORM
+    FAST_READS = os.getenv("FAST_READS", "false").lower() == "true"
+
+    # 🚦 Admission control for the API blueprint: per-client token buckets (rate 0 = off),
+    # separate read/write concurrency caps (0 = unlimited) and a short bounded wait queue
+    ADMISSION_ENABLED = os.getenv("ADMISSION_ENABLED", "true").lower() == "true"
+    RATE_LIMIT_PER_SECOND = float(os.getenv("RATE_LIMIT_PER_SECOND", 0))
+    RATE_LIMIT_BURST = int(os.getenv("RATE_LIMIT_BURST", 20))
+    MAX_CONCURRENT_READS = int(os.getenv("MAX_CONCURRENT_READS", 64))
+    MAX_CONCURRENT_WRITES = int(os.getenv("MAX_CONCURRENT_WRITES", 8))
+    ADMISSION_QUEUE_SIZE = int(os.getenv("ADMISSION_QUEUE_SIZE", 32))
+    ADMISSION_QUEUE_TIMEOUT = float(os.getenv("ADMISSION_QUEUE_TIMEOUT", 0.5))
+    ADMISSION_RETRY_AFTER = int(os.getenv("ADMISSION_RETRY_AFTER", 1))
+    ADMISSION_CLIENT_HEADER = os.getenv("ADMISSION_CLIENT_HEADER", "")  # e.g. X-API-Key; default: remote address
 
     # Email test mode (when True, emails are not actually sent; useful for local/dev/testing)
     EMAIL_TEST_MODE = os.getenv("EMAIL_TEST_MODE", "false").lower() == "true"
@@ -28,7 +107,24 @@ class Config:
     # 🧾 Logging
     LOG_LEVEL = os.getenv("LOG_LEVEL", "INFO")
     LOG_FORMAT = os.getenv("LOG_FORMAT", "json")  # or "text"
+    # Events are rendered and written by a background thread from a bounded queue
+    LOG_ASYNC = os.getenv("LOG_ASYNC", "true").lower() == "true"
+    LOG_QUEUE_SIZE = int(os.getenv("LOG_QUEUE_SIZE", 10000))
+    # Per-event sampling ("event=probability,...") and caps ("event=max per second,...")
+    LOG_SAMPLE_RATES = os.getenv("LOG_SAMPLE_RATES", "")
+    LOG_RATE_LIMITS = os.getenv("LOG_RATE_LIMITS", "batch_processed=100,request_rejected=10")
 
     # 🌐 Scraper
     SCRAPING_TIMEOUT = int(os.getenv("SCRAPING_TIMEOUT", 30))
     USE_SELENIUM = os.getenv("USE_SELENIUM", "false").lower() == "true"
+    SCRAPER_CONCURRENCY = int(os.getenv("SCRAPER_CONCURRENCY", 20))
+    SCRAPER_PER_HOST = int(os.getenv("SCRAPER_PER_HOST", 4))
+    SCRAPER_QUEUE_SIZE = int(os.getenv("SCRAPER_QUEUE_SIZE", 100))
+    SCRAPER_RETRIES = int(os.getenv("SCRAPER_RETRIES", 3))
+    SCRAPER_RETRY_BACKOFF = float(os.getenv("SCRAPER_RETRY_BACKOFF", 0.5))
+    SCRAPER_USER_AGENT = os.getenv("SCRAPER_USER_AGENT", "BMS-Scraper/0.1")
+    SCRAPER_PARSER = os.getenv("SCRAPER_PARSER", "")  # default: lxml if installed, else html.parser
+    SCRAPER_RULES_FILE = os.getenv("SCRAPER_RULES_FILE", "")  # JSON per-site extraction rules
+    # Revalidation cache for scraped pages under the Flask instance directory
+    SCRAPER_CACHE_ENABLED = os.getenv("SCRAPER_CACHE_ENABLED", "true").lower() == "true"
+    SCRAPER_CACHE_DIR = os.getenv("SCRAPER_CACHE_DIR", "")  # default: <instance>/scrape_cache
@@ -1,36 +1,146 @@
+from datetime import datetime
+from uuid import uuid4
+from sqlalchemy import Float, bindparam, func, insert, select, type_coerce, update
 from sqlalchemy.exc import IntegrityError
-from app.db import db
-from app.models import Account
-from app.exceptions import AccountNotFoundError, DuplicateAccountError, InvalidAccountDataError
+from flask import current_app
+from app.db import begin_write, db, is_lock_error, retry_on_lock
+from app.models import Account, LedgerEntry
+from app.exceptions import (
+    AccountNotFoundError, BMSError, DuplicateAccountError, InsufficientFundsError, InvalidAccountDataError
+)
 from app.logger import logger
-from app.emailer import notify_account_created
+from app.emailer import notify_account_created, notify_accounts_created_bulk
 from app.config import Config
+from app.cache import get_account_cache
+from app.serializers import account_serializer
+from app.aggregates import apply_balance_deltas
+from app.search import fts_enabled, search_statement
 
+# Keep IN (...) lists well below SQLite's bound-parameter limit
+LOOKUP_CHUNK_SIZE = 500
+
+def setting(key: str):
+    """Read a setting from the Flask app config when available, else from Config"""
+    try:
+        return current_app.config.get(key, getattr(Config, key))
+    except RuntimeError:
+        return getattr(Config, key)
+
+def add_account(name: str, number: str, balance: float = 0.0) -> tuple[Account, list]:
+    """Insert one account in the current transaction: (account, aggregate deltas)"""
+    account = Account(name=name, number=number, balance=balance)
+    db.session.add(account)
+    db.session.flush()
+    return account, [(account.id, 1, float(balance or 0))]
+
+def account_creation_error(error: Exception, number: str) -> BMSError:
+    """Log a failed create and map it to the error its caller sees"""
+    if isinstance(error, IntegrityError):
+        logger.error("account_creation_failed", error="duplicate_number", account_number=number)
+        return DuplicateAccountError(f"Account with number {number} already exists")
+    logger.error("account_creation_failed", error=str(error), account_number=number)
+    return InvalidAccountDataError(str(error))
+
+def finish_account_creation(name: str, number: str) -> None:
+    """Log a committed create and notify about the new account"""
+    logger.info("account_created", account_number=number, name=name)
+    try:
+        # Use configured notifications email as recipient when user email is not available
+        recipient = getattr(Config, 'NOTIFICATIONS_EMAIL', None)
+        if recipient:
+            notify_account_created(recipient, name)
+    except Exception as e:
+        logger.warning("notification_failed", error=str(e), account_number=number)
+
+@retry_on_lock
 def create_account(name: str, number: str, balance: float = 0.0) -> Account:
     """Create a new account"""
     try:
-        account = Account(name=name, number=number, balance=balance)
-        db.session.add(account)
+        account, deltas = add_account(name, number, balance)
+        apply_balance_deltas(deltas)
         db.session.commit()
-        logger.info("account_created", account_number=number, name=name)
-        # Notify admin/user about the new account (non-blocking)
-        try:
-            # Use configured notifications email as recipient when user email is not available
-            recipient = getattr(Config, 'NOTIFICATIONS_EMAIL', None)
-            if recipient:
-                notify_account_created(recipient, name)
-        except Exception as e:
-            logger.warning("notification_failed", error=str(e), account_number=number)
-        return account
-    except IntegrityError:
+    except Exception as e:
         db.session.rollback()
-        logger.error("account_creation_failed", error="duplicate_number", account_number=number)
-        raise DuplicateAccountError(f"Account with number {number} already exists")
+        if is_lock_error(e):
+            raise
+        raise account_creation_error(e, number)
+    finish_account_creation(name, number)
+    return account
+
+def _existing_numbers(numbers: list[str]) -> set[str]:
+    """Return the subset of `numbers` already present in the accounts table"""
+    found = set()
+    for start in range(0, len(numbers), LOOKUP_CHUNK_SIZE):
+        chunk = numbers[start:start + LOOKUP_CHUNK_SIZE]
+        found.update(db.session.scalars(select(Account.number).where(Account.number.in_(chunk))))
+    return found
+
+def _insert_rows(rows: list[dict]) -> list[Account]:
+    """Insert rows with a single executemany inside a savepoint"""
+    with db.session.begin_nested():
+        stmt = insert(Account).returning(Account, sort_by_parameter_order=True)
+        return list(db.session.scalars(stmt, rows))
+
+@retry_on_lock
+def create_accounts_bulk(rows: list[dict]) -> tuple[list[dict], list[tuple[int, str]]]:
+    """Create many accounts in one transaction.
+
+    `rows` are already-validated dicts with name, number and balance. Created
+    accounts are returned serialized, before the commit expires them. Rows whose
+    number already exists, in the database or earlier in `rows`, are returned as
+    (index, error) pairs instead of aborting the rest of the batch.
+    """
+    errors = []
+    pending = []
+    seen = set()
+    for idx, row in enumerate(rows):
+        if row['number'] in seen:
+            errors.append((idx, f"Account with number {row['number']} already exists"))
+        else:
+            seen.add(row['number'])
+            pending.append((idx, row))
+
+    existing = _existing_numbers([row['number'] for _, row in pending])
+    if existing:
+        errors.extend((idx, f"Account with number {row['number']} already exists")
+                      for idx, row in pending if row['number'] in existing)
+        pending = [(idx, row) for idx, row in pending if row['number'] not in existing]
+
+    chunk_size = int(setting('BULK_INSERT_CHUNK_SIZE'))
+    created = []
+    try:
+        for start in range(0, len(pending), chunk_size):
+            chunk = pending[start:start + chunk_size]
+            try:
+                created.extend(_insert_rows([row for _, row in chunk]))
+            except IntegrityError:
+                # A concurrent writer claimed some of these numbers; isolate them
+                for idx, row in chunk:
+                    try:
+                        created.extend(_insert_rows([row]))
+                    except IntegrityError:
+                        errors.append((idx, f"Account with number {row['number']} already exists"))
+        created = [account.to_dict() for account in created]
+        apply_balance_deltas((account['id'], 1, account['balance']) for account in created)
+        db.session.commit()
     except Exception as e:
         db.session.rollback()
-        logger.error("account_creation_failed", error=str(e), account_number=number)
+        if is_lock_error(e):
+            raise
+        logger.error("bulk_account_creation_failed", error=str(e), count=len(rows))
         raise InvalidAccountDataError(str(e))
 
+    errors.sort()
+    logger.info("accounts_bulk_created", created=len(created), failed=len(errors))
+    if created:
+        try:
+            recipient = getattr(Config, 'NOTIFICATIONS_EMAIL', None)
+            if recipient:
+                notify_accounts_created_bulk(recipient, [account['name'] for account in created])
+        except Exception as e:
+            logger.warning("notification_failed", error=str(e), count=len(created))
+    return created, errors
+
 def get_account(account_id: int) -> Account:
     """Get account by ID"""
     account = Account.query.get(account_id)
@@ -47,32 +157,331 @@ def get_account_by_number(number: str) -> Account:
         raise AccountNotFoundError(f"Account with number {number} not found")
     return account
 
+def _select_account_dict(criterion):
+    """Fetch one serialized account with a Core select, skipping the ORM"""
+    serializer = account_serializer()
+    row = db.session.execute(serializer.select().where(criterion)).first()
+    return None if row is None else serializer.to_dict(row)
+
+def _load_account_dict(account_id: int) -> dict:
+    account = _select_account_dict(Account.id == account_id)
+    if account is None:
+        logger.error("account_not_found", account_id=account_id)
+        raise AccountNotFoundError(f"Account with ID {account_id} not found")
+    return account
+
+def _load_account_dict_by_number(number: str) -> dict:
+    account = _select_account_dict(Account.number == number)
+    if account is None:
+        logger.error("account_not_found", account_number=number)
+        raise AccountNotFoundError(f"Account with number {number} not found")
+    return account
+
+def get_account_dict(account_id: int) -> dict:
+    """Get a serialized account by ID, served from the account cache when possible"""
+    cache = get_account_cache()
+    if cache is None or not cache.enabled:
+        return _load_account_dict(account_id)
+    account = cache.get(account_id)
+    if account is None:
+        generation = cache.generation
+        account = _load_account_dict(account_id)
+        cache.put(account, generation)
+    return account
+
+def get_account_dict_by_number(number: str) -> dict:
+    """Get a serialized account by number, served from the account cache when possible"""
+    cache = get_account_cache()
+    if cache is None or not cache.enabled:
+        return _load_account_dict_by_number(number)
+    account = cache.get_by_number(number)
+    if account is None:
+        generation = cache.generation
+        account = _load_account_dict_by_number(number)
+        cache.put(account, generation)
+    return account
+
+def invalidate_cached(*account_ids: int) -> None:
+    """Drop `account_ids` from the account cache, when one is configured"""
+    cache = get_account_cache()
+    if cache is not None:
+        cache.invalidate(*account_ids)
+
 def list_accounts() -> list[Account]:
     """List all accounts"""
     return Account.query.all()
 
+def list_accounts_page(after: int = 0, limit: int = 100) -> list[Account]:
+    """List up to `limit` accounts with an id greater than `after`, in id order"""
+    return (Account.query
+            .filter(Account.id > after)
+            .order_by(Account.id)
+            .limit(limit)
+            .all())
+
+def list_account_rows(after: int = None, limit: int = None) -> list:
+    """List accounts as plain Core rows for `account_serializer()`.
+
+    Without arguments this returns every account, like `list_accounts`;
+    with `after`/`limit` it returns one keyset page in id order.
+    """
+    stmt = account_serializer().select()
+    if after is not None or limit is not None:
+        stmt = stmt.where(Account.id > (after or 0)).order_by(Account.id)
+    if limit is not None:
+        stmt = stmt.limit(limit)
+    return db.session.execute(stmt).all()
+
+def iter_account_row_chunks(after: int = 0, chunk_size: int = 1000):
+    """Yield lists of Core account rows in id order, `chunk_size` rows per query"""
+    while True:
+        chunk = list_account_rows(after, chunk_size)
+        if not chunk:
+            return
+        yield chunk
+        if len(chunk) < chunk_size:
+            return
+        after = chunk[-1].id
+
+def iter_account_chunks(after: int = 0, chunk_size: int = 1000):
+    """Yield lists of accounts in id order, reading `chunk_size` rows per query"""
+    while True:
+        chunk = list_accounts_page(after, chunk_size)
+        if not chunk:
+            return
+        yield chunk
+        if len(chunk) < chunk_size:
+            return
+        after = chunk[-1].id
+
+def search_account_rows(criteria: dict, limit: int) -> list:
+    """One page of GET /accounts/search as Core rows for `account_serializer()`"""
+    stmt = search_statement(criteria, limit, db.engine.dialect.name, fts_enabled())
+    return db.session.execute(stmt).all()
+
+def change_account(account_id: int, **fields) -> tuple[Account, list]:
+    """Apply field changes to one account in the current transaction: (account, aggregate deltas)"""
+    account = get_account(account_id)
+    old_balance = float(account.balance or 0)
+    for key, value in fields.items():
+        setattr(account, key, value)
+    db.session.flush()
+    deltas = [(account_id, 0, float(fields['balance'] or 0) - old_balance)] if 'balance' in fields else []
+    return account, deltas
+
+def account_update_error(error: Exception, account_id: int) -> BMSError:
+    """Log a failed update and map it to the error its caller sees"""
+    if isinstance(error, BMSError):
+        return error
+    logger.error("account_update_failed", error=str(error), account_id=account_id)
+    return InvalidAccountDataError(str(error))
+
+def finish_account_update(account_id: int, updates: dict) -> None:
+    """Drop the cached copy of a committed update and log it"""
+    invalidate_cached(account_id)
+    logger.info("account_updated", account_id=account_id, updates=updates)
+
+@retry_on_lock
 def update_account(account_id: int, **kwargs) -> Account:
     """Update account details"""
-    account = get_account(account_id)
+    begin_write()  # the balance delta is computed from the account read here
+    try:
+        account, deltas = change_account(account_id, **kwargs)
+        apply_balance_deltas(deltas)
+        db.session.commit()
+    except Exception as e:
+        db.session.rollback()
+        if is_lock_error(e):
+            raise
+        raise account_update_error(e, account_id)
+    finish_account_update(account_id, kwargs)
+    return account
+
+def _current_balances(account_ids: list[int]) -> dict[int, float]:
+    """Map the `account_ids` present in the accounts table to their balances"""
+    found = {}
+    balance = type_coerce(Account.balance, Float)
+    for start in range(0, len(account_ids), LOOKUP_CHUNK_SIZE):
+        chunk = account_ids[start:start + LOOKUP_CHUNK_SIZE]
+        found.update(db.session.execute(select(Account.id, balance).where(Account.id.in_(chunk))).all())
+    return found
+
+def merge_bulk_changes(changes: list[tuple[int, dict]]) -> dict[int, dict]:
+    """Fold several changes to one account together, later fields winning"""
+    merged = {}
+    for account_id, fields in changes:
+        merged.setdefault(account_id, {}).update(fields)
+    return merged
+
+def group_bulk_changes(merged: dict[int, dict], existing) -> dict[tuple, list[dict]]:
+    """executemany parameters for each set of changed fields, skipping missing accounts"""
+    groups = {}
+    for account_id, fields in merged.items():
+        if account_id in existing:
+            params = {f"b_{name}": value for name, value in fields.items()}
+            groups.setdefault(tuple(sorted(fields)), []).append(dict(params, b_id=account_id))
+    return groups
+
+def bulk_update_statement(names: tuple, now: datetime):
+    """UPDATE of the `names` columns keyed by b_id, for one executemany group"""
+    table = Account.__table__
+    return (update(table)
+            .where(table.c.id == bindparam('b_id'))
+            .values(updated_at=now, **{name: bindparam(f"b_{name}") for name in names}))
+
+def bulk_balance_deltas(merged: dict[int, dict], existing: dict[int, float]) -> list:
+    return [(account_id, 0, fields['balance'] - (existing[account_id] or 0.0))
+            for account_id, fields in merged.items()
+            if account_id in existing and 'balance' in fields]
+
+@retry_on_lock
+def update_accounts_bulk(changes: list[tuple[int, dict]]) -> tuple[int, list[int]]:
+    """Apply many (account_id, fields) changes in one transaction.
+
+    `changes` are already-validated; several changes to one account are merged
+    in order, as if applied one by one. Accounts are grouped by the set of
+    fields they change and each group is one executemany UPDATE. Returns the
+    number of accounts updated and the indexes of changes whose id was not found.
+    """
+    merged = merge_bulk_changes(changes)
+    begin_write()  # the balance deltas are computed from these reads
+    existing = _current_balances(list(merged))
+    not_found = [idx for idx, (account_id, _) in enumerate(changes) if account_id not in existing]
+    groups = group_bulk_changes(merged, existing)
+
+    now = datetime.utcnow()
     try:
-        for key, value in kwargs.items():
-            setattr(account, key, value)
+        for names, params in groups.items():
+            db.session.execute(bulk_update_statement(names, now), params)
+        apply_balance_deltas(bulk_balance_deltas(merged, existing))
         db.session.commit()
-        logger.info("account_updated", account_id=account_id, updates=kwargs)
-        return account
     except Exception as e:
         db.session.rollback()
-        logger.error("account_update_failed", error=str(e), account_id=account_id)
+        if is_lock_error(e):
+            raise
+        logger.error("bulk_account_update_failed", error=str(e), count=len(changes))
         raise InvalidAccountDataError(str(e))
 
+    updated = [account_id for account_id in merged if account_id in existing]
+    invalidate_cached(*updated)
+    logger.info("accounts_bulk_updated", updated=len(updated), statements=len(groups),
+                not_found=len(not_found))
+    return len(updated), not_found
+
+@retry_on_lock
 def delete_account(account_id: int) -> None:
     """Delete an account"""
-    account = get_account(account_id)
+    begin_write()  # the aggregates lose the balance read here
     try:
+        account = get_account(account_id)
+        apply_balance_deltas([(account_id, -1, -float(account.balance or 0))])
         db.session.delete(account)
         db.session.commit()
+        invalidate_cached(account_id)
         logger.info("account_deleted", account_id=account_id)
+    except AccountNotFoundError:
+        db.session.rollback()
+        raise
     except Exception as e:
         db.session.rollback()
+        if is_lock_error(e):
+            raise
         logger.error("account_deletion_failed", error=str(e), account_id=account_id)
-        raise InvalidAccountDataError(str(e))
\ No newline at end of file
+        raise InvalidAccountDataError(str(e))
+
+def _transfer_failure(account_id: int, amount: float) -> Exception:
+    """Why a conditional balance UPDATE matched no row"""
+    balance = db.session.scalar(select(Account.balance).where(Account.id == account_id))
+    if balance is None:
+        logger.error("account_not_found", account_id=account_id)
+        return AccountNotFoundError(f"Account with ID {account_id} not found")
+    return InsufficientFundsError(f"Account with ID {account_id} has insufficient funds for {amount:.2f}")
+
+def transfer_amount(from_id: int, to_id: int, amount: float) -> float:
+    """The amount rounded to cents; rejects non-positive amounts and self-transfers"""
+    amount = round(float(amount), 2)
+    if amount <= 0:
+        raise InvalidAccountDataError("Transfer amount must be positive")
+    if from_id == to_id:
+        raise InvalidAccountDataError("Cannot transfer to the same account")
+    return amount
+
+def transfer_legs(from_id: int, to_id: int, amount: float) -> list[tuple[int, float]]:
+    """(account_id, delta) of both legs in ascending id order, the order locks are taken in"""
+    return sorted([(from_id, -amount), (to_id, amount)])
+
+def transfer_leg_statement(account_id: int, delta: float, amount: float, now: datetime):
+    """Conditional balance UPDATE for one leg, returning the new balance (no row when refused)"""
+    table = Account.__table__
+    stmt = (update(table)
+            .where(table.c.id == account_id)
+            .values(balance=func.round(table.c.balance + delta, 2), updated_at=now)
+            .returning(type_coerce(table.c.balance, Float)))
+    if delta < 0:
+        stmt = stmt.where(table.c.balance >= amount)
+    return stmt
+
+def ledger_rows(transfer_id, from_id, to_id, amount, balances, memo, now) -> list[dict]:
+    return [{'transfer_id': transfer_id, 'account_id': account_id, 'amount': delta,
+             'balance_after': balances[account_id], 'memo': memo, 'created_at': now}
+            for account_id, delta in ((from_id, -amount), (to_id, amount))]
+
+@retry_on_lock
+def transfer_funds(from_id: int, to_id: int, amount: float, memo: str = None) -> dict:
+    """Move `amount` between two accounts and append both legs to the ledger.
+
+    Balances change only through `UPDATE ... SET balance = balance + :delta`,
+    the debit guarded by `balance >= :amount`, so concurrent transfers can
+    neither overdraw an account nor lose an update. Both UPDATEs run in
+    ascending account id order, so every transfer takes its locks in the same
+    order and two transfers can never wait on each other.
+    """
+    amount = transfer_amount(from_id, to_id, amount)
+    now = datetime.utcnow()
+    balances = {}
+    try:
+        for account_id, delta in transfer_legs(from_id, to_id, amount):
+            balance = db.session.execute(transfer_leg_statement(account_id, delta, amount, now)).scalar()
+            if balance is None:
+                raise _transfer_failure(account_id, amount)
+            balances[account_id] = balance
+
+        apply_balance_deltas([(from_id, 0, -amount), (to_id, 0, amount)])
+        transfer_id = uuid4().hex
+        db.session.execute(insert(LedgerEntry),
+                           ledger_rows(transfer_id, from_id, to_id, amount, balances, memo, now))
+        db.session.commit()
+    except (AccountNotFoundError, InsufficientFundsError) as e:
+        db.session.rollback()
+        logger.warning("transfer_rejected", error=str(e), from_id=from_id, to_id=to_id, amount=amount)
+        raise
+    except Exception as e:
+        db.session.rollback()
+        if is_lock_error(e):
+            raise
+        logger.error("transfer_failed", error=str(e), from_id=from_id, to_id=to_id, amount=amount)
+        raise InvalidAccountDataError(str(e))
+
+    invalidate_cached(from_id, to_id)
+    logger.info("transfer_completed", transfer_id=transfer_id, from_id=from_id, to_id=to_id, amount=amount)
+    return transfer_result(transfer_id, from_id, to_id, amount, balances, memo, now)
+
+def transfer_result(transfer_id, from_id, to_id, amount, balances, memo, now) -> dict:
+    return {
+        'transfer_id': transfer_id,
+        'from_id': from_id,
+        'to_id': to_id,
+        'amount': amount,
+        'from_balance': balances[from_id],
+        'to_balance': balances[to_id],
+        'memo': memo,
+        'created_at': now.isoformat()
+    }
+
+def list_ledger_entries(account_id: int, after: int = 0, limit: int = 100) -> list[LedgerEntry]:
+    """One keyset page of an account's ledger, oldest first"""
+    return (LedgerEntry.query
+            .filter(LedgerEntry.account_id == account_id, LedgerEntry.id > after)
+            .order_by(LedgerEntry.id)
+            .limit(limit)
+            .all())
@@ -1,14 +1,213 @@
+import functools
+import hashlib
+import random
+import time
+from datetime import datetime
+from flask import current_app
 from flask_sqlalchemy import SQLAlchemy
+from sqlalchemy import delete, event, select
+from sqlalchemy.engine import make_url
+from sqlalchemy.exc import DBAPIError, IntegrityError, OperationalError
+from app.config import Config
+from app.exceptions import DatabaseBusyError
+from app.logger import logger
 
 db = SQLAlchemy()
 
+# Config key -> SQLite pragma applied to every new connection
+SQLITE_PRAGMAS = {
+    'SQLITE_JOURNAL_MODE': 'journal_mode',
+    'SQLITE_SYNCHRONOUS': 'synchronous',
+    'SQLITE_CACHE_SIZE': 'cache_size',
+    'SQLITE_MMAP_SIZE': 'mmap_size',
+    'SQLITE_BUSY_TIMEOUT': 'busy_timeout',
+}
+
+def _setting(config, key):
+    return config.get(key, getattr(Config, key))
+
+def is_memory_url(url) -> bool:
+    """True for in-memory SQLite, which lives on a single static connection"""
+    url = make_url(url)
+    return url.get_backend_name() == 'sqlite' and url.database in (None, '', ':memory:')
+
+def engine_options(config) -> dict:
+    """Pool sizing for file-backed databases, merged over any explicit options"""
+    options = {}
+    # In-memory SQLite uses a single static connection; nothing to size
+    if not is_memory_url(config['SQLALCHEMY_DATABASE_URI']):
+        options.update(
+            pool_size=int(_setting(config, 'DB_POOL_SIZE')),
+            max_overflow=int(_setting(config, 'DB_MAX_OVERFLOW')),
+            pool_timeout=float(_setting(config, 'DB_POOL_TIMEOUT')),
+        )
+    options.update(config.get('SQLALCHEMY_ENGINE_OPTIONS') or {})
+    return options
+
+def install_pragmas(config, engine) -> None:
+    """Apply the configured storage profile to each new SQLite connection.
+
+    `engine` is a sync Engine; for an AsyncEngine pass its `sync_engine`.
+    """
+    if engine.dialect.name != 'sqlite':
+        return
+    pragmas = [(pragma, _setting(config, key)) for key, pragma in SQLITE_PRAGMAS.items()]
+    pragmas = [(pragma, value) for pragma, value in pragmas if value not in (None, '')]
+    if not pragmas:
+        return
+
+    @event.listens_for(engine, 'connect')
+    def apply_pragmas(dbapi_connection, connection_record):
+        cursor = dbapi_connection.cursor()
+        try:
+            for pragma, value in pragmas:
+                cursor.execute(f"PRAGMA {pragma}={value}")
+        finally:
+            cursor.close()
+
+def install_transaction_control(config, engine) -> None:
+    """Let SQLAlchemy, rather than pysqlite, start SQLite transactions.
+
+    pysqlite only sends BEGIN before INSERT/UPDATE/DELETE, so reads ran in
+    autocommit and a SAVEPOINT outside a write opened its own transaction,
+    committed by its RELEASE. With pysqlite's handling off, every transaction
+    starts with BEGIN and savepoints nest inside it. A connection with the
+    `sqlite_begin` execution option set to 'IMMEDIATE' takes the write lock
+    at BEGIN (see `begin_write`).
+
+    In-memory databases share one connection between all sessions and keep
+    pysqlite's behaviour. `engine` is a sync Engine; for an AsyncEngine pass
+    its `sync_engine`.
+    """
+    if engine.dialect.name != 'sqlite' or is_memory_url(config['SQLALCHEMY_DATABASE_URI']):
+        return
+
+    @event.listens_for(engine, 'connect')
+    def disable_pysqlite_transactions(dbapi_connection, connection_record):
+        dbapi_connection.isolation_level = None
+
+    @event.listens_for(engine, 'begin')
+    def begin(conn):
+        mode = conn.get_execution_options().get('sqlite_begin')
+        conn.exec_driver_sql(f"BEGIN {mode}" if mode else "BEGIN")
+
+# Session.connection() options that make a new SQLite transaction take the write lock at BEGIN
+WRITE_TRANSACTION = {'sqlite_begin': 'IMMEDIATE'}
+
+def begin_write() -> None:
+    """Start the session's transaction holding SQLite's write lock.
+
+    Call before reading values that a write is computed from (a balance
+    delta, say): no other writer can commit between the read and the
+    commit. A transaction already open in the session is committed first,
+    since its reads may predate the lock; write units commit the session
+    anyway.
+    """
+    if db.session().in_transaction():
+        db.session.commit()
+    db.session.connection(execution_options=WRITE_TRANSACTION)
+
 def init_db(app):
     """Initialize the database with the Flask app"""
+    app.config['SQLALCHEMY_ENGINE_OPTIONS'] = engine_options(app.config)
     db.init_app(app)
-    
+
     with app.app_context():
+        install_pragmas(app.config, db.engine)
+        install_transaction_control(app.config, db.engine)
+
         # Import models here to ensure they are registered
-        from app.models import Account  # noqa
-        
-        # Create all tables
-        db.create_all()
\ No newline at end of file
+        from app.models import Account, AccountAggregate, JobCheckpoint, LedgerEntry, SchemaVersion  # noqa
+
+        # Create missing tables, unless the schema is already current
+        ensure_schema()
+
+def schema_fingerprint(metadata) -> str:
+    """Hash of every table's columns, types, keys and indexes"""
+    parts = []
+    for table in metadata.sorted_tables:
+        parts.append(f"table {table.name}")
+        parts.extend(f"column {column.name} {column.type!r} null={column.nullable} pk={column.primary_key} "
+                     f"unique={column.unique} fk={sorted(fk.target_fullname for fk in column.foreign_keys)}"
+                     for column in table.columns)
+        parts.extend(f"index {index.name} {[column.name for column in index.columns]} {index.unique}"
+                     for index in sorted(table.indexes, key=lambda index: index.name or ''))
+    return hashlib.sha256('\n'.join(parts).encode()).hexdigest()
+
+def ensure_schema() -> bool:
+    """Run `create_all` only when the stored schema fingerprint is missing or stale.
+
+    A current database costs one SELECT at boot instead of a table-exists
+    check per model. Returns True when DDL ran. Missing tables and indexes
+    are added (also indexes declared later on existing tables); existing
+    columns are not altered.
+    """
+    fingerprint = schema_fingerprint(db.metadata)
+    table = db.metadata.tables['schema_version']
+    try:
+        with db.engine.connect() as conn:
+            current = conn.execute(select(table.c.fingerprint).where(table.c.id == 1)).scalar()
+    except DBAPIError:
+        current = None  # no schema_version table yet
+    if current == fingerprint:
+        return False
+
+    db.create_all()
+    # create_all only creates indexes together with their table
+    for model_table in db.metadata.sorted_tables:
+        for index in model_table.indexes:
+            index.create(db.engine, checkfirst=True)
+    try:
+        with db.engine.begin() as conn:
+            conn.execute(delete(table))
+            conn.execute(table.insert().values(id=1, fingerprint=fingerprint, updated_at=datetime.utcnow()))
+    except IntegrityError:
+        pass  # another process booting at the same time recorded it first
+    logger.info("schema_created", fingerprint=fingerprint[:12], previous=current and current[:12])
+    return True
+
+def is_lock_error(error: Exception) -> bool:
+    """True for SQLite's transient 'database is locked/busy' errors"""
+    message = str(error).lower()
+    return isinstance(error, OperationalError) and (
+        'database is locked' in message or 'database is busy' in message)
+
+def lock_retry_settings():
+    try:
+        retries = int(current_app.config.get('DB_LOCK_RETRIES', Config.DB_LOCK_RETRIES))
+        backoff = float(current_app.config.get('DB_LOCK_RETRY_BACKOFF', Config.DB_LOCK_RETRY_BACKOFF))
+    except RuntimeError:
+        retries, backoff = Config.DB_LOCK_RETRIES, Config.DB_LOCK_RETRY_BACKOFF
+    return retries, backoff
+
+def lock_retry_delay(func_name: str, error: Exception, attempt: int, retries: int, backoff: float) -> float:
+    """Seconds to wait before retry `attempt + 1`, or DatabaseBusyError when out of retries"""
+    if attempt >= retries:
+        logger.error("database_locked", operation=func_name, attempts=attempt + 1)
+        raise DatabaseBusyError("Database is busy, please retry") from error
+    delay = random.uniform(0, backoff * 2 ** (attempt + 1))
+    logger.warning("database_locked_retry", operation=func_name,
+                   attempt=attempt + 1, delay=round(delay, 4))
+    return delay
+
+def retry_on_lock(func):
+    """Re-run a unit of work when SQLite reports the database as locked.
+
+    Retries use exponential backoff with full jitter so competing writers
+    spread out. When retries run out, DatabaseBusyError is raised.
+    """
+    @functools.wraps(func)
+    def wrapper(*args, **kwargs):
+        retries, backoff = lock_retry_settings()
+        attempt = 0
+        while True:
+            try:
+                return func(*args, **kwargs)
+            except OperationalError as e:
+                if not is_lock_error(e):
+                    raise
+                db.session.rollback()
+                delay = lock_retry_delay(func.__name__, e, attempt, retries, backoff)
+                attempt += 1
+                time.sleep(delay)
+    return wrapper
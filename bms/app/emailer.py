@@ -1,66 +1,417 @@
-import smtplib
-from threading import Thread
-from email.mime.text import MIMEText
-from email.mime.multipart import MIMEMultipart
-from email.mime.image import MIMEImage
+import asyncio
+import atexit
+import queue
+import threading
+import time
 from app.config import Config
 from app.logger import logger  # optional: your existing logger
 
-def send_gmail_async(to_address, subject, body, image_path=None):
-    """
-    Send Gmail email asynchronously with optional image attachment.
+# smtplib, the email.mime stack and aiosmtplib are imported on first use so that
+# importing this module (and app.crud with it) stays cheap
+_NOT_LOADED = object()
+_aiosmtplib = _NOT_LOADED
+
+
+def _async_smtp():
+    """aiosmtplib, or None when it is not installed"""
+    global _aiosmtplib
+    if _aiosmtplib is _NOT_LOADED:
+        try:
+            import aiosmtplib
+        except ImportError:  # optional: without it the async sender hands mail to the delivery pool
+            aiosmtplib = None
+        _aiosmtplib = aiosmtplib
+    return _aiosmtplib
+
+_STOP = object()
+
+
+def _remaining(deadline):
+    """Seconds left until a time.monotonic() `deadline`, or None when there is none"""
+    return None if deadline is None else max(0.0, deadline - time.monotonic())
+
+def _build_message(sender, to_address, subject, body, image_path=None):
+    """Build a MIME message with an optional image attachment."""
+    from email.mime.image import MIMEImage
+    from email.mime.multipart import MIMEMultipart
+    from email.mime.text import MIMEText
+    msg = MIMEMultipart()
+    msg["From"] = sender
+    msg["To"] = to_address
+    msg["Subject"] = subject
+
+    # Add plain text body
+    msg.attach(MIMEText(body, "plain"))
+
+    # Optional image attachment
+    if image_path:
+        try:
+            with open(image_path, "rb") as f:
+                img_data = f.read()
+            image_name = image_path.split("\\")[-1].split("/")[-1]
+            msg.attach(MIMEImage(img_data, name=image_name))
+            logger.info("email_image_attached", image=image_name)
+        except Exception as e:
+            logger.warning("email_image_attach_failed", error=str(e), image_path=image_path)
+    return msg
+
+
+def _is_transient(error):
+    """True for SMTP failures worth retrying (4xx replies, dropped connections)."""
+    import smtplib
+    if isinstance(error, smtplib.SMTPResponseException):
+        return 400 <= error.smtp_code < 500
+    if isinstance(error, smtplib.SMTPRecipientsRefused):
+        return all(400 <= code < 500 for code, _ in error.recipients.values())
+    if isinstance(error, smtplib.SMTPServerDisconnected):
+        return True
+    if isinstance(error, smtplib.SMTPException):
+        return False
+    return isinstance(error, OSError)
+
+
+class EmailDeliveryPool:
+    """Bounded email queue served by a fixed set of SMTP worker threads.
+
+    Each worker keeps one authenticated connection open, drains up to
+    `batch_size` queued messages per wake-up and sends them over that
+    connection. Idle connections are closed after `idle_timeout` seconds.
+    When the queue is full, `submit` waits up to `enqueue_timeout` seconds
+    and then drops the message, counting it in `stats()["dropped"]`.
+    Transient failures are retried with exponential backoff on a fresh
+    connection.
     """
 
-    def _send_email():
+    def __init__(self, host, port, username=None, password=None, use_tls=True,
+                 workers=2, queue_size=1000, batch_size=20, max_retries=3,
+                 retry_backoff=0.5, enqueue_timeout=0.1, idle_timeout=30.0,
+                 smtp_timeout=30.0):
+        self.host = host
+        self.port = port
+        self.username = username
+        self.password = password
+        self.use_tls = use_tls
+        self.batch_size = batch_size
+        self.max_retries = max_retries
+        self.retry_backoff = retry_backoff
+        self.enqueue_timeout = enqueue_timeout
+        self.idle_timeout = idle_timeout
+        self.smtp_timeout = smtp_timeout
+        self._queue = queue.Queue(maxsize=queue_size)
+        self._lock = threading.Lock()
+        self._stats = {'sent': 0, 'failed': 0, 'dropped': 0, 'retried': 0, 'connections': 0}
+        self._closed = False
+        self._workers = [threading.Thread(target=self._run, name=f"email-worker-{i}", daemon=True)
+                         for i in range(workers)]
+        for worker in self._workers:
+            worker.start()
+
+    def submit(self, message):
+        """Queue a message for delivery; returns False when it had to be dropped."""
+        if self._closed:
+            raise RuntimeError("Email delivery pool is closed")
+        try:
+            self._queue.put(message, timeout=self.enqueue_timeout)
+            return True
+        except queue.Full:
+            self._count('dropped')
+            logger.warning("email_dropped", reason="queue_full", to=message["To"])
+            return False
+
+    def stats(self):
+        """Counters plus the current queue depth."""
+        with self._lock:
+            stats = dict(self._stats)
+        stats['queued'] = self._queue.qsize()
+        return stats
+
+    def flush(self, timeout=None):
+        """Wait until every queued message has been sent or given up on."""
+        deadline = None if timeout is None else time.monotonic() + timeout
+        with self._queue.all_tasks_done:
+            while self._queue.unfinished_tasks:
+                remaining = None if deadline is None else deadline - time.monotonic()
+                if remaining is not None and remaining <= 0:
+                    return False
+                self._queue.all_tasks_done.wait(remaining)
+        return True
+
+    def close(self, timeout=None):
+        """Deliver what is queued, then stop the workers; gives up after `timeout` seconds."""
+        if self._closed:
+            return
+        self._closed = True
+        deadline = None if timeout is None else time.monotonic() + timeout
+        try:
+            for _ in self._workers:
+                # A full queue behind a down SMTP server must not hold up shutdown
+                self._queue.put(_STOP, timeout=_remaining(deadline))
+        except queue.Full:
+            pass
+        for worker in self._workers:
+            worker.join(_remaining(deadline))
+        if any(worker.is_alive() for worker in self._workers):
+            logger.warning("email_pool_close_timeout", undelivered=self._queue.qsize())
+
+    def _count(self, key, amount=1):
+        with self._lock:
+            self._stats[key] += amount
+
+    def _connect(self):
+        import smtplib
+        server = smtplib.SMTP(self.host, self.port, timeout=self.smtp_timeout)
+        try:
+            if self.use_tls:
+                server.starttls()
+            if self.username:
+                server.login(self.username, self.password)
+        except Exception:
+            self._disconnect(server)
+            raise
+        self._count('connections')
+        return server
+
+    @staticmethod
+    def _disconnect(server):
+        if server is None:
+            return None
         try:
-            # Create email
-            msg = MIMEMultipart()
-            msg["From"] = Config.SMTP_USERNAME  # sender email
-            msg["To"] = to_address
-            msg["Subject"] = subject
+            server.quit()
+        except Exception:
+            server.close()
+        return None
 
-            # Add plain text body
-            msg.attach(MIMEText(body, "plain"))
+    def _run(self):
+        server = None
+        stopping = False
+        while not stopping:
+            try:
+                batch = [self._queue.get(timeout=self.idle_timeout)]
+            except queue.Empty:
+                server = self._disconnect(server)
+                continue
+            # Stop draining at a sentinel so every worker receives its own
+            while len(batch) < self.batch_size and batch[-1] is not _STOP:
+                try:
+                    batch.append(self._queue.get_nowait())
+                except queue.Empty:
+                    break
+            for message in batch:
+                if message is _STOP:
+                    stopping = True
+                else:
+                    server = self._deliver(server, message)
+                self._queue.task_done()
+        self._disconnect(server)
+
+    def _deliver(self, server, message):
+        """Send one message, reconnecting and retrying transient failures."""
+        attempt = 0
+        while True:
+            try:
+                if server is None:
+                    server = self._connect()
+                server.send_message(message)
+                self._count('sent')
+                logger.info("email_sent", to=message["To"])
+                return server
+            except Exception as e:
+                server = self._disconnect(server)
+                if not _is_transient(e) or attempt >= self.max_retries:
+                    self._count('failed')
+                    logger.error("email_send_failed", error=str(e), to=message["To"], attempts=attempt + 1)
+                    return server
+                attempt += 1
+                self._count('retried')
+                time.sleep(self.retry_backoff * 2 ** (attempt - 1))
+
+
+class AsyncEmailSender:
+    """Email delivery as tasks on the running event loop.
+
+    `send` builds the message, schedules its SMTP exchange with aiosmtplib
+    and returns at once; at most `concurrency` deliveries talk to the server
+    at a time and transient failures are retried with exponential backoff.
+    More than `max_pending` unfinished deliveries drop new messages. Without
+    aiosmtplib installed, messages go to the threaded delivery pool instead.
+    """
+
+    def __init__(self, host, port, username=None, password=None, use_tls=True,
+                 concurrency=2, max_pending=1000, max_retries=3, retry_backoff=0.5,
+                 smtp_timeout=30.0, test_mode=False, from_address=None):
+        self.host = host
+        self.port = port
+        self.username = username
+        self.password = password
+        self.use_tls = use_tls
+        self.max_pending = max_pending
+        self.max_retries = max_retries
+        self.retry_backoff = retry_backoff
+        self.smtp_timeout = smtp_timeout
+        self.test_mode = test_mode
+        self.from_address = from_address or username
+        self._semaphore = asyncio.Semaphore(concurrency)
+        self._tasks = set()
+        self._stats = {'sent': 0, 'failed': 0, 'dropped': 0, 'retried': 0, 'connections': 0}
+
+    @classmethod
+    def from_config(cls, config):
+        """A sender for a Flask-style config mapping, defaulting to Config"""
+        def setting(key):
+            return config.get(key, getattr(Config, key))
+        return cls(
+            host=setting('SMTP_SERVER'),
+            port=int(setting('SMTP_PORT')),
+            username=setting('SMTP_USERNAME'),
+            password=setting('SMTP_PASSWORD'),
+            use_tls=setting('SMTP_USE_TLS'),
+            concurrency=int(setting('EMAIL_WORKERS')),
+            max_pending=int(setting('EMAIL_QUEUE_SIZE')),
+            max_retries=int(setting('EMAIL_MAX_RETRIES')),
+            retry_backoff=float(setting('EMAIL_RETRY_BACKOFF')),
+            test_mode=bool(setting('EMAIL_TEST_MODE')),
+        )
 
-            # Optional image attachment
-            if image_path:
+    def send(self, to_address, subject, body, image_path=None):
+        """Schedule delivery from inside the event loop; returns False if the message was dropped."""
+        if self.test_mode:
+            logger.info("email_test_mode", to=to_address, subject=subject)
+            return True
+        msg = _build_message(self.from_address, to_address, subject, body, image_path)
+        if _async_smtp() is None:
+            return get_delivery_pool().submit(msg)
+        if len(self._tasks) >= self.max_pending:
+            self._stats['dropped'] += 1
+            logger.warning("email_dropped", reason="queue_full", to=to_address)
+            return False
+        task = asyncio.get_running_loop().create_task(self._deliver(msg))
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+        return True
+
+    def stats(self):
+        """Counters plus the number of unfinished deliveries."""
+        if _async_smtp() is None and not self.test_mode:
+            return delivery_stats()
+        stats = dict(self._stats)
+        stats['queued'] = len(self._tasks)
+        return stats
+
+    async def close(self, timeout=None):
+        """Wait for scheduled deliveries; returns False if some were still running at the timeout."""
+        if not self._tasks:
+            return True
+        _, pending = await asyncio.wait(set(self._tasks), timeout=timeout)
+        return not pending
+
+    async def _deliver(self, message):
+        attempt = 0
+        async with self._semaphore:
+            while True:
                 try:
-                    with open(image_path, "rb") as f:
-                        img_data = f.read()
-                    image_name = image_path.split("\\")[-1].split("/")[-1]
-                    msg.attach(MIMEImage(img_data, name=image_name))
-                    logger.info(f"✅ Attached image: {image_name}")
+                    self._stats['connections'] += 1
+                    await _async_smtp().send(message, hostname=self.host, port=self.port,
+                                          username=self.username or None, password=self.password or None,
+                                          start_tls=self.use_tls, timeout=self.smtp_timeout)
+                    self._stats['sent'] += 1
+                    logger.info("email_sent", to=message["To"])
+                    return
                 except Exception as e:
-                    logger.warning(f"⚠️ Failed to attach image: {e}")
-
-            # Check test mode: if enabled, log and skip real send
-            if getattr(Config, 'EMAIL_TEST_MODE', False):
-                logger.info(f"[TEST MODE] Would send email to {to_address}: {subject}")
-            else:
-                # Connect and send using configured SMTP server
-                smtp_server = getattr(Config, 'SMTP_SERVER', 'smtp.gmail.com')
-                smtp_port = int(getattr(Config, 'SMTP_PORT', 587))
-                with smtplib.SMTP(smtp_server, smtp_port) as server:
-                    server.starttls()
-                    server.login(Config.SMTP_USERNAME, Config.SMTP_PASSWORD)
-                    server.send_message(msg)
-
-            logger.info(f"📧 Email sent successfully to {to_address}")
+                    if not _is_transient_async(e) or attempt >= self.max_retries:
+                        self._stats['failed'] += 1
+                        logger.error("email_send_failed", error=str(e), to=message["To"], attempts=attempt + 1)
+                        return
+                    attempt += 1
+                    self._stats['retried'] += 1
+                    await asyncio.sleep(self.retry_backoff * 2 ** (attempt - 1))
 
-        except Exception as e:
-            logger.error(f"❌ Failed to send email: {e}")
 
-    # Send in a background thread
-    Thread(target=_send_email).start()
+def _is_transient_async(error):
+    """`_is_transient` for aiosmtplib errors, which carry the reply code as `code`."""
+    refused = getattr(error, 'recipients', None)
+    if isinstance(refused, list) and refused:
+        return all(_is_transient_async(recipient) for recipient in refused)
+    code = getattr(error, 'code', None)
+    if isinstance(code, int) and code > 0:
+        return 400 <= code < 500
+    return isinstance(error, (OSError, asyncio.TimeoutError))
+
+
+_pool = None
+_pool_lock = threading.Lock()
+
+def get_delivery_pool():
+    """Return the process-wide delivery pool, starting it on first use."""
+    global _pool
+    with _pool_lock:
+        if _pool is None:
+            _pool = EmailDeliveryPool(
+                host=getattr(Config, 'SMTP_SERVER', 'smtp.gmail.com'),
+                port=int(getattr(Config, 'SMTP_PORT', 587)),
+                username=Config.SMTP_USERNAME,
+                password=Config.SMTP_PASSWORD,
+                use_tls=Config.SMTP_USE_TLS,
+                workers=Config.EMAIL_WORKERS,
+                queue_size=Config.EMAIL_QUEUE_SIZE,
+                batch_size=Config.EMAIL_BATCH_SIZE,
+                max_retries=Config.EMAIL_MAX_RETRIES,
+                retry_backoff=Config.EMAIL_RETRY_BACKOFF,
+                enqueue_timeout=Config.EMAIL_ENQUEUE_TIMEOUT,
+                idle_timeout=Config.EMAIL_IDLE_TIMEOUT,
+            )
+        return _pool
+
+def delivery_stats():
+    """Stats of the delivery pool, or None if no email has been queued yet."""
+    pool = _pool
+    return pool.stats() if pool is not None else None
+
+@atexit.register
+def shutdown_delivery_pool(timeout=10.0):
+    """Drain and stop the delivery pool so queued mail is not lost on exit."""
+    global _pool
+    with _pool_lock:
+        pool, _pool = _pool, None
+    if pool is not None:
+        pool.close(timeout)
+
+def send_gmail_async(to_address, subject, body, image_path=None):
+    """
+    Send Gmail email asynchronously with optional image attachment.
+    The message is queued on the shared delivery pool; returns False if it was dropped.
+    """
+    # Check test mode: if enabled, log and skip real send
+    if getattr(Config, 'EMAIL_TEST_MODE', False):
+        logger.info("email_test_mode", to=to_address, subject=subject)
+        return True
+    msg = _build_message(Config.SMTP_USERNAME, to_address, subject, body, image_path)
+    return get_delivery_pool().submit(msg)
 
 
 # Example usage:
 # Notification wrapper functions
-def notify_account_created(user_email, username):
-    """Send welcome email to newly created account."""
+def account_created_email(username):
+    """(subject, body) of the welcome email."""
     subject = "Welcome to BMS - Account Created Successfully"
     body = f"Hello {username},\n\nYour account has been successfully created in the BMS system.\n\nBest regards,\nBMS Team"
-    send_gmail_async(user_email, subject, body)
+    return subject, body
+
+def accounts_created_bulk_email(names):
+    """(subject, body) of the bulk import summary email."""
+    subject = f"BMS Bulk Import - {len(names)} Accounts Created"
+    preview = "\n".join(f"- {name}" for name in names[:20])
+    if len(names) > 20:
+        preview += f"\n... and {len(names) - 20} more"
+    body = f"{len(names)} accounts were created in the BMS system:\n\n{preview}\n\nBest regards,\nBMS Team"
+    return subject, body
+
+def notify_account_created(user_email, username):
+    """Send welcome email to newly created account."""
+    send_gmail_async(user_email, *account_created_email(username))
+
+def notify_accounts_created_bulk(admin_email, names):
+    """Send one summary email for accounts created through a bulk import."""
+    send_gmail_async(admin_email, *accounts_created_bulk_email(names))
 
 def notify_batch_processed(admin_email, batch_id, status, details):
     """Notify admin about batch processing results."""
@@ -18,6 +18,10 @@ class InvalidAccountDataError(BMSError):
     """Raised when account data is invalid"""
     pass
 
+class DatabaseBusyError(BMSError):
+    """Raised when the database stays locked after all retries"""
+    pass
+
 class EmailError(BMSError):
     """Raised when there is an error sending email"""
     pass
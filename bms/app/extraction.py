@@ -0,0 +1,166 @@
+import hashlib
+import importlib.util
+import json
+import re
+from functools import lru_cache
+from typing import Optional
+from urllib.parse import urlsplit
+import soupsieve
+from bs4 import BeautifulSoup, SoupStrainer
+from app.config import Config
+from app.logger import logger
+
+# Rules used for any site without its own entry in SCRAPER_RULES_FILE
+DEFAULT_SITE = '*'
+
+_NUMBER = r'(-?\d[\d,]*(?:\.\d+)?)'
+
+DEFAULT_RULES = {
+    'interest_rates': {
+        'fields': {
+            product: {'selector': f'table.rates [data-product="{product}"] .rate',
+                      'regex': _NUMBER, 'type': 'float', 'default': 0.0}
+            for product in ('savings', 'checking', 'cd')
+        },
+    },
+    'bank_info': {
+        'fields': {
+            'name': {'selector': 'h1'},
+            'description': {'selector': 'meta[name="description"]', 'attr': 'content'},
+            'contact': {'selector': 'a[href^="tel:"]'},
+            'address': {'selector': 'address'},
+        },
+    },
+}
+
+_CONVERTERS = {
+    'str': lambda text: ' '.join(text.split()),
+    'float': lambda text: float(text.replace(',', '')),
+    'int': lambda text: int(text.replace(',', '')),
+}
+
+# Leading type selector of a CSS selector, e.g. "table" in "table.rates td"
+_LEADING_TAG = re.compile(r'\s*([a-zA-Z][\w-]*)(?![\w|-])')
+
+# Sibling combinators, which look outside the leading tag's subtree
+_SIBLING_COMBINATOR = re.compile(r'[+~]')
+_PSEUDO_CLASS = re.compile(r':+(-?[\w-]+)')
+# Pseudo-classes that depend only on an element and its descendants; any other
+# (:nth-of-type, :first-child, :has, :root, ...) makes the whole tree parse
+_SUBTREE_PSEUDO_CLASSES = frozenset({
+    'not', 'is', 'where', 'matches', 'any', 'empty', 'contains', '-soup-contains', '-soup-contains-own',
+    'checked', 'disabled', 'enabled', 'link', 'any-link', 'required', 'optional',
+})
+# Attribute selectors and quoted strings, whose contents may contain "+", "~" or ":"
+_LITERAL = re.compile(r'\[[^\]]*\]|"[^"]*"|\'[^\']*\'')
+
+
+def parser_name() -> str:
+    """SCRAPER_PARSER, else lxml when installed, else the stdlib html.parser"""
+    if Config.SCRAPER_PARSER:
+        return Config.SCRAPER_PARSER
+    return 'lxml' if importlib.util.find_spec('lxml') else 'html.parser'
+
+def _derive_scope(selectors):
+    """Tag names to keep while parsing, or None when a selector needs the whole tree"""
+    scope = set()
+    for selector in selectors:
+        bare = _LITERAL.sub('', selector)
+        if _SIBLING_COMBINATOR.search(bare):
+            return None
+        if any(name.lower() not in _SUBTREE_PSEUDO_CLASSES for name in _PSEUDO_CLASS.findall(bare)):
+            return None
+        for alternative in selector.split(','):
+            match = _LEADING_TAG.match(alternative)
+            if match is None:
+                return None
+            scope.add(match.group(1).lower())
+    return sorted(scope)
+
+
+class RuleSet:
+    """Compiled extraction rules for one site and kind of page.
+
+    Each field is a CSS selector, optionally an attribute to read instead of
+    the element text, a regex whose first group (or whole match) is kept, a
+    type and a default. Parsing keeps only the subtrees under `scope` tags
+    (derived from the selectors when not given), so navigation, scripts and
+    footers of large pages are never turned into a tree.
+    """
+
+    def __init__(self, site: str, kind: str, definition: dict):
+        self.site = site
+        self.kind = kind
+        fields = definition['fields']
+        self._fields = []
+        for name, spec in fields.items():
+            type_name = spec.get('type', 'str')
+            default = spec.get('default', 0.0 if type_name == 'float' else '')
+            regex = re.compile(spec['regex']) if spec.get('regex') else None
+            self._fields.append((name, soupsieve.compile(spec['selector']), spec.get('attr'),
+                                 regex, _CONVERTERS[type_name], default))
+        scope = definition.get('scope') or _derive_scope(spec['selector'] for spec in fields.values())
+        self.scope = scope
+        self.strainer = SoupStrainer(scope) if scope else None
+        digest = hashlib.sha256(json.dumps(definition, sort_keys=True).encode('utf-8')).hexdigest()
+        self.key = f"rules:{site}:{kind}:{digest[:16]}"
+
+    def parse(self, html: str) -> BeautifulSoup:
+        """Parse only the subtrees the rules can match"""
+        return BeautifulSoup(html, parser_name(), parse_only=self.strainer)
+
+    def extract(self, html: str) -> dict:
+        return self.extract_soup(self.parse(html))
+
+    def extract_soup(self, soup: BeautifulSoup) -> dict:
+        """Apply the rules to an already parsed (full or partial) document"""
+        result = {}
+        for name, selector, attr, regex, convert, default in self._fields:
+            element = selector.select_one(soup)
+            text = None
+            if element is not None:
+                text = element.get(attr) if attr else element.get_text(' ', strip=True)
+            if text and regex is not None:
+                match = regex.search(text)
+                text = (match.group(1) if regex.groups else match.group(0)) if match else None
+            try:
+                result[name] = convert(text) if text else default
+            except ValueError:
+                logger.warning("extraction_value_invalid", site=self.site, kind=self.kind, field=name, value=text)
+                result[name] = default
+        return result
+
+
+@lru_cache(maxsize=8)
+def _load_rules(path: str) -> dict:
+    rules = {DEFAULT_SITE: DEFAULT_RULES}
+    if path:
+        with open(path, encoding='utf-8') as f:
+            rules.update(json.load(f))
+    return rules
+
+@lru_cache(maxsize=256)
+def _compile(path: str, site: str, kind: str) -> RuleSet:
+    return RuleSet(site, kind, _load_rules(path)[site][kind])
+
+def site_for(url: Optional[str], path: str = None) -> str:
+    """Rule table entry for a URL's host (with or without "www."), else the default"""
+    rules = _load_rules(Config.SCRAPER_RULES_FILE if path is None else path)
+    host = (urlsplit(url).hostname or '') if url else ''
+    for site in (host, host[4:] if host.startswith('www.') else None):
+        if site and site in rules:
+            return site
+    return DEFAULT_SITE
+
+def rules_for(url: Optional[str], kind: str) -> RuleSet:
+    """Compiled rules of `kind` for the site serving `url`, cached per site"""
+    path = Config.SCRAPER_RULES_FILE
+    site = site_for(url, path)
+    if kind not in _load_rules(path)[site]:
+        site = DEFAULT_SITE
+    return _compile(path, site, kind)
+
+def clear_rule_cache() -> None:
+    """Forget loaded and compiled rules, e.g. after editing the rules file"""
+    _load_rules.cache_clear()
+    _compile.cache_clear()
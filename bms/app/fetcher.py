@@ -0,0 +1,113 @@
+import asyncio
+from typing import Dict, Iterable, List, NamedTuple, Optional
+from urllib.parse import urlsplit
+import aiohttp
+from app.config import Config
+from app.logger import logger
+
+# Statuses worth retrying: rate limiting and transient server errors
+RETRY_STATUSES = {429, 500, 502, 503, 504}
+
+
+class _RetryableStatus(Exception):
+    def __init__(self, status):
+        super().__init__(f"HTTP {status}")
+        self.status = status
+
+
+class FetchResult(NamedTuple):
+    url: str
+    status: Optional[int]
+    text: Optional[str]
+    headers: Dict[str, str]
+    error: Optional[str] = None
+
+    @property
+    def ok(self) -> bool:
+        return self.error is None
+
+
+class AsyncFetcher:
+    """Concurrent page fetcher sharing one pooled aiohttp session.
+
+    `concurrency` caps requests in flight overall and `per_host` caps them
+    per host, both at the connector and with per-host semaphores. URLs are
+    fed through a bounded queue of `queue_size` so huge batches do not
+    create one task per URL up front. Connection errors, timeouts and
+    retryable statuses are retried `retries` times with exponential backoff.
+    """
+
+    def __init__(self, concurrency: int = None, per_host: int = None, queue_size: int = None,
+                 timeout: float = None, retries: int = None, backoff: float = None,
+                 headers: Optional[dict] = None):
+        self.concurrency = concurrency or Config.SCRAPER_CONCURRENCY
+        self.per_host = per_host or Config.SCRAPER_PER_HOST
+        self.queue_size = queue_size or Config.SCRAPER_QUEUE_SIZE
+        self.timeout = timeout or Config.SCRAPING_TIMEOUT
+        self.retries = Config.SCRAPER_RETRIES if retries is None else retries
+        self.backoff = Config.SCRAPER_RETRY_BACKOFF if backoff is None else backoff
+        self.headers = headers or {'User-Agent': Config.SCRAPER_USER_AGENT}
+
+    async def fetch_all(self, urls: Iterable[str], request_headers=None) -> List[FetchResult]:
+        """Fetch every URL and return results in input order.
+
+        `request_headers(url)` may return extra headers for a single request.
+        """
+        urls = list(urls)
+        results: List[Optional[FetchResult]] = [None] * len(urls)
+        queue = asyncio.Queue(maxsize=self.queue_size)
+        host_limits: Dict[str, asyncio.Semaphore] = {}
+
+        connector = aiohttp.TCPConnector(limit=self.concurrency, limit_per_host=self.per_host)
+        timeout = aiohttp.ClientTimeout(total=self.timeout)
+        async with aiohttp.ClientSession(connector=connector, timeout=timeout, headers=self.headers) as session:
+            async def worker():
+                while True:
+                    item = await queue.get()
+                    if item is None:
+                        queue.task_done()
+                        return
+                    index, url = item
+                    host = urlsplit(url).netloc
+                    limit = host_limits.setdefault(host, asyncio.Semaphore(self.per_host))
+                    extra = request_headers(url) if request_headers else None
+                    results[index] = await self._fetch(session, limit, url, extra)
+                    queue.task_done()
+
+            workers = [asyncio.create_task(worker()) for _ in range(min(self.concurrency, len(urls)) or 1)]
+            for item in enumerate(urls):
+                await queue.put(item)
+            for _ in workers:
+                await queue.put(None)
+            await asyncio.gather(*workers)
+
+        failed = sum(1 for result in results if not result.ok)
+        logger.info("pages_fetched", count=len(urls), failed=failed)
+        return results
+
+    async def _fetch(self, session, limit, url, extra_headers=None) -> FetchResult:
+        attempt = 0
+        while True:
+            try:
+                async with limit:
+                    async with session.get(url, headers=extra_headers) as response:
+                        text = await response.text()
+                        if response.status in RETRY_STATUSES and attempt < self.retries:
+                            raise _RetryableStatus(response.status)
+                        result = FetchResult(url, response.status, text, dict(response.headers))
+                        if response.status >= 400 and response.status != 304:
+                            return result._replace(error=f"HTTP {response.status}")
+                        return result
+            except (aiohttp.ClientError, asyncio.TimeoutError, _RetryableStatus) as e:
+                error = str(e) or type(e).__name__
+                if attempt >= self.retries:
+                    logger.error("scraping_failed", error=error, url=url, method="aiohttp")
+                    return FetchResult(url, None, None, {}, error)
+                attempt += 1
+                logger.warning("scraping_retry", error=error, url=url, attempt=attempt)
+                await asyncio.sleep(self.backoff * 2 ** (attempt - 1))
+
+
+def fetch_urls(urls: Iterable[str], **kwargs) -> List[FetchResult]:
+    """Synchronous wrapper: fetch many URLs concurrently and return the results"""
+    return asyncio.run(AsyncFetcher(**kwargs).fetch_all(urls))
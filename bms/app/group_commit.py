@@ -0,0 +1,239 @@
+import atexit
+import queue
+import threading
+import time
+from concurrent.futures import Future
+from typing import Optional
+from flask import current_app
+from sqlalchemy.exc import OperationalError
+from app.aggregates import apply_balance_deltas
+from app.config import Config
+from app.crud import (
+    account_creation_error, account_update_error, add_account, change_account, finish_account_creation,
+    finish_account_update
+)
+from app.db import begin_write, db, is_lock_error, lock_retry_delay, lock_retry_settings
+from app.exceptions import BMSError, DatabaseBusyError, InvalidAccountDataError
+from app.logger import logger
+
+_STOP = object()
+
+
+def _create(name: str, number: str, balance: float = 0.0):
+    account, deltas = add_account(name, number, balance)
+    return account.to_dict(), deltas
+
+def _create_failed(error: Exception, kwargs: dict) -> BMSError:
+    return account_creation_error(error, kwargs['number'])
+
+def _created(account: dict, kwargs: dict) -> None:
+    finish_account_creation(account['name'], account['number'])
+
+def _update(account_id: int, **fields):
+    account, deltas = change_account(account_id, **fields)
+    return account.to_dict(), deltas
+
+def _update_failed(error: Exception, kwargs: dict) -> BMSError:
+    return account_update_error(error, kwargs['account_id'])
+
+def _updated(account: dict, kwargs: dict) -> None:
+    finish_account_update(account['id'], {key: value for key, value in kwargs.items() if key != 'account_id'})
+
+# kind -> (apply inside a savepoint, map a failure to the caller's error, run after the commit)
+_OPERATIONS = {
+    'create': (_create, _create_failed, _created),
+    'update': (_update, _update_failed, _updated),
+}
+
+
+class GroupCommitWriter:
+    """Single writer thread that commits concurrent creates and updates together.
+
+    Callers queue a write and block until it is committed. The writer takes
+    the first queued write, keeps collecting for up to `max_delay` seconds
+    or `max_batch` writes, runs each one in its own savepoint and commits
+    them all in one transaction: one fsync instead of one per request. A
+    write that fails rolls back only its savepoint, and only its caller
+    sees the error. Lock errors retry the whole batch like `retry_on_lock`.
+    When the queue is full, `submit` waits up to `enqueue_timeout` seconds
+    and then raises DatabaseBusyError.
+    """
+
+    def __init__(self, app, max_batch: int = 64, max_delay: float = 0.002, queue_size: int = 1000,
+                 enqueue_timeout: float = 0.1):
+        self.app = app
+        self.max_batch = max_batch
+        self.max_delay = max_delay
+        self.enqueue_timeout = enqueue_timeout
+        self._queue = queue.Queue(maxsize=queue_size)
+        self._lock = threading.Lock()
+        self._stats = {'writes': 0, 'failed': 0, 'batches': 0, 'rejected': 0}
+        self._thread = None
+        self._closed = False
+
+    def create_account(self, name: str, number: str, balance: float = 0.0) -> dict:
+        """Like `crud.create_account`, committed with other queued writes; returns the account dict"""
+        return self.submit('create', name=name, number=number, balance=balance)
+
+    def update_account(self, account_id: int, **fields) -> dict:
+        """Like `crud.update_account`, committed with other queued writes; returns the account dict"""
+        return self.submit('update', account_id=account_id, **fields)
+
+    def submit(self, kind: str, **kwargs):
+        """Queue a write and wait for its result, or raise its error"""
+        if self._closed:
+            raise RuntimeError("Group commit writer is closed")
+        self._start()
+        future = Future()
+        try:
+            self._queue.put((kind, kwargs, future), timeout=self.enqueue_timeout)
+        except queue.Full:
+            self._count('rejected')
+            logger.warning("group_commit_rejected", reason="queue_full", kind=kind)
+            raise DatabaseBusyError("Database is busy, please retry")
+        return future.result()
+
+    def stats(self) -> dict:
+        """Counters plus the current queue depth"""
+        with self._lock:
+            stats = dict(self._stats)
+        stats['queued'] = self._queue.qsize()
+        return stats
+
+    def close(self, timeout: Optional[float] = None) -> None:
+        """Commit what is queued, then stop the writer thread; gives up after `timeout` seconds"""
+        with self._lock:
+            if self._closed:
+                return
+            self._closed = True
+            thread = self._thread
+        if thread is None:
+            return
+        deadline = None if timeout is None else time.monotonic() + timeout
+        try:
+            self._queue.put(_STOP, timeout=timeout)
+        except queue.Full:
+            pass
+        thread.join(None if deadline is None else max(0.0, deadline - time.monotonic()))
+        if thread.is_alive():
+            logger.warning("group_commit_close_timeout", uncommitted=self._queue.qsize())
+
+    def _start(self):
+        if self._thread is not None:
+            return
+        with self._lock:
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name="group-commit-writer", daemon=True)
+                self._thread.start()
+                atexit.register(self.close, 10.0)
+
+    def _count(self, key: str, amount: int = 1):
+        with self._lock:
+            self._stats[key] += amount
+
+    def _run(self):
+        stopping = False
+        while not stopping:
+            item = self._queue.get()
+            if item is _STOP:
+                break
+            batch = [item]
+            deadline = time.monotonic() + self.max_delay
+            while len(batch) < self.max_batch:
+                remaining = deadline - time.monotonic()
+                try:
+                    item = self._queue.get(timeout=remaining) if remaining > 0 else self._queue.get_nowait()
+                except queue.Empty:
+                    break
+                if item is _STOP:
+                    stopping = True
+                    break
+                batch.append(item)
+            self._process(batch)
+
+    def _process(self, batch: list):
+        """Commit one batch and complete every caller's future"""
+        started = time.perf_counter()
+        with self.app.app_context():
+            try:
+                outcomes = self._commit(batch)
+            except Exception as e:
+                db.session.rollback()
+                logger.error("group_commit_failed", error=str(e), writes=len(batch))
+                error = e if isinstance(e, BMSError) else InvalidAccountDataError(str(e))
+                outcomes = [(None, error)] * len(batch)
+            failed = 0
+            for (kind, kwargs, future), (result, error) in zip(batch, outcomes):
+                if error is not None:
+                    failed += 1
+                    future.set_exception(error)
+                    continue
+                try:
+                    _OPERATIONS[kind][2](result, kwargs)
+                except Exception as e:  # the write is committed either way
+                    logger.warning("group_commit_callback_failed", kind=kind, error=str(e))
+                future.set_result(result)
+        self._count('batches')
+        self._count('writes', len(batch))
+        self._count('failed', failed)
+        logger.debug("group_committed", writes=len(batch), failed=failed,
+                     ms=round((time.perf_counter() - started) * 1000, 2))
+
+    def _commit(self, batch: list) -> list:
+        """(result, error) per write, after committing the successful ones, retrying lock errors"""
+        retries, backoff = lock_retry_settings()
+        attempt = 0
+        while True:
+            try:
+                return self._apply(batch)
+            except OperationalError as e:
+                db.session.rollback()
+                if not is_lock_error(e):
+                    raise
+                delay = lock_retry_delay('group_commit', e, attempt, retries, backoff)
+                attempt += 1
+                time.sleep(delay)
+
+    def _apply(self, batch: list) -> list:
+        begin_write()  # updates compute balance deltas from what they read
+        outcomes, deltas = [], []
+        for kind, kwargs, _ in batch:
+            apply, failed, _ = _OPERATIONS[kind]
+            try:
+                with db.session.begin_nested():
+                    result, write_deltas = apply(**kwargs)
+            except Exception as e:
+                if is_lock_error(e):
+                    raise
+                outcomes.append((None, failed(e, kwargs)))
+            else:
+                outcomes.append((result, None))
+                deltas.extend(write_deltas)
+        apply_balance_deltas(deltas)
+        db.session.commit()
+        return outcomes
+
+
+def init_group_commit(app):
+    """Attach a group-commit writer to the Flask app when GROUP_COMMIT_ENABLED is on"""
+    def setting(key):
+        return app.config.get(key, getattr(Config, key))
+
+    if not setting('GROUP_COMMIT_ENABLED'):
+        app.extensions['group_commit'] = None
+        return
+    # The writer thread starts on the first write
+    app.extensions['group_commit'] = GroupCommitWriter(
+        app,
+        max_batch=int(setting('GROUP_COMMIT_MAX_BATCH')),
+        max_delay=float(setting('GROUP_COMMIT_MAX_DELAY')),
+        queue_size=int(setting('GROUP_COMMIT_QUEUE_SIZE')),
+        enqueue_timeout=float(setting('GROUP_COMMIT_ENQUEUE_TIMEOUT')),
+    )
+
+def get_group_commit() -> Optional[GroupCommitWriter]:
+    """The current app's group-commit writer, or None when disabled or outside an app context"""
+    try:
+        return current_app.extensions.get('group_commit')
+    except RuntimeError:
+        return None
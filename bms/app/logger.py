@@ -1,30 +1,254 @@
+import atexit
+import logging
+import queue
+import random
 import sys
+import threading
+import time
+import traceback
+from datetime import datetime, timezone
 import structlog
 from app.config import Config
 
-def setup_logging():
-    """Configure structured logging"""
+_STOP = object()
+
+# structlog method name -> stdlib level of the emitted record
+_LEVELS = {
+    'debug': logging.DEBUG,
+    'info': logging.INFO,
+    'warning': logging.WARNING,
+    'warn': logging.WARNING,
+    'error': logging.ERROR,
+    'exception': logging.ERROR,
+    'critical': logging.CRITICAL,
+    'fatal': logging.CRITICAL,
+}
+
+# Method names logged under another level name, as structlog's add_log_level does
+_LEVEL_NAMES = {'warn': 'warning', 'exception': 'error'}
+
+
+def parse_event_settings(value: str, cast=float) -> dict:
+    """'batch_processed=0.1,email_sent=0.5' -> {'batch_processed': 0.1, 'email_sent': 0.5}"""
+    settings = {}
+    for item in (value or '').split(','):
+        name, sep, setting = item.partition('=')
+        if sep and name.strip():
+            settings[name.strip()] = cast(setting)
+    return settings
+
+
+class EventSampler:
+    """structlog processor that thins out high-volume events by name.
+
+    `rates` keeps each named event with the given probability; `limits`
+    keeps at most that many of a named event per second. Events without an
+    entry always pass. Dropped events are counted in `stats()`.
+    """
+
+    def __init__(self, rates=None, limits=None):
+        self.rates = dict(rates or {})
+        self.limits = dict(limits or {})
+        self._windows = {}  # event -> [second, count]
+        self._lock = threading.Lock()
+        self._sampled = 0
+
+    def __call__(self, logger, method_name, event_dict):
+        event = event_dict.get('event')
+        rate = self.rates.get(event)
+        if rate is not None and random.random() >= rate:
+            self._drop()
+        limit = self.limits.get(event)
+        if limit is not None:
+            second = int(time.monotonic())
+            with self._lock:
+                window = self._windows.get(event)
+                if window is None or window[0] != second:
+                    window = self._windows[event] = [second, 0]
+                window[1] += 1
+                over = window[1] > limit
+            if over:
+                self._drop()
+        return event_dict
+
+    def _drop(self):
+        with self._lock:
+            self._sampled += 1
+        raise structlog.DropEvent
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {'sampled_out': self._sampled}
+
+
+def _capture(logger, method_name, event_dict):
+    """Hot-path processor: record what must be read on the calling thread, render nothing"""
+    event_dict['timestamp'] = time.time()
+    event_dict['level'] = _LEVEL_NAMES.get(method_name, method_name)
+    exc_info = event_dict.get('exc_info')
+    if exc_info is True:
+        event_dict['exc_info'] = sys.exc_info()
+    elif isinstance(exc_info, BaseException):
+        event_dict['exc_info'] = (type(exc_info), exc_info, exc_info.__traceback__)
+    if event_dict.pop('stack_info', False):
+        event_dict['stack'] = ''.join(traceback.format_stack()[:-1])
+    return event_dict
+
+def _iso_timestamp(logger, method_name, event_dict):
+    stamp = datetime.fromtimestamp(event_dict['timestamp'], timezone.utc)
+    event_dict['timestamp'] = stamp.strftime('%Y-%m-%dT%H:%M:%S.%fZ')
+    return event_dict
+
+
+class LogPipeline:
+    """Bounded queue of captured events rendered and written by one thread.
+
+    Callers only build the event dict and enqueue it; rendering (JSON or
+    console) and the write to the stdlib `logger_name` logger happen on the
+    writer thread. Values are rendered after the call returns, so callers
+    must not mutate objects they passed in. When the queue is full the
+    event is dropped and counted. With `threaded=False` events are rendered
+    inline, which keeps ordering with other output for debugging.
+    """
+
+    def __init__(self, render, logger_name='bms', queue_size=10000, threaded=True):
+        self.render = render
+        self.logger_name = logger_name
+        self.threaded = threaded
+        self._queue = queue.Queue(maxsize=queue_size)
+        self._lock = threading.Lock()
+        self._stats = {'written': 0, 'dropped': 0}
+        self._writer = None
+        if threaded:
+            self._writer = threading.Thread(target=self._run, name="log-writer", daemon=True)
+            self._writer.start()
+
+    def put(self, event_dict):
+        if not self.threaded:
+            self._write(event_dict)
+            return
+        try:
+            self._queue.put_nowait(event_dict)
+        except queue.Full:
+            with self._lock:
+                self._stats['dropped'] += 1
+
+    def stats(self) -> dict:
+        with self._lock:
+            stats = dict(self._stats)
+        stats['queued'] = self._queue.qsize()
+        return stats
+
+    def flush(self, timeout=None) -> bool:
+        """Wait until every queued event has been written."""
+        deadline = None if timeout is None else time.monotonic() + timeout
+        with self._queue.all_tasks_done:
+            while self._queue.unfinished_tasks:
+                remaining = None if deadline is None else deadline - time.monotonic()
+                if remaining is not None and remaining <= 0:
+                    return False
+                self._queue.all_tasks_done.wait(remaining)
+        return True
+
+    def close(self, timeout=None):
+        """Write what is queued, then stop the writer thread; gives up after `timeout` seconds."""
+        if self._writer is None:
+            return
+        deadline = None if timeout is None else time.monotonic() + timeout
+        try:
+            self._queue.put(_STOP, timeout=timeout)
+        except queue.Full:
+            pass
+        self._writer.join(None if deadline is None else max(0.0, deadline - time.monotonic()))
+        if self._writer.is_alive():
+            # Straight to the stdlib logger: the pipeline itself is what is stuck
+            logging.getLogger(self.logger_name).warning(
+                "log pipeline closed with %d events unwritten", self._queue.qsize())
+        self._writer = None
+
+    def _run(self):
+        while True:
+            event_dict = self._queue.get()
+            try:
+                if event_dict is _STOP:
+                    return
+                self._write(event_dict)
+            finally:
+                self._queue.task_done()
+
+    def _write(self, event_dict):
+        try:
+            level = _LEVELS.get(event_dict.get('level'), logging.INFO)
+            logging.getLogger(self.logger_name).log(level, self.render(event_dict))
+            with self._lock:
+                self._stats['written'] += 1
+        except Exception:
+            # A broken event must never take the writer thread down
+            with self._lock:
+                self._stats['dropped'] += 1
+
+
+class QueueLogger:
+    """structlog logger whose every method hands the event dict to the current LogPipeline"""
+
+    def msg(self, **event_dict):
+        _pipeline.put(event_dict)
+
+    log = debug = info = warning = warn = error = exception = critical = fatal = msg
+
+
+def _renderer():
+    """Processors run on the writer thread, ending in the configured renderer"""
     processors = [
-        structlog.processors.TimeStamper(fmt="iso"),
-        structlog.stdlib.add_log_level,
-        structlog.processors.StackInfoRenderer(),
         structlog.processors.format_exc_info,
+        _iso_timestamp,
+        structlog.processors.JSONRenderer() if Config.LOG_FORMAT.lower() == 'json'
+        else structlog.dev.ConsoleRenderer(),
     ]
-    
-    if Config.LOG_FORMAT.lower() == 'json':
-        processors.append(structlog.processors.JSONRenderer())
-    else:
-        processors.append(structlog.dev.ConsoleRenderer())
-    
+
+    def render(event_dict):
+        for processor in processors:
+            event_dict = processor(None, event_dict['level'], event_dict)
+        return event_dict
+    return render
+
+_pipeline = None
+_sampler = None
+
+def setup_logging():
+    """Configure structured logging through the queue-backed pipeline"""
+    global _pipeline, _sampler
+    if _pipeline is not None:
+        _pipeline.close(timeout=5)
+    _pipeline = LogPipeline(_renderer(), queue_size=Config.LOG_QUEUE_SIZE, threaded=Config.LOG_ASYNC)
+    _sampler = EventSampler(parse_event_settings(Config.LOG_SAMPLE_RATES),
+                            parse_event_settings(Config.LOG_RATE_LIMITS, int))
+
     structlog.configure(
-        processors=processors,
+        processors=[_capture, _sampler],
         context_class=dict,
-        logger_factory=structlog.stdlib.LoggerFactory(),
-        wrapper_class=structlog.stdlib.BoundLogger,
+        logger_factory=lambda *args: QueueLogger(),
+        wrapper_class=structlog.make_filtering_bound_logger(
+            logging.getLevelName(Config.LOG_LEVEL.upper())),
         cache_logger_on_first_use=True,
     )
-    
+
     return structlog.get_logger()
 
+def log_stats() -> dict:
+    """Written, dropped (queue full), sampled-out and queued event counts"""
+    stats = _pipeline.stats()
+    stats.update(_sampler.stats())
+    return stats
+
+def flush_logs(timeout=None) -> bool:
+    """Wait until every captured event has been written"""
+    return _pipeline.flush(timeout)
+
+@atexit.register
+def _shutdown_logging():
+    if _pipeline is not None:
+        _pipeline.close(timeout=5)
+
 # Create logger instance
-logger = setup_logging()
\ No newline at end of file
+logger = setup_logging()
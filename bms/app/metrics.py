@@ -0,0 +1,196 @@
+import threading
+import time
+from bisect import bisect_left
+from flask import current_app, g, has_app_context, request
+from sqlalchemy import event
+from app.logger import log_stats
+
+# Latency buckets in seconds (Prometheus defaults)
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+PROMETHEUS_MIMETYPE = 'text/plain; version=0.0.4; charset=utf-8'
+
+
+class MetricsRegistry:
+    """In-process request and database metrics for one Flask app.
+
+    Recording is a bucket lookup plus a few counter increments under a lock;
+    all formatting happens when /api/metrics is scraped.
+    """
+
+    def __init__(self, buckets=LATENCY_BUCKETS):
+        self.buckets = tuple(buckets)
+        self._lock = threading.Lock()
+        # (route, method, status) -> [bucket counts..., sum, count]
+        self._latency = {}
+        # route -> [requests, queries, db seconds]
+        self._db = {}
+        self._queries_total = 0
+        self._db_seconds_total = 0.0
+
+    def observe_request(self, route, method, status, seconds, queries, db_seconds):
+        key = (route, method, str(status))
+        index = bisect_left(self.buckets, seconds)
+        with self._lock:
+            series = self._latency.get(key)
+            if series is None:
+                series = self._latency[key] = [0] * (len(self.buckets) + 2)
+            series[index] += 1
+            series[-2] += seconds
+            series[-1] += 1
+            db_series = self._db.get(route)
+            if db_series is None:
+                db_series = self._db[route] = [0, 0, 0.0]
+            db_series[0] += 1
+            db_series[1] += queries
+            db_series[2] += db_seconds
+
+    def observe_query(self, seconds):
+        with self._lock:
+            self._queries_total += 1
+            self._db_seconds_total += seconds
+
+    def render(self, extra=()) -> str:
+        """Prometheus text exposition of every metric.
+
+        `extra` is an iterable of (name, type, help, value) for gauges and
+        counters owned by other subsystems.
+        """
+        with self._lock:
+            latency = {key: list(series) for key, series in self._latency.items()}
+            db_series = {route: list(series) for route, series in self._db.items()}
+            queries_total, db_seconds_total = self._queries_total, self._db_seconds_total
+
+        lines = [
+            '# HELP bms_http_request_duration_seconds API request latency by route, method and status',
+            '# TYPE bms_http_request_duration_seconds histogram',
+        ]
+        for (route, method, status), series in sorted(latency.items()):
+            labels = f'route="{route}",method="{method}",status="{status}"'
+            cumulative = 0
+            for bound, count in zip(self.buckets, series):
+                cumulative += count
+                lines.append(f'bms_http_request_duration_seconds_bucket{{{labels},le="{bound}"}} {cumulative}')
+            lines.append(f'bms_http_request_duration_seconds_bucket{{{labels},le="+Inf"}} {series[-1]}')
+            lines.append(f'bms_http_request_duration_seconds_sum{{{labels}}} {series[-2]}')
+            lines.append(f'bms_http_request_duration_seconds_count{{{labels}}} {series[-1]}')
+
+        lines += ['# HELP bms_db_queries_per_route_total SQL statements executed while serving each route',
+                  '# TYPE bms_db_queries_per_route_total counter']
+        lines += [f'bms_db_queries_per_route_total{{route="{route}"}} {series[1]}'
+                  for route, series in sorted(db_series.items())]
+        lines += ['# HELP bms_db_seconds_per_route_total Time spent in SQL while serving each route',
+                  '# TYPE bms_db_seconds_per_route_total counter']
+        lines += [f'bms_db_seconds_per_route_total{{route="{route}"}} {series[2]}'
+                  for route, series in sorted(db_series.items())]
+        lines += ['# HELP bms_db_queries_total SQL statements executed by the app',
+                  '# TYPE bms_db_queries_total counter',
+                  f'bms_db_queries_total {queries_total}',
+                  '# HELP bms_db_seconds_total Time spent executing SQL',
+                  '# TYPE bms_db_seconds_total counter',
+                  f'bms_db_seconds_total {db_seconds_total}']
+        for name, kind, help_text, value in extra:
+            lines += [f'# HELP {name} {help_text}', f'# TYPE {name} {kind}', f'{name} {value}']
+        return '\n'.join(lines) + '\n'
+
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    conn.info.setdefault('query_start', []).append(time.perf_counter())
+
+def _observe_query(registry, started):
+    elapsed = time.perf_counter() - started
+    registry.observe_query(elapsed)
+    # g holds the per-request counters in both the Flask and the aiohttp app
+    if has_app_context():
+        stats = g.get('_metrics')
+        if stats is not None:
+            stats[1] += 1
+            stats[2] += elapsed
+
+def _make_after_cursor_execute(registry):
+    def after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        _observe_query(registry, conn.info['query_start'].pop())
+    return after_cursor_execute
+
+def _make_handle_error(registry):
+    def handle_error(context):
+        # A failed statement never reaches after_cursor_execute: count it and pop its start here
+        conn = context.connection
+        starts = conn.info.get('query_start') if conn is not None and context.statement is not None else None
+        if starts:
+            _observe_query(registry, starts.pop())
+    return handle_error
+
+def init_metrics(app, engine):
+    """Attach a metrics registry to the app and time every query on `engine`"""
+    registry = MetricsRegistry()
+    app.extensions['metrics'] = registry
+    instrument_engine(registry, engine)
+    return registry
+
+def instrument_engine(registry, engine):
+    """Time every query on `engine` (a sync Engine, or an AsyncEngine's `sync_engine`)"""
+    event.listen(engine, 'before_cursor_execute', _before_cursor_execute)
+    event.listen(engine, 'after_cursor_execute', _make_after_cursor_execute(registry))
+    event.listen(engine, 'handle_error', _make_handle_error(registry))
+
+def start_request():
+    """before_request hook: [start time, queries, db seconds]"""
+    g._metrics = [time.perf_counter(), 0, 0.0]
+
+def finish_request(response):
+    """after_request hook: record latency and query accounting for the route"""
+    stats = g.pop('_metrics', None)
+    registry = current_app.extensions.get('metrics')
+    if stats is not None and registry is not None:
+        route = request.url_rule.rule if request.url_rule is not None else 'unmatched'
+        registry.observe_request(route, request.method, response.status_code,
+                                 time.perf_counter() - stats[0], stats[1], stats[2])
+    return response
+
+def subsystem_metrics(email_stats=None, cache=None, admission=None, group_commit=None):
+    """(name, type, help, value) entries for logging, email, the account cache, admission and group commit"""
+    logs = log_stats()
+    extra = [
+        ('bms_log_queue_depth', 'gauge', 'Log events waiting to be written', logs['queued']),
+        ('bms_log_events_written_total', 'counter', 'Log events written', logs['written']),
+        ('bms_log_events_dropped_total', 'counter', 'Log events dropped because the queue was full',
+         logs['dropped']),
+        ('bms_log_events_sampled_out_total', 'counter', 'Log events skipped by sampling or rate limits',
+         logs['sampled_out']),
+    ]
+    if email_stats is not None:
+        extra.append(('bms_email_queue_depth', 'gauge', 'Emails waiting for delivery', email_stats['queued']))
+        for key in ('sent', 'failed', 'dropped', 'retried'):
+            extra.append((f'bms_email_{key}_total', 'counter', f'Emails {key}', email_stats[key]))
+        extra.append(('bms_email_connections_total', 'counter', 'SMTP connections opened',
+                      email_stats['connections']))
+    if cache is not None:
+        cache_stats = cache.stats()
+        for key in ('hits', 'misses', 'evictions', 'invalidations'):
+            extra.append((f'bms_account_cache_{key}_total', 'counter', f'Account cache {key}', cache_stats[key]))
+        extra.append(('bms_account_cache_size', 'gauge', 'Accounts held in the cache', cache_stats['size']))
+    if admission is not None:
+        admission_stats = admission.stats()
+        for kind in ('reads', 'writes'):
+            extra.append((f'bms_admission_{kind}_in_flight', 'gauge', f'API {kind} being served',
+                          admission_stats[f'{kind}_in_flight']))
+            extra.append((f'bms_admission_{kind}_waiting', 'gauge', f'API {kind} waiting for a slot',
+                          admission_stats[f'{kind}_waiting']))
+        extra.append(('bms_admission_admitted_total', 'counter', 'API requests admitted',
+                      admission_stats['admitted']))
+        for key, help_text in (('rate_limited', 'API requests refused with 429 by the per-client rate limit'),
+                               ('queue_full', 'API requests refused with 503 because the wait queue was full'),
+                               ('queue_timeout', 'API requests refused with 503 after waiting for a slot'),
+                               ('rejected', 'API requests refused by admission control')):
+            extra.append((f'bms_admission_{key}_total', 'counter', help_text, admission_stats[key]))
+    if group_commit is not None:
+        writer_stats = group_commit.stats()
+        extra.append(('bms_group_commit_queue_depth', 'gauge', 'Writes waiting for the group-commit writer',
+                      writer_stats['queued']))
+        for key, help_text in (('batches', 'Transactions committed by the group-commit writer'),
+                               ('writes', 'Writes handled by the group-commit writer'),
+                               ('failed', 'Group-commit writes that failed and were rolled back'),
+                               ('rejected', 'Writes refused because the group-commit queue was full')):
+            extra.append((f'bms_group_commit_{key}_total', 'counter', help_text, writer_stats[key]))
+    return extra
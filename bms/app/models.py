@@ -3,14 +3,18 @@ from app.db import db
 
 class Account(db.Model):
     __tablename__ = 'accounts'
+    __table_args__ = (
+        # NOCASE lets SQLite answer case-insensitive prefix LIKEs from the index
+        db.Index('ix_accounts_name_nocase', db.text('name COLLATE NOCASE')).ddl_if(dialect='sqlite'),
+    )
     
     id = db.Column(db.Integer, primary_key=True)
     name = db.Column(db.String(100), nullable=False)
     number = db.Column(db.String(20), unique=True, nullable=False)
-    balance = db.Column(db.Numeric(10, 2), default=0.0)
+    balance = db.Column(db.Numeric(10, 2), default=0.0, index=True)
     interest_rate = db.Column(db.Numeric(5, 2), default=0.0)
-    created_at = db.Column(db.DateTime, default=datetime.utcnow)
-    updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+    created_at = db.Column(db.DateTime, default=datetime.utcnow, index=True)
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow, index=True)
     
     def __repr__(self):
         return f"<Account {self.number}: {self.name}>"
@@ -24,4 +28,71 @@ class Account(db.Model):
             'interest_rate': float(self.interest_rate),
             'created_at': self.created_at.isoformat(),
             'updated_at': self.updated_at.isoformat()
-        }
\ No newline at end of file
+        }
+
+class JobCheckpoint(db.Model):
+    __tablename__ = 'job_checkpoints'
+
+    job = db.Column(db.String(50), primary_key=True)
+    run_key = db.Column(db.String(50), nullable=False)
+    last_id = db.Column(db.Integer, nullable=False, default=0)
+    completed = db.Column(db.Boolean, nullable=False, default=False)
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+
+    def __repr__(self):
+        return f"<JobCheckpoint {self.job}@{self.run_key}: {self.last_id}>"
+
+class LedgerEntry(db.Model):
+    """One leg of a transfer; rows are only ever inserted"""
+    __tablename__ = 'ledger_entries'
+
+    id = db.Column(db.Integer, primary_key=True)
+    transfer_id = db.Column(db.String(32), nullable=False, index=True)
+    account_id = db.Column(db.Integer, db.ForeignKey('accounts.id'), nullable=False, index=True)
+    amount = db.Column(db.Numeric(10, 2), nullable=False)  # negative for the debit leg
+    balance_after = db.Column(db.Numeric(10, 2), nullable=False)
+    memo = db.Column(db.String(200))
+    created_at = db.Column(db.DateTime, default=datetime.utcnow, nullable=False)
+
+    def to_dict(self):
+        return {
+            'id': self.id,
+            'transfer_id': self.transfer_id,
+            'account_id': self.account_id,
+            'amount': float(self.amount),
+            'balance_after': float(self.balance_after),
+            'memo': self.memo,
+            'created_at': self.created_at.isoformat()
+        }
+
+    def __repr__(self):
+        return f"<LedgerEntry {self.transfer_id} {self.account_id}: {self.amount}>"
+
+class AccountAggregate(db.Model):
+    """Running account count and balance total for one id bucket.
+
+    Bucket `n` of size `bucket_size` covers ids ``n * bucket_size + 1`` to
+    ``(n + 1) * bucket_size``; the row with bucket_size 0 holds the totals
+    over all accounts.
+    """
+    __tablename__ = 'account_aggregates'
+
+    bucket_size = db.Column(db.Integer, primary_key=True, autoincrement=False)
+    bucket = db.Column(db.Integer, primary_key=True, autoincrement=False)
+    account_count = db.Column(db.Integer, nullable=False, default=0)
+    balance_total = db.Column(db.Numeric(18, 2), nullable=False, default=0)
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+
+    def __repr__(self):
+        return f"<AccountAggregate {self.bucket_size}/{self.bucket}: {self.account_count}>"
+
+class SchemaVersion(db.Model):
+    """Fingerprint of the models the database schema was last created from"""
+    __tablename__ = 'schema_version'
+
+    id = db.Column(db.Integer, primary_key=True, autoincrement=False)
+    fingerprint = db.Column(db.String(64), nullable=False)
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+
+    def __repr__(self):
+        return f"<SchemaVersion {self.fingerprint[:12]}>"
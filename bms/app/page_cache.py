@@ -0,0 +1,139 @@
+import hashlib
+import json
+import os
+import threading
+from datetime import datetime
+from typing import Callable, Optional
+from flask import current_app
+from app.config import Config
+from app.logger import logger
+
+
+class PageCache:
+    """On-disk cache of scraped pages, their HTTP validators and extractions.
+
+    Each URL gets `<sha256>.html` (the body) and `<sha256>.json` (ETag,
+    Last-Modified, body hash and extracted results per extractor). A 304
+    or a 200 whose body hash is unchanged reuses the stored extraction, so
+    neither the download nor the HTML parse is repeated.
+    """
+
+    OUTCOMES = ('not_modified', 'unchanged', 'miss')
+
+    def __init__(self, directory: str):
+        self.directory = directory
+        os.makedirs(directory, exist_ok=True)
+        self._lock = threading.Lock()
+        self._stats = dict.fromkeys(self.OUTCOMES, 0)
+
+    def conditional_headers(self, url: str) -> dict:
+        """If-None-Match / If-Modified-Since headers for a refresh of `url`"""
+        entry = self._load(url)
+        if entry is None:
+            return {}
+        headers = {}
+        if entry.get('etag'):
+            headers['If-None-Match'] = entry['etag']
+        if entry.get('last_modified'):
+            headers['If-Modified-Since'] = entry['last_modified']
+        return headers
+
+    def resolve(self, url: str, status: int, body: Optional[str], headers, key: Optional[str],
+                process: Callable[[str], dict]) -> dict:
+        """Return `process(body)` for a fetched page, reusing cached work when possible.
+
+        `key` names the extraction so several extractors can share one page;
+        with None the body is processed every time and the result not stored.
+        """
+        entry = self._load(url)
+        if status == 304:
+            if entry is None:
+                raise ValueError(f"Got 304 for {url} without a cached copy")
+            outcome = 'not_modified'
+            body_hash = entry['body_hash']
+        else:
+            body_hash = hashlib.sha256(body.encode('utf-8')).hexdigest()
+            unchanged = entry is not None and entry['body_hash'] == body_hash
+            outcome = 'unchanged' if unchanged else 'miss'
+
+        cached = (entry or {}).get('extracted', {}).get(key)
+        if outcome != 'miss' and cached is not None and cached['body_hash'] == body_hash:
+            result = cached['result']
+        else:
+            if body is None:
+                body = self._read_body(url)
+            result = process(body)
+            cached = None
+
+        entry = entry if outcome != 'miss' else {'url': url, 'extracted': {}}
+        entry['body_hash'] = body_hash
+        entry['fetched_at'] = datetime.utcnow().isoformat()
+        if status != 304:
+            entry['etag'] = headers.get('ETag')
+            entry['last_modified'] = headers.get('Last-Modified')
+        if cached is None and key is not None:
+            entry['extracted'][key] = {'body_hash': body_hash, 'result': result}
+        self._save(url, entry, body if outcome == 'miss' else None)
+
+        with self._lock:
+            self._stats[outcome] += 1
+        logger.info("page_cache_lookup", url=url, outcome=outcome, parsed=cached is None)
+        return result
+
+    def stats(self) -> dict:
+        """Lookup outcome counts and the hit ratio (304s plus unchanged bodies)"""
+        with self._lock:
+            stats = dict(self._stats)
+        total = sum(stats.values())
+        stats['hit_ratio'] = round((total - stats['miss']) / total, 4) if total else 0.0
+        return stats
+
+    def log_stats(self) -> None:
+        logger.info("page_cache_stats", **self.stats())
+
+    def _path(self, url: str, suffix: str) -> str:
+        return os.path.join(self.directory, hashlib.sha256(url.encode('utf-8')).hexdigest() + suffix)
+
+    def _load(self, url: str) -> Optional[dict]:
+        try:
+            with open(self._path(url, '.json'), encoding='utf-8') as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return None
+
+    def _read_body(self, url: str) -> str:
+        with open(self._path(url, '.html'), encoding='utf-8') as f:
+            return f.read()
+
+    def _save(self, url: str, entry: dict, body: Optional[str]) -> None:
+        if body is not None:
+            self._write(self._path(url, '.html'), body)
+        self._write(self._path(url, '.json'), json.dumps(entry))
+
+    @staticmethod
+    def _write(path: str, text: str) -> None:
+        # Write then rename so readers never see a partial file
+        tmp = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        with open(tmp, 'w', encoding='utf-8') as f:
+            f.write(text)
+        os.replace(tmp, path)
+
+
+_caches = {}
+_caches_lock = threading.Lock()
+
+def get_page_cache() -> Optional[PageCache]:
+    """The page cache under the Flask instance directory, or None when disabled"""
+    if not Config.SCRAPER_CACHE_ENABLED:
+        return None
+    directory = Config.SCRAPER_CACHE_DIR
+    if not directory:
+        try:
+            instance_path = current_app.instance_path
+        except RuntimeError:
+            instance_path = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'instance')
+        directory = os.path.join(instance_path, 'scrape_cache')
+    with _caches_lock:
+        if directory not in _caches:
+            _caches[directory] = PageCache(directory)
+        return _caches[directory]
@@ -1,33 +1,85 @@
-from flask import Blueprint, jsonify, request
+import json
+from flask import Blueprint, Response, current_app, jsonify, request, stream_with_context
 from app.crud import (
-    create_account, get_account, get_account_by_number,
-    list_accounts, update_account, delete_account
+    create_account, get_account_dict, get_account_dict_by_number,
+    list_accounts, list_accounts_page, iter_account_chunks,
+    list_account_rows, iter_account_row_chunks, search_account_rows,
+    update_account, delete_account, create_accounts_bulk,
+    update_accounts_bulk, transfer_funds, list_ledger_entries
 )
+from app.config import Config
+from app.validation import (
+    query_int, parse_page, parse_search, parse_account, parse_account_updates, parse_bulk_change,
+    parse_transfer
+)
+from app.serializers import account_serializer
+from app.aggregates import get_summary, list_bucket_totals
+from app.search import next_cursor
+from app.cache import get_account_cache
+from app.emailer import delivery_stats
+from app.metrics import PROMETHEUS_MIMETYPE, start_request, finish_request, subsystem_metrics
+from app.admission import admit_request, release_request, get_admission
+from app.group_commit import get_group_commit
 # notifications are handled by CRUD layer (app.crud) to keep behavior consistent
 from app.exceptions import (
     BMSError, AccountNotFoundError, DuplicateAccountError,
-    InvalidAccountDataError
+    InvalidAccountDataError, InsufficientFundsError, DatabaseBusyError
 )
 from app.logger import logger
 
 bp = Blueprint('api', __name__)
+bp.before_request(start_request)
+bp.before_request(admit_request)
+bp.after_request(finish_request)
+bp.teardown_request(release_request)
+
+NDJSON_MIMETYPE = 'application/x-ndjson'
+
+def _config_int(key: str) -> int:
+    """Read an integer setting from the app config, falling back to Config"""
+    return int(current_app.config.get(key, getattr(Config, key)))
+
+def _query_int(name: str, default: int, minimum: int = 0) -> int:
+    """Parse a non-negative integer query parameter"""
+    return query_int(request.args, name, default, minimum)
+
+def _page(default_after: int = 0, min_after: int = 0) -> tuple:
+    """(after, limit) from the query string, capped at MAX_PAGE_SIZE"""
+    return parse_page(request.args, _config_int('PAGE_SIZE'), _config_int('MAX_PAGE_SIZE'),
+                      default_after, min_after)
+
+def _fast_reads() -> bool:
+    """Whether listings use Core rows and the compiled serializer.
+
+    Debug mode pretty-prints JSON, so it always takes the regular path.
+    """
+    return bool(current_app.config.get('FAST_READS', Config.FAST_READS)) and not current_app.debug
+
+def _json_body(body: str) -> Response:
+    """Wrap pre-encoded JSON the same way jsonify would"""
+    return Response(body + '\n', mimetype='application/json')
 
 @bp.errorhandler(BMSError)
 def handle_bms_error(error):
     """Handle custom BMS exceptions"""
     return jsonify({'error': str(error)}), 400
 
+@bp.errorhandler(DatabaseBusyError)
+def handle_database_busy(error):
+    """Ask clients to retry when the database stayed locked"""
+    return jsonify({'error': str(error)}), 503, {'Retry-After': '1'}
+
 @bp.route('/accounts', methods=['POST'])
 def create_new_account():
     """Create a new account"""
     data = request.get_json()
     
     try:
-        account = create_account(
-            name=data['name'],
-            number=data['number'],
-            balance=float(data.get('balance', 0.0))
-        )
+        fields = parse_account(data)
+        writer = get_group_commit()
+        if writer is not None:
+            return jsonify(writer.create_account(**fields)), 201
+        account = create_account(**fields)
         
         return jsonify(account.to_dict()), 201
     
@@ -40,8 +92,7 @@ def create_new_account():
 def get_account_by_id(account_id):
     """Get account by ID"""
     try:
-        account = get_account(account_id)
-        return jsonify(account.to_dict())
+        return jsonify(get_account_dict(account_id))
     except AccountNotFoundError as e:
         return jsonify({'error': str(e)}), 404
 
@@ -49,16 +100,90 @@ def get_account_by_id(account_id):
 def find_account_by_number(account_number):
     """Get account by account number"""
     try:
-        account = get_account_by_number(account_number)
-        return jsonify(account.to_dict())
+        return jsonify(get_account_dict_by_number(account_number))
     except AccountNotFoundError as e:
         return jsonify({'error': str(e)}), 404
 
 @bp.route('/accounts', methods=['GET'])
 def get_all_accounts():
-    """List all accounts"""
-    accounts = list_accounts()
-    return jsonify([account.to_dict() for account in accounts])
+    """List accounts, optionally paginated by id cursor or streamed as NDJSON"""
+    stream = (request.args.get('format') == 'ndjson'
+              or request.accept_mimetypes.best == NDJSON_MIMETYPE)
+    paginate = 'after' in request.args or 'limit' in request.args
+
+    fast = _fast_reads()
+
+    if not stream and not paginate:
+        if fast:
+            return _json_body(account_serializer().dumps_list(list_account_rows()))
+        accounts = list_accounts()
+        return jsonify([account.to_dict() for account in accounts])
+
+    try:
+        after, limit = _page()
+    except ValueError as e:
+        return jsonify({'error': f'Invalid input: {str(e)}'}), 400
+
+    if stream:
+        return _stream_accounts(after, _config_int('STREAM_CHUNK_SIZE'), fast)
+
+    if fast:
+        rows = list_account_rows(after, limit)
+        next_after = rows[-1].id if len(rows) == limit else None
+        return _json_body('{"accounts":' + account_serializer().dumps_list(rows)
+                          + ',"next_after":' + json.dumps(next_after) + '}')
+
+    accounts = list_accounts_page(after, limit)
+    next_after = accounts[-1].id if len(accounts) == limit else None
+    return jsonify({
+        'accounts': [account.to_dict() for account in accounts],
+        'next_after': next_after
+    })
+
+@bp.route('/accounts/summary', methods=['GET'])
+def get_accounts_summary():
+    """Account count and balance total, read from the maintained aggregates"""
+    summary = get_summary()
+    if request.args.get('buckets', '').lower() not in ('1', 'true', 'yes'):
+        return jsonify(summary)
+
+    try:
+        after, limit = _page(default_after=-1, min_after=-1)
+    except ValueError as e:
+        return jsonify({'error': f'Invalid input: {str(e)}'}), 400
+    buckets = list_bucket_totals(after, limit)
+    summary['buckets'] = buckets
+    summary['next_after'] = buckets[-1]['bucket'] if len(buckets) == limit else None
+    return jsonify(summary)
+
+@bp.route('/accounts/search', methods=['GET'])
+def search_accounts():
+    """Filter accounts by name prefix, full text, balance and dates, sorted and keyset-paginated"""
+    try:
+        criteria, limit = parse_search(request.args, _config_int('PAGE_SIZE'), _config_int('MAX_PAGE_SIZE'))
+    except ValueError as e:
+        return jsonify({'error': f'Invalid input: {str(e)}'}), 400
+
+    rows = search_account_rows(criteria, limit)
+    return _json_body('{"accounts":' + account_serializer().dumps_list(rows)
+                      + ',"next_cursor":' + json.dumps(next_cursor(rows, criteria['sort'], limit)) + '}')
+
+def _stream_accounts(after: int, chunk_size: int, fast: bool = False) -> Response:
+    """Stream accounts as NDJSON, one keyset query per chunk"""
+    def generate():
+        count = 0
+        if fast:
+            encode = account_serializer().to_json
+            for chunk in iter_account_row_chunks(after, chunk_size):
+                count += len(chunk)
+                yield ''.join(encode(row) + '\n' for row in chunk)
+        else:
+            for chunk in iter_account_chunks(after, chunk_size):
+                count += len(chunk)
+                yield ''.join(json.dumps(account.to_dict()) + '\n' for account in chunk)
+        logger.info("accounts_streamed", count=count, after=after)
+
+    return Response(stream_with_context(generate()), mimetype=NDJSON_MIMETYPE)
 
 @bp.route('/accounts/<int:account_id>', methods=['PUT'])
 def update_account_details(account_id):
@@ -67,10 +192,11 @@ def update_account_details(account_id):
     
     try:
         # Filter out None values and convert balance to float if present
-        updates = {k: float(v) if k == 'balance' else v 
-                  for k, v in data.items() 
-                  if v is not None}
-        
+        updates = parse_account_updates(data)
+
+        writer = get_group_commit()
+        if writer is not None:
+            return jsonify(writer.update_account(account_id, **updates))
         account = update_account(account_id, **updates)
         return jsonify(account.to_dict())
     
@@ -96,25 +222,31 @@ def create_multiple_accounts():
     if not isinstance(data, list):
         return jsonify({'error': 'Request body must be an array of accounts'}), 400
     
-    results = []
+    # Validate the whole payload before touching the database
+    rows = []
+    positions = []
     errors = []
-    
     for idx, account_data in enumerate(data):
         try:
-            account = create_account(
-                name=account_data['name'],
-                number=account_data['number'],
-                balance=float(account_data.get('balance', 0.0))
-            )
-            
-            results.append(account.to_dict())
-        except (KeyError, ValueError, DuplicateAccountError) as e:
+            rows.append(parse_account(account_data))
+            positions.append(idx)
+        except (KeyError, ValueError, TypeError, AttributeError) as e:
             errors.append({
                 'index': idx,
                 'data': account_data,
                 'error': str(e)
             })
-    
+
+    results, conflicts = create_accounts_bulk(rows)
+    for pos, message in conflicts:
+        idx = positions[pos]
+        errors.append({
+            'index': idx,
+            'data': data[idx],
+            'error': message
+        })
+    errors.sort(key=lambda error: error['index'])
+
     response = {
         'success': results,
         'errors': errors
@@ -124,7 +256,78 @@ def create_multiple_accounts():
     status_code = 201 if results else 400
     return jsonify(response), status_code
 
+@bp.route('/accounts/bulk', methods=['PATCH'])
+def update_multiple_accounts():
+    """Apply many account changes in one transaction and return a summary"""
+    data = request.get_json()
+    if not isinstance(data, list):
+        return jsonify({'error': 'Request body must be an array of changes'}), 400
+
+    changes = []
+    positions = []
+    errors = []
+    for idx, change in enumerate(data):
+        try:
+            changes.append(parse_bulk_change(change))
+            positions.append(idx)
+        except (KeyError, ValueError, TypeError) as e:
+            errors.append({'index': idx, 'error': str(e)})
+
+    try:
+        updated, missing = update_accounts_bulk(changes) if changes else (0, [])
+    except InvalidAccountDataError as e:
+        return jsonify({'error': str(e)}), 400
+    not_found = [{'index': positions[pos], 'id': changes[pos][0]} for pos in missing]
+
+    response = {
+        'updated': updated,
+        'not_found': not_found,
+        'errors': errors
+    }
+    # Return 200 if at least one account was updated, 400 if nothing applied
+    status_code = 200 if updated else 400
+    return jsonify(response), status_code
+
+@bp.route('/transfers', methods=['POST'])
+def create_transfer():
+    """Move money between two accounts"""
+    data = request.get_json()
+    try:
+        transfer = transfer_funds(*parse_transfer(data))
+        return jsonify(transfer), 201
+
+    except (KeyError, ValueError, TypeError) as e:
+        return jsonify({'error': f'Invalid input: {str(e)}'}), 400
+    except InvalidAccountDataError as e:
+        return jsonify({'error': str(e)}), 400
+    except AccountNotFoundError as e:
+        return jsonify({'error': str(e)}), 404
+    except InsufficientFundsError as e:
+        return jsonify({'error': str(e)}), 409
+
+@bp.route('/accounts/<int:account_id>/ledger', methods=['GET'])
+def get_account_ledger(account_id):
+    """Page through an account's ledger entries by id cursor"""
+    try:
+        after, limit = _page()
+    except ValueError as e:
+        return jsonify({'error': f'Invalid input: {str(e)}'}), 400
+
+    entries = list_ledger_entries(account_id, after, limit)
+    next_after = entries[-1].id if len(entries) == limit else None
+    return jsonify({
+        'entries': [entry.to_dict() for entry in entries],
+        'next_after': next_after
+    })
+
 @bp.route('/health', methods=['GET'])
 def health_check():
     """Health check endpoint"""
-    return jsonify({'status': 'healthy'})
\ No newline at end of file
+    return jsonify({'status': 'healthy'})
+
+@bp.route('/metrics', methods=['GET'])
+def metrics():
+    """Request, database, cache, email, admission and group-commit metrics in Prometheus text format"""
+    extra = subsystem_metrics(delivery_stats(), get_account_cache(), get_admission(), get_group_commit())
+    body = current_app.extensions['metrics'].render(extra)
+    return Response(body, content_type=PROMETHEUS_MIMETYPE)
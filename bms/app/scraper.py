@@ -1,13 +1,20 @@
-import requests
-from bs4 import BeautifulSoup
-from selenium import webdriver
-from selenium.webdriver.chrome.options import Options
+from typing import TYPE_CHECKING, Callable, Dict, Iterable, Optional, Union
 from app.config import Config
 from app.exceptions import ScrapingError
+from app.page_cache import get_page_cache
 from app.logger import logger
 
-def scrape_with_requests(url: str) -> BeautifulSoup:
+# requests, bs4, selenium and aiohttp are imported on first use so that
+# importing this module (or anything that imports it) stays cheap
+if TYPE_CHECKING:
+    from bs4 import BeautifulSoup
+    from app.extraction import RuleSet
+    from app.fetcher import AsyncFetcher
+
+def scrape_with_requests(url: str) -> 'BeautifulSoup':
     """Scrape webpage using requests and BeautifulSoup"""
+    import requests
+    from bs4 import BeautifulSoup
     try:
         response = requests.get(url, timeout=Config.SCRAPING_TIMEOUT)
         response.raise_for_status()
@@ -16,8 +23,11 @@ def scrape_with_requests(url: str) -> BeautifulSoup:
         logger.error("scraping_failed", error=str(e), url=url, method="requests")
         raise ScrapingError(f"Failed to scrape {url}: {str(e)}")
 
-def scrape_with_selenium(url: str) -> BeautifulSoup:
+def scrape_with_selenium(url: str) -> 'BeautifulSoup':
     """Scrape webpage using Selenium (for JavaScript-heavy sites)"""
+    from bs4 import BeautifulSoup
+    from selenium import webdriver
+    from selenium.webdriver.chrome.options import Options
     options = Options()
     options.add_argument('--headless')
     options.add_argument('--disable-gpu')
@@ -32,21 +42,86 @@ def scrape_with_selenium(url: str) -> BeautifulSoup:
         logger.error("scraping_failed", error=str(e), url=url, method="selenium")
         raise ScrapingError(f"Failed to scrape {url} with Selenium: {str(e)}")
 
+def extract_interest_rates(soup: 'BeautifulSoup') -> dict:
+    """Extract interest rates from a parsed bank page with the default rules"""
+    from app.extraction import rules_for
+    return rules_for(None, 'interest_rates').extract_soup(soup)
+
+def extract_bank_info(soup: 'BeautifulSoup') -> dict:
+    """Extract bank information from a parsed bank page with the default rules"""
+    from app.extraction import rules_for
+    return rules_for(None, 'bank_info').extract_soup(soup)
+
+Extractor = Union[Callable[['BeautifulSoup'], dict], 'RuleSet', str]
+
+def _resolve_extractor(extract: Extractor, url: str):
+    from app.extraction import rules_for
+    # A rule kind name picks the compiled rules for the URL's site
+    return rules_for(url, extract) if isinstance(extract, str) else extract
+
+def _extractor_key(extract) -> Optional[str]:
+    """Name the page cache stores this extractor's results under, or None to always re-run it.
+
+    Rule sets and callables with a `cache_key` attribute name themselves;
+    module-level functions are named by module and qualified name. Lambdas
+    and closures share their qualified name with their siblings, so their
+    results are not reused.
+    """
+    from app.extraction import RuleSet
+    if isinstance(extract, RuleSet):
+        return extract.key
+    key = getattr(extract, 'cache_key', None)
+    if key is not None:
+        return str(key)
+    qualname = getattr(extract, '__qualname__', '')
+    if not qualname or '<' in qualname:
+        return None
+    return f"{extract.__module__}.{qualname}"
+
+def _html_parser(extract) -> Callable[[str], dict]:
+    """html -> dict: rule sets parse only what they match, callables get the full tree"""
+    from bs4 import BeautifulSoup
+    from app.extraction import RuleSet, parser_name
+    if isinstance(extract, RuleSet):
+        return extract.extract
+    return lambda html: extract(BeautifulSoup(html, parser_name()))
+
+def scrape_page(url: str, extract: Extractor) -> dict:
+    """Fetch a page and run `extract` on it, revalidating through the page cache.
+
+    `extract` is a callable on the parsed page, a RuleSet, or a rule kind
+    such as 'interest_rates'. Cached pages are refreshed with If-None-Match /
+    If-Modified-Since; a 304 or an unchanged body reuses the stored
+    extraction without parsing. Lambdas and closures only get that reuse
+    when they carry a `cache_key` attribute.
+    """
+    import requests
+    from app.extraction import RuleSet
+    extract = _resolve_extractor(extract, url)
+    if Config.USE_SELENIUM:
+        soup = scrape_with_selenium(url)
+        return extract.extract_soup(soup) if isinstance(extract, RuleSet) else extract(soup)
+    cache = get_page_cache()
+    try:
+        response = requests.get(url, timeout=Config.SCRAPING_TIMEOUT,
+                                headers=cache.conditional_headers(url) if cache else None)
+        if response.status_code != 304:
+            response.raise_for_status()
+    except Exception as e:
+        logger.error("scraping_failed", error=str(e), url=url, method="requests")
+        raise ScrapingError(f"Failed to scrape {url}: {str(e)}")
+    if cache is None:
+        return _html_parser(extract)(response.text)
+    body = response.text if response.status_code != 304 else None
+    result = cache.resolve(url, response.status_code, body, response.headers, _extractor_key(extract),
+                           _html_parser(extract))
+    cache.log_stats()
+    return result
+
 def scrape_interest_rates(url: str) -> dict:
     """Scrape current interest rates from a bank's website"""
     try:
-        if Config.USE_SELENIUM:
-            soup = scrape_with_selenium(url)
-        else:
-            soup = scrape_with_requests(url)
-            
-        # This is a placeholder implementation
-        # You would need to customize this based on the specific website's structure
-        rates = {
-            'savings': 0.0,
-            'checking': 0.0,
-            'cd': 0.0
-        }
+        rates = scrape_page(url, 'interest_rates')
         
         logger.info("interest_rates_scraped", url=url, rates=rates)
         return rates
@@ -58,23 +133,59 @@ def scrape_interest_rates(url: str) -> dict:
 def scrape_bank_info(url: str) -> dict:
     """Scrape bank information from a website"""
     try:
-        if Config.USE_SELENIUM:
-            soup = scrape_with_selenium(url)
-        else:
-            soup = scrape_with_requests(url)
-            
-        # This is a placeholder implementation
-        # You would need to customize this based on the specific website's structure
-        info = {
-            'name': '',
-            'description': '',
-            'contact': '',
-            'address': ''
-        }
+        info = scrape_page(url, 'bank_info')
         
         logger.info("bank_info_scraped", url=url)
         return info
         
     except Exception as e:
         logger.error("bank_info_scraping_failed", error=str(e), url=url)
-        raise ScrapingError(f"Failed to scrape bank info: {str(e)}")
\ No newline at end of file
+        raise ScrapingError(f"Failed to scrape bank info: {str(e)}")
+
+async def scrape_many_async(urls: Iterable[str], extract: Extractor,
+                            fetcher: 'AsyncFetcher' = None) -> Dict[str, Union[dict, ScrapingError]]:
+    """Fetch many pages concurrently and run `extract` on each.
+
+    Returns a dict keyed by URL whose values are extracted dicts, or the
+    ScrapingError for pages that could not be fetched or parsed. Pages are
+    revalidated through the page cache like `scrape_page`.
+    """
+    if fetcher is None:
+        from app.fetcher import AsyncFetcher
+        fetcher = AsyncFetcher()
+    cache = get_page_cache()
+    results = {}
+    pages = await fetcher.fetch_all(urls, cache.conditional_headers if cache else None)
+    for page in pages:
+        if not page.ok:
+            results[page.url] = ScrapingError(f"Failed to scrape {page.url}: {page.error}")
+            continue
+        try:
+            page_extract = _resolve_extractor(extract, page.url)
+            key, parse = _extractor_key(page_extract), _html_parser(page_extract)
+            if cache is not None:
+                body = page.text if page.status != 304 else None
+                results[page.url] = cache.resolve(page.url, page.status, body, page.headers, key, parse)
+            else:
+                results[page.url] = parse(page.text)
+        except Exception as e:
+            logger.error("scraping_parse_failed", error=str(e), url=page.url)
+            results[page.url] = ScrapingError(f"Failed to parse {page.url}: {str(e)}")
+    if cache is not None:
+        cache.log_stats()
+    return results
+
+def scrape_many(urls: Iterable[str], extract: Extractor,
+                **fetcher_options) -> Dict[str, Union[dict, ScrapingError]]:
+    """Synchronous wrapper around `scrape_many_async`"""
+    import asyncio
+    from app.fetcher import AsyncFetcher
+    return asyncio.run(scrape_many_async(urls, extract, AsyncFetcher(**fetcher_options)))
+
+def scrape_interest_rates_many(urls: Iterable[str], **fetcher_options) -> Dict[str, Union[dict, ScrapingError]]:
+    """Scrape interest rates from many bank websites concurrently"""
+    return scrape_many(urls, 'interest_rates', **fetcher_options)
+
+def scrape_bank_info_many(urls: Iterable[str], **fetcher_options) -> Dict[str, Union[dict, ScrapingError]]:
+    """Scrape bank information from many websites concurrently"""
+    return scrape_many(urls, 'bank_info', **fetcher_options)
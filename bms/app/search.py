@@ -0,0 +1,146 @@
+import operator
+from typing import Optional
+from flask import current_app
+from sqlalchemy import column, literal_column, select, table, text, tuple_
+from sqlalchemy.exc import OperationalError
+from sqlalchemy.sql.expression import UnaryExpression
+from sqlalchemy.sql.operators import custom_op
+from app.db import db
+from app.logger import logger
+from app.models import Account
+from app.serializers import account_serializer
+from app.validation import encode_cursor
+
+# (criteria key, sort sharing its index, column, comparison) of the range filters
+_RANGES = (
+    ('min_balance', 'balance', Account.balance, operator.ge),
+    ('max_balance', 'balance', Account.balance, operator.le),
+    ('created_after', 'created_at', Account.created_at, operator.ge),
+    ('created_before', 'created_at', Account.created_at, operator.lt),
+    ('updated_after', 'updated_at', Account.updated_at, operator.ge),
+    ('updated_before', 'updated_at', Account.updated_at, operator.lt),
+)
+
+# External-content FTS5 index over account names, kept in sync by triggers.
+# The update trigger fires only when `name` is written, so balance updates skip it.
+SEARCH_DDL = (
+    "CREATE VIRTUAL TABLE IF NOT EXISTS accounts_fts USING fts5(name, content='accounts', content_rowid='id')",
+    "CREATE TRIGGER IF NOT EXISTS accounts_fts_insert AFTER INSERT ON accounts BEGIN "
+    "INSERT INTO accounts_fts(rowid, name) VALUES (new.id, new.name); END",
+    "CREATE TRIGGER IF NOT EXISTS accounts_fts_delete AFTER DELETE ON accounts BEGIN "
+    "INSERT INTO accounts_fts(accounts_fts, rowid, name) VALUES ('delete', old.id, old.name); END",
+    "CREATE TRIGGER IF NOT EXISTS accounts_fts_update AFTER UPDATE OF name ON accounts BEGIN "
+    "INSERT INTO accounts_fts(accounts_fts, rowid, name) VALUES ('delete', old.id, old.name); "
+    "INSERT INTO accounts_fts(rowid, name) VALUES (new.id, new.name); END",
+)
+_SEARCH_OBJECTS = ('accounts_fts', 'accounts_fts_insert', 'accounts_fts_delete', 'accounts_fts_update')
+
+_fts = table('accounts_fts', column('rowid'))
+
+
+def install_search(conn) -> bool:
+    """Create the FTS5 table and its triggers when any are missing, then rebuild the index.
+
+    Returns whether full-text search is available: False on databases other
+    than SQLite or SQLite builds without FTS5, where `q` falls back to LIKE.
+    """
+    if conn.dialect.name != 'sqlite':
+        return False
+    found = set(conn.execute(text("SELECT name FROM sqlite_master")).scalars()) & set(_SEARCH_OBJECTS)
+    if found == set(_SEARCH_OBJECTS):
+        return True
+    try:
+        for statement in SEARCH_DDL:
+            conn.execute(text(statement))
+        # Index the rows written while the triggers were missing
+        conn.execute(text("INSERT INTO accounts_fts(accounts_fts) VALUES ('rebuild')"))
+    except OperationalError as e:  # no FTS5 in this SQLite build
+        logger.warning("search_fts_unavailable", error=str(e))
+        return False
+    logger.info("search_index_built", created=sorted(set(_SEARCH_OBJECTS) - found))
+    return True
+
+def init_search(app) -> None:
+    """Make sure the full-text index exists and record whether it is usable"""
+    with app.app_context():
+        with db.engine.begin() as conn:
+            app.extensions['search_fts'] = install_search(conn)
+
+def fts_enabled() -> bool:
+    return bool(current_app.extensions.get('search_fts'))
+
+def fts_query(terms: str) -> str:
+    """User text as an FTS5 query: every word must match, operators are taken literally"""
+    return ' '.join('"' + word.replace('"', '""') + '"' for word in terms.split())
+
+def _escape_like(value: str) -> str:
+    return value.replace('\\', '\\\\').replace('%', '\\%').replace('_', '\\_')
+
+def _sort_column(sort: str, dialect: str):
+    if sort == 'name' and dialect == 'sqlite':
+        # Matches the NOCASE index, which also serves the prefix LIKE
+        return Account.name.collate('NOCASE')
+    return getattr(Account, sort)
+
+def _unindexed(expression):
+    """``+expression``: same value, collation and order, but SQLite will not walk an index for it"""
+    return UnaryExpression(expression, operator=custom_op('+'))
+
+def search_statement(criteria: dict, limit: int, dialect: str = 'sqlite', fts: bool = True):
+    """Core select for one page of GET /accounts/search, rows for `account_serializer()`.
+
+    `criteria` comes from `validation.parse_search`. Every filter maps onto an
+    index: the name prefix onto the NOCASE name index (SQLite's LIKE
+    optimisation), `q` onto the FTS5 table, balance and date ranges onto
+    their column indexes. Pages are keyset cursors over (sort column, id).
+    """
+    stmt = account_serializer().select()
+    sort, descending, cursor = criteria.get('sort', 'id'), criteria.get('descending', False), criteria.get('cursor')
+    # Filters on another column than the sort; their index must drive the query
+    other_filters = False
+    if criteria.get('name'):
+        stmt = stmt.where(Account.name.like(_escape_like(criteria['name']) + '%', escape='\\'))
+        other_filters = sort != 'name'
+    if criteria.get('q'):
+        if fts:
+            matches = (select(_fts.c.rowid)
+                       .where(literal_column('accounts_fts').op('MATCH')(fts_query(criteria['q']))))
+            stmt = stmt.where(Account.id.in_(matches))
+        else:
+            for word in criteria['q'].split():
+                stmt = stmt.where(Account.name.ilike('%' + _escape_like(word) + '%', escape='\\'))
+        other_filters = True
+    for param, shared_sort, field, compare in _RANGES:
+        if criteria.get(param) is not None:
+            stmt = stmt.where(compare(field, criteria[param]))
+            other_filters = other_filters or sort != shared_sort
+
+    key = _sort_column(sort, dialect)
+    if cursor is not None:
+        if sort == 'id':
+            stmt = stmt.where(Account.id < cursor[1] if descending else Account.id > cursor[1])
+        else:
+            # The plain bound on the sort column is implied, but lets SQLite seek its index
+            # (it does not always derive a range from a row value with a collation)
+            position, after = tuple_(key, Account.id), tuple_(cursor[0], cursor[1])
+            if descending:
+                stmt = stmt.where(key <= cursor[0], position < after)
+            else:
+                stmt = stmt.where(key >= cursor[0], position > after)
+
+    # SQLite prefers walking the sort column's index (or the table in id order)
+    # to skip the sort, even when that reads every row to find a few matches.
+    # Hiding it from the ORDER BY lets the filter's index drive; sorting the
+    # matches is cheap next to a scan.
+    order = [key] if sort == 'id' else [key, Account.id]
+    if other_filters and dialect == 'sqlite':
+        order = [_unindexed(expression) for expression in order]
+    if descending:
+        order = [expression.desc() for expression in order]
+    return stmt.order_by(*order).limit(limit)
+
+def next_cursor(rows, sort: str, limit: int) -> Optional[str]:
+    """Opaque cursor for the page after `rows`, or None on the last page"""
+    if len(rows) < limit:
+        return None
+    return encode_cursor(getattr(rows[-1], sort), rows[-1].id)
@@ -0,0 +1,100 @@
+from functools import lru_cache
+from json.encoder import encode_basestring_ascii
+from typing import Callable, Sequence, Tuple
+from sqlalchemy import DateTime, Float, Numeric, select, type_coerce
+from app.models import Account, LedgerEntry
+
+
+class RowSerializer:
+    """Row -> dict / JSON converters generated once for a fixed column set.
+
+    Rows come from SQLAlchemy Core selects built by `select()`, so Numeric
+    columns arrive as plain floats instead of Decimals. Output matches
+    `Account.to_dict()` and Flask's compact `jsonify` (sorted keys, ASCII).
+    """
+
+    def __init__(self, columns: Sequence):
+        self.columns = tuple(columns)
+        self.to_dict = self._compile_dict()
+        self.to_json = self._compile_json()
+
+    def expressions(self) -> list:
+        """The columns with Numeric read as float, for select() or RETURNING"""
+        return [type_coerce(column, Float) if self._kind(column) == 'numeric' else column
+                for column in self.columns]
+
+    def select(self):
+        """Core select of this column set, with Numeric read as float"""
+        return select(*self.expressions())
+
+    def dumps_list(self, rows) -> str:
+        return '[' + ','.join(map(self.to_json, rows)) + ']'
+
+    @staticmethod
+    def _kind(column) -> str:
+        if isinstance(column.type, Float) or not isinstance(column.type, Numeric):
+            return 'datetime' if isinstance(column.type, DateTime) else 'plain'
+        return 'numeric'
+
+    @staticmethod
+    def _number(i: int, column) -> str:
+        # to_dict() goes through a Decimal quantized to the column scale
+        if column.type.scale is None:
+            return f"float(v{i})"
+        return f"round(float(v{i}), {column.type.scale})"
+
+    def _compile(self, name: str, body: str) -> Callable:
+        namespace = {'_str': encode_basestring_ascii, '_float': float.__repr__}
+        args = ', '.join(f"v{i}" for i in range(len(self.columns)))
+        source = f"def {name}(row):\n    {args}, = row\n    return {body}\n"
+        exec(compile(source, f"<{name}:{','.join(c.key for c in self.columns)}>", 'exec'), namespace)
+        return namespace[name]
+
+    def _compile_dict(self) -> Callable:
+        items = []
+        for i, column in enumerate(self.columns):
+            kind = self._kind(column)
+            if kind == 'numeric':
+                value = self._number(i, column)
+            elif kind == 'datetime':
+                value = f"v{i}.isoformat()"
+            else:
+                value = f"v{i}"
+            items.append(f"{column.key!r}: (None if v{i} is None else {value})")
+        return self._compile('row_to_dict', '{' + ', '.join(items) + '}')
+
+    def _compile_json(self) -> Callable:
+        parts = []
+        ordered = sorted(enumerate(self.columns), key=lambda item: item[1].key)
+        for position, (i, column) in enumerate(ordered):
+            kind = self._kind(column)
+            python_type = column.type.python_type
+            if kind == 'numeric':
+                value = f"_float({self._number(i, column)})"
+            elif kind == 'datetime':
+                value = f"'\"%s\"' % v{i}.isoformat()"
+            elif python_type is str:
+                value = f"_str(v{i})"
+            elif python_type is float:
+                value = f"_float(v{i})"
+            elif python_type is bool:
+                value = f"('true' if v{i} else 'false')"
+            else:
+                value = f"str(v{i})"
+            prefix = ('{' if position == 0 else ',') + encode_basestring_ascii(column.key) + ':'
+            parts.append(f"{prefix!r}, ('null' if v{i} is None else {value})")
+        return self._compile('row_to_json', "''.join((" + ', '.join(parts) + ", '}'))")
+
+
+@lru_cache(maxsize=None)
+def serializer_for(columns: Tuple) -> RowSerializer:
+    """The compiled serializer for a column set, built on first use"""
+    return RowSerializer(columns)
+
+def account_serializer() -> RowSerializer:
+    """Serializer producing the same fields as `Account.to_dict()`"""
+    return serializer_for(tuple(Account.__table__.columns))
+
+def ledger_serializer() -> RowSerializer:
+    """Serializer producing the same fields as `LedgerEntry.to_dict()`"""
+    return serializer_for(tuple(LedgerEntry.__table__.columns))
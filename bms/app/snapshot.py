@@ -0,0 +1,235 @@
+import heapq
+import sys
+from array import array
+from bisect import bisect_left
+from datetime import datetime, timedelta
+from typing import Dict, List, Optional, Tuple
+from flask import current_app
+from sqlalchemy import Integer, cast, func, select
+from app.config import Config
+from app.db import db
+from app.logger import logger
+from app.models import Account
+
+try:
+    import numpy as np
+except ImportError:  # numpy is optional; operations fall back to plain loops
+    np = None
+
+_EPOCH = datetime(1970, 1, 1)
+
+# Orderable on AccountSnapshot.top()
+_TOP_FIELDS = {'balance': 'balance_cents', 'interest_rate': 'rates_bp'}
+
+
+def _refresh_overlap() -> float:
+    """SNAPSHOT_REFRESH_OVERLAP from the Flask app config when available, else from Config"""
+    try:
+        return float(current_app.config.get('SNAPSHOT_REFRESH_OVERLAP', Config.SNAPSHOT_REFRESH_OVERLAP))
+    except RuntimeError:
+        return float(Config.SNAPSHOT_REFRESH_OVERLAP)
+
+def _rows_select():
+    """id, number, balance and rate as integer cents/basis points, and updated_at"""
+    return (select(Account.id, Account.number,
+                   cast(func.round(func.coalesce(Account.balance, 0) * 100), Integer),
+                   cast(func.round(func.coalesce(Account.interest_rate, 0) * 100), Integer),
+                   Account.updated_at)
+            .order_by(Account.id))
+
+def _timestamp(value: Optional[datetime]) -> float:
+    return (value - _EPOCH).total_seconds() if value is not None else 0.0
+
+
+class AccountSnapshot:
+    """Read-only columnar copy of the accounts table for analytics and batch jobs.
+
+    Accounts are held in parallel arrays ordered by id: `ids`,
+    `balance_cents`, `rates_bp` (interest rate in basis points) and
+    `updated_at` (UTC epoch seconds), plus `numbers` and a number -> position
+    dict: under 200 bytes per account, against about 1.4 KB for an ORM object.
+    `load()` reads everything with one query; `refresh()` re-reads only rows
+    changed since the `updated_at` watermark. Sums, filters and top-N run as
+    numpy array operations when numpy is installed.
+
+    Slicing (``snapshot[i:j]``) returns a snapshot of those positions, which
+    is how the batch processors split it.
+    """
+
+    def __init__(self):
+        self.ids = array('q')
+        self.balance_cents = array('q')
+        self.rates_bp = array('q')
+        self.updated_at = array('d')
+        self.numbers: List[str] = []
+        self.index: Dict[str, int] = {}
+        self.watermark: Optional[datetime] = None
+
+    @classmethod
+    def load(cls) -> 'AccountSnapshot':
+        """Build a snapshot of every account from a single query"""
+        snapshot = cls()
+        rows = db.session.execute(_rows_select()).all()
+        if rows:
+            ids, numbers, cents, rates, stamps = zip(*rows)
+            snapshot.ids = array('q', ids)
+            snapshot.balance_cents = array('q', cents)
+            snapshot.rates_bp = array('q', rates)
+            snapshot.updated_at = array('d', map(_timestamp, stamps))
+            snapshot.numbers = list(numbers)
+            snapshot._reindex()
+            snapshot.watermark = max((stamp for stamp in stamps if stamp is not None), default=None)
+        logger.info("snapshot_loaded", accounts=len(snapshot))
+        return snapshot
+
+    def refresh(self) -> dict:
+        """Apply rows changed since the watermark; returns updated/added/removed counts.
+
+        Rows are re-read from `SNAPSHOT_REFRESH_OVERLAP` seconds before the
+        watermark, so a transaction that stamped `updated_at` just before
+        the last refresh but committed after it is still picked up.
+        Deletions leave no timestamp behind; they are found by comparing the
+        row count and, when it differs, the full id list.
+        """
+        stmt = _rows_select()
+        if self.watermark is not None:
+            stmt = stmt.where(Account.updated_at > self.watermark - timedelta(seconds=_refresh_overlap()))
+        summary = {'updated': 0, 'added': 0, 'removed': 0}
+        reindex = False
+        for account_id, number, cents, rate, stamp in db.session.execute(stmt):
+            position = bisect_left(self.ids, account_id)
+            if position < len(self.ids) and self.ids[position] == account_id:
+                if self.numbers[position] != number:
+                    del self.index[self.numbers[position]]
+                    self.index[number] = position
+                    self.numbers[position] = number
+                self.balance_cents[position] = cents
+                self.rates_bp[position] = rate
+                self.updated_at[position] = _timestamp(stamp)
+                summary['updated'] += 1
+            else:
+                # New ids are almost always the largest, which makes this an append
+                reindex = reindex or position < len(self.ids)
+                self.ids.insert(position, account_id)
+                self.balance_cents.insert(position, cents)
+                self.rates_bp.insert(position, rate)
+                self.updated_at.insert(position, _timestamp(stamp))
+                self.numbers.insert(position, number)
+                self.index[number] = position
+                summary['added'] += 1
+            if stamp is not None and (self.watermark is None or stamp > self.watermark):
+                self.watermark = stamp
+
+        if db.session.scalar(select(func.count(Account.id))) != len(self.ids):
+            summary['removed'] = self._drop_missing(set(db.session.scalars(select(Account.id))))
+            reindex = reindex or summary['removed'] > 0
+        if reindex:
+            self._reindex()
+        logger.info("snapshot_refreshed", accounts=len(self), **summary)
+        return summary
+
+    def _drop_missing(self, live_ids: set) -> int:
+        keep = [position for position, account_id in enumerate(self.ids) if account_id in live_ids]
+        removed = len(self.ids) - len(keep)
+        if removed:
+            for name in ('ids', 'balance_cents', 'rates_bp', 'updated_at'):
+                column = getattr(self, name)
+                setattr(self, name, array(column.typecode, (column[position] for position in keep)))
+            self.numbers = [self.numbers[position] for position in keep]
+        return removed
+
+    def _reindex(self):
+        self.index = {number: position for position, number in enumerate(self.numbers)}
+
+    def __len__(self) -> int:
+        return len(self.ids)
+
+    def __getitem__(self, key):
+        if not isinstance(key, slice):
+            raise TypeError("AccountSnapshot supports slicing only; use get() for one account")
+        part = AccountSnapshot()
+        part.ids = self.ids[key]
+        part.balance_cents = self.balance_cents[key]
+        part.rates_bp = self.rates_bp[key]
+        part.updated_at = self.updated_at[key]
+        part.numbers = self.numbers[key]
+        part._reindex()
+        part.watermark = self.watermark
+        return part
+
+    def get(self, number: str) -> Optional[dict]:
+        """One account's columns by account number, or None"""
+        position = self.index.get(number)
+        if position is None:
+            return None
+        return {'id': self.ids[position], 'number': number,
+                'balance': self.balance_cents[position] / 100,
+                'interest_rate': self.rates_bp[position] / 100,
+                'updated_at': datetime.utcfromtimestamp(self.updated_at[position]).isoformat()}
+
+    def total_cents(self) -> int:
+        if np is not None:
+            return int(np.frombuffer(self.balance_cents, dtype=np.int64).sum())
+        return sum(self.balance_cents)
+
+    def total(self) -> float:
+        """Sum of balances"""
+        return self.total_cents() / 100
+
+    def filter(self, min_balance: Optional[float] = None, max_balance: Optional[float] = None,
+               min_rate: Optional[float] = None, max_rate: Optional[float] = None) -> List[int]:
+        """Ids of accounts whose balance and interest rate fall within the given inclusive bounds"""
+        bounds = []
+        for column, low, high in ((self.balance_cents, min_balance, max_balance),
+                                  (self.rates_bp, min_rate, max_rate)):
+            if low is not None or high is not None:
+                # Compare in the columns' integer units
+                bounds.append((column, None if low is None else round(low * 100),
+                               None if high is None else round(high * 100)))
+        if np is not None:
+            mask = np.ones(len(self.ids), dtype=bool)
+            for column, low, high in bounds:
+                values = np.frombuffer(column, dtype=np.int64)
+                if low is not None:
+                    mask &= values >= low
+                if high is not None:
+                    mask &= values <= high
+            return np.frombuffer(self.ids, dtype=np.int64)[mask].tolist()
+        return [account_id for position, account_id in enumerate(self.ids)
+                if all((low is None or column[position] >= low) and (high is None or column[position] <= high)
+                       for column, low, high in bounds)]
+
+    def top(self, n: int, by: str = 'balance') -> List[Tuple[int, float]]:
+        """(id, value) of the `n` accounts with the largest balance or interest rate, largest first"""
+        column = getattr(self, _TOP_FIELDS[by])
+        n = min(n, len(column))
+        if n <= 0:
+            return []
+        if np is not None:
+            values = np.frombuffer(column, dtype=np.int64)
+            ids = np.frombuffer(self.ids, dtype=np.int64)
+            # Partition down to the n largest (plus ties), then order by value, lower id first on ties
+            threshold = values[np.argpartition(-values, n - 1)[:n]].min()
+            candidates = np.flatnonzero(values >= threshold)
+            order = candidates[np.lexsort((ids[candidates], -values[candidates]))][:n]
+            return [(int(ids[i]), int(values[i]) / 100) for i in order]
+        positions = heapq.nsmallest(n, range(len(column)), key=lambda i: (-column[i], self.ids[i]))
+        return [(self.ids[i], column[i] / 100) for i in positions]
+
+    def batch_totals(self, batch_size: int) -> List[Tuple[int, float]]:
+        """(batch_num, total) for consecutive `batch_size` accounts, as `process_batch_threaded` numbers them"""
+        if not self.ids:
+            return []
+        if np is not None:
+            sums = np.add.reduceat(np.frombuffer(self.balance_cents, dtype=np.int64),
+                                   np.arange(0, len(self.ids), batch_size))
+            return [(num, int(total) / 100) for num, total in enumerate(sums.tolist())]
+        return [(num, sum(self.balance_cents[lo:lo + batch_size]) / 100)
+                for num, lo in enumerate(range(0, len(self.ids), batch_size))]
+
+    def nbytes(self) -> int:
+        """Approximate memory held by the arrays, numbers and index"""
+        size = sum(column.itemsize * len(column)
+                   for column in (self.ids, self.balance_cents, self.rates_bp, self.updated_at))
+        size += sys.getsizeof(self.numbers) + sys.getsizeof(self.index)
+        return size + sum(sys.getsizeof(number) for number in self.numbers)
@@ -0,0 +1,95 @@
+"""Where a cold start spends its time.
+
+Boots `create_app()` in a fresh interpreter under ``python -X importtime``
+and prints the slowest imports, import time per top-level package and the
+time of each `create_app` step.
+
+Usage: python -m app.startup_report [--top 15] [--database sqlite:///:memory:]
+(also installed as the `startup-report` console script)
+"""
+import argparse
+import json
+import os
+import subprocess
+import sys
+from typing import Dict, List, NamedTuple
+
+_PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Runs in the child interpreter; prints one JSON line with the timings
+_PROBE = """
+import json, time
+started = time.perf_counter()
+from app import create_app
+imported = time.perf_counter()
+app = create_app()
+print(json.dumps({'import': imported - started, 'create_app': time.perf_counter() - imported,
+                  'steps': app.extensions['startup_timings']}))
+"""
+
+
+class ImportTiming(NamedTuple):
+    module: str
+    self_us: int
+    cumulative_us: int
+    depth: int
+
+
+def parse_importtime(stderr: str) -> List[ImportTiming]:
+    """Parse `-X importtime` lines ('import time: self | cumulative | name')"""
+    timings = []
+    for line in stderr.splitlines():
+        if not line.startswith('import time:'):
+            continue
+        self_us, cumulative_us, name = line[len('import time:'):].split('|')
+        if not self_us.strip().isdigit():
+            continue  # header line
+        module = name.rstrip()
+        depth = (len(module) - len(module.lstrip())) // 2
+        timings.append(ImportTiming(module.strip(), int(self_us), int(cumulative_us), depth))
+    return timings
+
+def by_package(timings: List[ImportTiming]) -> Dict[str, int]:
+    """Self time in microseconds summed per top-level package, slowest first"""
+    totals = {}
+    for timing in timings:
+        package = timing.module.split('.')[0]
+        totals[package] = totals.get(package, 0) + timing.self_us
+    return dict(sorted(totals.items(), key=lambda item: item[1], reverse=True))
+
+def measure(database: str = None) -> dict:
+    """Cold-start timings and import breakdown from a fresh interpreter"""
+    env = dict(os.environ, EMAIL_TEST_MODE='true')
+    if database:
+        env['DATABASE_URL'] = database
+    result = subprocess.run([sys.executable, '-X', 'importtime', '-c', _PROBE], cwd=_PROJECT_ROOT,
+                            env=env, capture_output=True, text=True, check=True)
+    report = json.loads(result.stdout.strip().splitlines()[-1])
+    report['imports'] = parse_importtime(result.stderr)
+    return report
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--top', type=int, default=15, help="Slowest imports and packages to list")
+    parser.add_argument('--database', help="DATABASE_URL for the probe (default: the configured one)")
+    args = parser.parse_args(argv)
+
+    report = measure(args.database)
+    imports = report['imports']
+    print(f"cold start: {(report['import'] + report['create_app']) * 1000:.1f} ms "
+          f"(imports {report['import'] * 1000:.1f} ms, create_app {report['create_app'] * 1000:.1f} ms)")
+
+    print("\ncreate_app steps:")
+    for step, seconds in report['steps'].items():
+        print(f"  {step:<20} {seconds * 1000:>8.1f} ms")
+
+    print(f"\nimport time by package (self, top {args.top}):")
+    for package, micros in list(by_package(imports).items())[:args.top]:
+        print(f"  {package:<30} {micros / 1000:>8.1f} ms")
+
+    print(f"\nslowest imports (cumulative, top {args.top}):")
+    for timing in sorted(imports, key=lambda timing: timing.cumulative_us, reverse=True)[:args.top]:
+        print(f"  {timing.module:<40} {timing.cumulative_us / 1000:>8.1f} ms")
+
+if __name__ == '__main__':
+    main()
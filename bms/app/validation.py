@@ -0,0 +1,151 @@
+import base64
+import json
+import math
+from datetime import datetime, timezone
+from typing import Mapping, Optional, Tuple
+
+# Columns PATCH /accounts/bulk may change; numbers stay put to keep the unique index out of it
+BULK_UPDATE_FIELDS = ('name', 'balance', 'interest_rate')
+
+# Columns GET /accounts/search can sort by; each has an index, and `id` breaks ties
+SEARCH_SORTS = ('id', 'name', 'balance', 'created_at', 'updated_at')
+
+
+def query_int(args: Mapping, name: str, default: int, minimum: int = 0) -> int:
+    """Parse a non-negative integer query parameter"""
+    raw = args.get(name)
+    if raw is None or raw == '':
+        return default
+    value = int(raw)
+    if value < minimum:
+        raise ValueError(f"{name} must be >= {minimum}")
+    return value
+
+def parse_page(args: Mapping, page_size: int, max_page_size: int,
+               default_after: int = 0, min_after: int = 0) -> Tuple[int, int]:
+    """(after, limit) keyset cursor from query parameters"""
+    after = query_int(args, 'after', default_after, minimum=min_after)
+    limit = min(query_int(args, 'limit', page_size, minimum=1), max_page_size)
+    return after, limit
+
+def finite_float(value, name: str) -> float:
+    """float(value), refusing NaN and infinities, which would poison balances and their totals"""
+    number = float(value)
+    if not math.isfinite(number):
+        raise ValueError(f"{name} must be a finite number")
+    return number
+
+def _query_float(args: Mapping, name: str) -> Optional[float]:
+    raw = args.get(name)
+    return None if raw is None or raw == '' else float(raw)
+
+def _query_datetime(args: Mapping, name: str) -> Optional[datetime]:
+    """ISO date or datetime query parameter, as naive UTC like the stored timestamps"""
+    raw = args.get(name)
+    if raw is None or raw == '':
+        return None
+    try:
+        value = datetime.fromisoformat(raw)
+    except ValueError:
+        raise ValueError(f"{name} must be an ISO 8601 date or datetime")
+    if value.tzinfo is not None:
+        value = value.astimezone(timezone.utc).replace(tzinfo=None)
+    return value
+
+def encode_cursor(value, account_id: int) -> str:
+    """Opaque search cursor for the (sort value, id) of a page's last row"""
+    if isinstance(value, datetime):
+        value = value.isoformat()
+    token = json.dumps([value, account_id], separators=(',', ':'))
+    return base64.urlsafe_b64encode(token.encode()).decode().rstrip('=')
+
+def decode_cursor(token: str, sort: str) -> Tuple:
+    """(sort value, id) from `encode_cursor`; raises ValueError on a malformed token"""
+    try:
+        value, account_id = json.loads(base64.urlsafe_b64decode(token + '=' * (-len(token) % 4)))
+        if isinstance(account_id, bool) or not isinstance(account_id, int):
+            raise ValueError
+        if sort in ('created_at', 'updated_at'):
+            value = datetime.fromisoformat(value)
+        elif sort == 'balance' and (isinstance(value, bool) or not isinstance(value, (int, float))):
+            raise ValueError
+        elif sort == 'name' and not isinstance(value, str):
+            raise ValueError
+    except (TypeError, ValueError):
+        raise ValueError("cursor is not valid")
+    return value, account_id
+
+def parse_search(args: Mapping, page_size: int, max_page_size: int) -> Tuple[dict, int]:
+    """(criteria, limit) for GET /accounts/search; raises ValueError on bad input"""
+    sort = args.get('sort') or 'id'
+    if sort not in SEARCH_SORTS:
+        raise ValueError(f"sort must be one of: {', '.join(SEARCH_SORTS)}")
+    order = args.get('order') or 'asc'
+    if order not in ('asc', 'desc'):
+        raise ValueError("order must be asc or desc")
+    criteria = {
+        'name': args.get('name') or None,
+        'q': (args.get('q') or '').strip() or None,
+        'min_balance': _query_float(args, 'min_balance'),
+        'max_balance': _query_float(args, 'max_balance'),
+        'sort': sort,
+        'descending': order == 'desc',
+        'cursor': decode_cursor(args['cursor'], sort) if args.get('cursor') else None,
+    }
+    for name in ('created_after', 'created_before', 'updated_after', 'updated_before'):
+        criteria[name] = _query_datetime(args, name)
+    limit = min(query_int(args, 'limit', page_size, minimum=1), max_page_size)
+    return criteria, limit
+
+def parse_account(data) -> dict:
+    """Name, number and balance of a new account; raises KeyError/ValueError/TypeError"""
+    return {
+        'name': data['name'],
+        'number': data['number'],
+        'balance': finite_float(data.get('balance', 0.0), 'balance')
+    }
+
+def parse_account_updates(data) -> dict:
+    """PUT body without nulls, with the balance as a float"""
+    return {k: finite_float(v, k) if k == 'balance' else v
+            for k, v in data.items()
+            if v is not None}
+
+def parse_bulk_fields(fields) -> dict:
+    """Validate and coerce one change's fields for PATCH /accounts/bulk"""
+    if not isinstance(fields, dict) or not fields:
+        raise ValueError("fields must be a non-empty object")
+    unknown = sorted(set(fields) - set(BULK_UPDATE_FIELDS))
+    if unknown:
+        raise ValueError(f"Fields cannot be bulk updated: {', '.join(unknown)}")
+    values = {}
+    for key, value in fields.items():
+        if key == 'name':
+            if not isinstance(value, str) or not value.strip():
+                raise ValueError("name must be a non-empty string")
+            values[key] = value
+        else:
+            if isinstance(value, bool) or not isinstance(value, (int, float, str)):
+                raise ValueError(f"{key} must be a number")
+            values[key] = finite_float(value, key)
+    return values
+
+def parse_bulk_change(change) -> Tuple[int, dict]:
+    """(account id, fields) of one PATCH /accounts/bulk entry"""
+    account_id = change['id']
+    if isinstance(account_id, bool) or not isinstance(account_id, int):
+        raise ValueError("id must be an integer")
+    return account_id, parse_bulk_fields(change['fields'])
+
+def parse_transfer(data) -> Tuple[int, int, float, Optional[str]]:
+    """(from_id, to_id, amount, memo) of a POST /transfers body"""
+    from_id, to_id = data['from_id'], data['to_id']
+    if not all(isinstance(v, int) and not isinstance(v, bool) for v in (from_id, to_id)):
+        raise ValueError("from_id and to_id must be integers")
+    if isinstance(data['amount'], bool):
+        raise ValueError("amount must be a number")
+    amount = finite_float(data['amount'], 'amount')
+    memo = data.get('memo')
+    if memo is not None and (not isinstance(memo, str) or len(memo) > 200):
+        raise ValueError("memo must be a string of at most 200 characters")
+    return from_id, to_id, amount, memo
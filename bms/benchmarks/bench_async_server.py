@@ -0,0 +1,145 @@
+"""Concurrent-connection throughput of the threaded Flask server and the aiohttp app.
+
+Seeds one database file, serves it with each mode in a child process and
+drives it from an aiohttp client holding N keep-alive connections open: a
+mix of account reads and transfers. Reports requests/s, p50/p99 latency and
+errors per mode and concurrency level.
+
+Usage: python benchmarks/bench_async_server.py --accounts 10000 --concurrency 10,100,500 --seconds 5
+"""
+import argparse
+import asyncio
+import os
+import random
+import socket
+import subprocess
+import sys
+import tempfile
+import time
+
+import aiohttp
+
+from common import bench_config, make_app, seed_accounts
+from app.db import db
+
+MODES = ('threaded', 'async')
+
+
+def percentile(samples, pct):
+    """Nearest-rank percentile of a list of numbers"""
+    ordered = sorted(samples)
+    rank = max(0, min(len(ordered) - 1, int(round(pct / 100 * len(ordered))) - 1))
+    return ordered[rank]
+
+def free_port():
+    with socket.socket() as sock:
+        sock.bind(('127.0.0.1', 0))
+        return sock.getsockname()[1]
+
+def serve(mode, db_path, port):
+    """Child process: serve the database with one server mode until killed"""
+    if mode == 'threaded':
+        from werkzeug.serving import make_server
+        make_server('127.0.0.1', port, make_app(db_path), threaded=True).serve_forever()
+    else:
+        from aiohttp import web
+        from app.async_app import create_async_app
+        web.run_app(create_async_app(bench_config(db_path)), host='127.0.0.1', port=port,
+                    print=None, access_log=None)
+
+async def wait_ready(base_url, timeout=30.0):
+    deadline = time.monotonic() + timeout
+    async with aiohttp.ClientSession() as session:
+        while time.monotonic() < deadline:
+            try:
+                async with session.get(f"{base_url}/api/health") as response:
+                    if response.status == 200:
+                        return
+            except aiohttp.ClientError:
+                pass
+            await asyncio.sleep(0.1)
+    raise RuntimeError(f"server at {base_url} did not start")
+
+async def drive(base_url, concurrency, seconds, accounts, write_ratio):
+    """Keep `concurrency` requests in flight for `seconds`; latencies in ms and error count"""
+    latencies = []
+    errors = 0
+    deadline = time.monotonic() + seconds
+    connector = aiohttp.TCPConnector(limit=concurrency)
+    async with aiohttp.ClientSession(connector=connector) as session:
+        async def worker(seed):
+            nonlocal errors
+            rng = random.Random(seed)
+            while time.monotonic() < deadline:
+                t0 = time.perf_counter()
+                try:
+                    if rng.random() < write_ratio:
+                        from_id, to_id = rng.sample(range(1, accounts + 1), 2)
+                        request = session.post(f"{base_url}/api/transfers", json={
+                            'from_id': from_id, 'to_id': to_id, 'amount': rng.randint(1, 500) / 100})
+                        ok = (201, 409)
+                    else:
+                        request = session.get(f"{base_url}/api/accounts/{rng.randint(1, accounts)}")
+                        ok = (200,)
+                    async with request as response:
+                        await response.read()
+                        if response.status not in ok:
+                            errors += 1
+                            continue
+                except aiohttp.ClientError:
+                    errors += 1
+                    continue
+                latencies.append((time.perf_counter() - t0) * 1000)
+
+        await asyncio.gather(*(worker(seed) for seed in range(concurrency)))
+    return latencies, errors
+
+def run_mode(mode, db_path, args):
+    port = free_port()
+    base_url = f"http://127.0.0.1:{port}"
+    server = subprocess.Popen([sys.executable, os.path.abspath(__file__), '--serve', mode,
+                               '--db', db_path, '--port', str(port)],
+                              stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    try:
+        asyncio.run(wait_ready(base_url))
+        for concurrency in args.concurrency:
+            latencies, errors = asyncio.run(drive(base_url, concurrency, args.seconds,
+                                                  args.accounts, args.write_ratio))
+            if not latencies:
+                print(f"{mode:>8} c={concurrency:<5} no successful requests, {errors} errors")
+                continue
+            print(f"{mode:>8} c={concurrency:<5} {len(latencies) / args.seconds:>8,.0f} req/s  "
+                  f"p50 {percentile(latencies, 50):>7.2f} ms  p99 {percentile(latencies, 99):>8.2f} ms  "
+                  f"{errors} errors")
+    finally:
+        server.terminate()
+        server.wait(timeout=10)
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--accounts', type=int, default=10000)
+    parser.add_argument('--concurrency', type=lambda value: [int(c) for c in value.split(',')],
+                        default=[10, 100, 500], help="Comma-separated connection counts")
+    parser.add_argument('--seconds', type=float, default=5.0)
+    parser.add_argument('--write-ratio', type=float, default=0.2, help="Share of requests that are transfers")
+    parser.add_argument('--modes', default=','.join(MODES))
+    parser.add_argument('--serve', choices=MODES, help=argparse.SUPPRESS)
+    parser.add_argument('--db', help=argparse.SUPPRESS)
+    parser.add_argument('--port', type=int, help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.serve:
+        serve(args.serve, args.db, args.port)
+        return
+
+    with tempfile.TemporaryDirectory() as tmp:
+        db_path = os.path.join(tmp, 'bench.db')
+        app = make_app(db_path)
+        with app.app_context():
+            seed_accounts(args.accounts)
+            db.engine.dispose()
+        for mode in args.modes.split(','):
+            run_mode(mode, db_path, args)
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,52 @@
+"""Batch totals: load-everything threaded processing vs the streaming pipeline.
+
+The threaded processor is timed including the `Account.query.all()` it
+needs beforehand. Peak Python memory is measured with tracemalloc.
+
+Usage: python benchmarks/bench_batch_stream.py --size 200000 --workers 4
+"""
+import argparse
+import os
+import tempfile
+import time
+import tracemalloc
+
+from common import make_app, seed_accounts
+from app.db import db
+from app.models import Account
+from app.batch_calc import process_batch_threaded, stream_batches
+
+
+def run(name, fn):
+    db.session.expunge_all()
+    tracemalloc.start()
+    start = time.perf_counter()
+    results = fn()
+    elapsed = time.perf_counter() - start
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    print(f"{name:>9}: {elapsed:.2f}s, {len(results):,} batches, peak {peak / 2**20:,.1f} MiB")
+    return results
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--size', type=int, default=200_000)
+    parser.add_argument('--batch-size', type=int, default=100)
+    parser.add_argument('--chunk-size', type=int, default=None)
+    parser.add_argument('--workers', type=int, default=None)
+    parser.add_argument('--prefetch', type=int, default=None)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        app = make_app(os.path.join(tmp, 'bench.db'), BATCH_SIZE=args.batch_size)
+        with app.app_context():
+            print(f"seeded {args.size:,} accounts in {seed_accounts(args.size):.2f}s")
+            threaded = run('threaded', lambda: process_batch_threaded(Account.query.order_by(Account.id).all()))
+            streamed = run('stream', lambda: list(stream_batches(chunk_size=args.chunk_size, workers=args.workers,
+                                                                 prefetch=args.prefetch)))
+            assert [num for num, _ in threaded] == [num for num, _ in streamed]
+            db.session.remove()
+            db.engine.dispose()
+
+if __name__ == '__main__':
+    main()
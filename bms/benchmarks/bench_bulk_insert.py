@@ -0,0 +1,49 @@
+"""Compare per-row account creation with the bulk insert path.
+
+Usage: python benchmarks/bench_bulk_insert.py --size 10000
+"""
+import argparse
+import os
+import tempfile
+import time
+
+from common import make_app
+from app.db import db
+from app.crud import create_account, create_accounts_bulk
+
+
+def rows_for(size, prefix):
+    return [{'name': f"User {i}", 'number': f"{prefix}{i:08d}", 'balance': float(i)}
+            for i in range(size)]
+
+def bench_loop(size):
+    rows = rows_for(size, "L")
+    start = time.perf_counter()
+    for row in rows:
+        create_account(row['name'], row['number'], row['balance'])
+    return time.perf_counter() - start
+
+def bench_bulk(size):
+    rows = rows_for(size, "B")
+    start = time.perf_counter()
+    created, errors = create_accounts_bulk(rows)
+    assert len(created) == size and not errors
+    return time.perf_counter() - start
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--size', type=int, default=2000, help="Accounts to create per run")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        app = make_app(os.path.join(tmp, 'bench.db'))
+        with app.app_context():
+            for label, bench in (('loop', bench_loop), ('bulk', bench_bulk)):
+                elapsed = bench(args.size)
+                print(f"{label:>5}: {args.size} accounts in {elapsed:.3f}s "
+                      f"({args.size / elapsed:,.0f} accounts/s)")
+            db.session.remove()
+            db.engine.dispose()
+
+if __name__ == '__main__':
+    main()
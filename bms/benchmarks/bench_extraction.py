@@ -0,0 +1,65 @@
+"""Compare full-tree parsing with rule-scoped partial parsing on saved bank pages.
+
+For every fixture and rule kind, times a full BeautifulSoup parse followed by
+the rules against parsing only the rules' scope, and reports peak memory of
+each with tracemalloc. Results must be identical.
+
+Usage: python benchmarks/bench_extraction.py --repeat 20
+"""
+import argparse
+import glob
+import os
+import sys
+import time
+import tracemalloc
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from bs4 import BeautifulSoup
+from app.extraction import parser_name, rules_for
+
+FIXTURES = os.path.join(os.path.dirname(__file__), 'fixtures', '*.html')
+
+
+def best_time(fn, repeat):
+    best = float('inf')
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = fn()
+        best = min(best, time.perf_counter() - start)
+    return best, result
+
+def peak_memory(fn):
+    tracemalloc.start()
+    try:
+        fn()
+        return tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--fixtures', default=FIXTURES, help="Glob of saved HTML pages")
+    parser.add_argument('--kinds', default='interest_rates,bank_info', help="Comma-separated rule kinds")
+    parser.add_argument('--repeat', type=int, default=20, help="Runs per path (best is reported)")
+    args = parser.parse_args()
+
+    print(f"parser: {parser_name()}")
+    for path in sorted(glob.glob(args.fixtures)):
+        with open(path, encoding='utf-8') as f:
+            html = f.read()
+        for kind in args.kinds.split(','):
+            rules = rules_for(None, kind)
+            full = lambda: rules.extract_soup(BeautifulSoup(html, parser_name()))  # noqa: E731
+            partial = lambda: rules.extract(html)  # noqa: E731
+            full_time, full_result = best_time(full, args.repeat)
+            partial_time, partial_result = best_time(partial, args.repeat)
+            assert full_result == partial_result, f"{path} {kind}: results differ"
+            full_peak, partial_peak = peak_memory(full), peak_memory(partial)
+            print(f"{os.path.basename(path)} [{kind}] {len(html) / 1024:.0f} KiB, scope={rules.scope}")
+            print(f"  full:    {full_time * 1000:8.2f} ms  peak {full_peak / 1024:8.0f} KiB")
+            print(f"  partial: {partial_time * 1000:8.2f} ms  peak {partial_peak / 1024:8.0f} KiB  "
+                  f"({full_time / partial_time:.1f}x faster, {full_peak / partial_peak:.1f}x less memory)")
+
+if __name__ == '__main__':
+    main()
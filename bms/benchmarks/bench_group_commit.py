@@ -0,0 +1,73 @@
+"""Concurrent single-account creates: one commit per request vs group commit.
+
+Each of --threads threads posts --per-thread accounts through the Flask
+test client, so requests take the full route path. Admission control is
+off (see `bench_config`) so both modes see the same load; --synchronous
+sets the SQLite durability level (FULL makes every commit fsync).
+
+Usage: python benchmarks/bench_group_commit.py --threads 32 --per-thread 50 --synchronous FULL
+"""
+import argparse
+import os
+import tempfile
+import threading
+import time
+
+from common import make_app
+from app.db import db
+from app.models import Account
+
+
+def run(name, threads, per_thread, **settings):
+    with tempfile.TemporaryDirectory() as tmp:
+        app = make_app(os.path.join(tmp, 'bench.db'), **settings)
+        client = app.test_client()
+        barrier = threading.Barrier(threads)
+        failures = []
+
+        def worker(t):
+            barrier.wait()
+            for i in range(per_thread):
+                response = client.post('/api/accounts', json={'name': f"User {t}-{i}", 'number': f"G{t:03d}{i:06d}",
+                                                               'balance': 10.0})
+                if response.status_code != 201:
+                    failures.append(response.status_code)
+
+        workers = [threading.Thread(target=worker, args=(t,)) for t in range(threads)]
+        start = time.perf_counter()
+        for thread in workers:
+            thread.start()
+        for thread in workers:
+            thread.join()
+        elapsed = time.perf_counter() - start
+
+        writes = threads * per_thread
+        line = f"{name:>13}: {writes / elapsed:,.0f} creates/s ({elapsed:.2f}s, {len(failures)} failed)"
+        writer = app.extensions.get('group_commit')
+        if writer is not None:
+            stats = writer.stats()
+            line += f", {stats['batches']:,} commits, {stats['writes'] / max(stats['batches'], 1):.1f} writes/commit"
+            writer.close(10)
+        print(line)
+        with app.app_context():
+            assert db.session.query(Account).count() == writes - len(failures)
+            db.session.remove()
+            db.engine.dispose()
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--threads', type=int, default=32)
+    parser.add_argument('--per-thread', type=int, default=50)
+    parser.add_argument('--synchronous', default='FULL', help="SQLITE_SYNCHRONOUS (NORMAL, FULL, ...)")
+    parser.add_argument('--max-batch', type=int, default=64)
+    parser.add_argument('--max-delay', type=float, default=0.002)
+    args = parser.parse_args()
+
+    print(f"{args.threads} threads x {args.per_thread} creates, synchronous={args.synchronous}")
+    common = {'SQLITE_SYNCHRONOUS': args.synchronous}
+    run('per-request', args.threads, args.per_thread, **common)
+    run('group commit', args.threads, args.per_thread, GROUP_COMMIT_ENABLED=True,
+        GROUP_COMMIT_MAX_BATCH=args.max_batch, GROUP_COMMIT_MAX_DELAY=args.max_delay, **common)
+
+if __name__ == '__main__':
+    main()
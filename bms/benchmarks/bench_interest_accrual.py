@@ -0,0 +1,37 @@
+"""Benchmark the chunked interest-accrual job.
+
+Usage: python benchmarks/bench_interest_accrual.py --size 1000000
+"""
+import argparse
+import os
+import tempfile
+import time
+
+from common import make_app, seed_accounts
+from app.db import db
+from app.batch_calc import accrue_interest, np
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--size', type=int, default=1_000_000, help="Accounts to accrue")
+    parser.add_argument('--chunk-size', type=int, default=None, help="Accounts per chunk")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        app = make_app(os.path.join(tmp, 'bench.db'))
+        with app.app_context():
+            seeded = seed_accounts(args.size)
+            print(f"seeded {args.size:,} accounts in {seeded:.2f}s")
+
+            start = time.perf_counter()
+            summary = accrue_interest(run_key="bench", chunk_size=args.chunk_size)
+            elapsed = time.perf_counter() - start
+            print(f"accrued {summary['accounts']:,} accounts ({summary['updated']:,} updated) "
+                  f"in {elapsed:.2f}s = {summary['accounts'] / elapsed:,.0f} accounts/s "
+                  f"[numpy={'yes' if np is not None else 'no'}]")
+            db.session.remove()
+            db.engine.dispose()
+
+if __name__ == '__main__':
+    main()
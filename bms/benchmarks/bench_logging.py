@@ -0,0 +1,76 @@
+"""Caller-side cost of a log call: inline rendering vs the queue-backed pipeline.
+
+The inline logger is the previous configuration (structlog rendering JSON
+and writing through the stdlib logger on the calling thread). Both write
+to a stream handler on /dev/null so the write itself counts.
+
+Usage: python benchmarks/bench_logging.py --events 200000 --threads 4
+"""
+import argparse
+import logging
+import os
+import threading
+import time
+
+import structlog
+
+import common  # noqa: F401  (puts the project root on sys.path)
+from app.logger import flush_logs, log_stats, logger as pipeline_logger
+
+
+def inline_logger():
+    return structlog.wrap_logger(
+        logging.getLogger('bms.inline'),
+        processors=[
+            structlog.processors.TimeStamper(fmt="iso"),
+            structlog.stdlib.add_log_level,
+            structlog.processors.StackInfoRenderer(),
+            structlog.processors.format_exc_info,
+            structlog.processors.JSONRenderer(),
+        ],
+        wrapper_class=structlog.stdlib.BoundLogger,
+        context_class=dict,
+    )
+
+def run(name, log, events, threads, flush=None):
+    per_thread = events // threads
+    updates = {'name': "Renamed", 'balance': 125.5, 'interest_rate': 2.25}
+
+    def worker():
+        for i in range(per_thread):
+            log.info("account_updated", account_id=i, updates=updates)
+
+    workers = [threading.Thread(target=worker) for _ in range(threads)]
+    start = time.perf_counter()
+    for thread in workers:
+        thread.start()
+    for thread in workers:
+        thread.join()
+    caller = time.perf_counter() - start
+    if flush is not None:
+        flush()
+    drained = time.perf_counter() - start
+    total = per_thread * threads
+    print(f"{name:>8}: {total / caller:>10,.0f} calls/s on callers "
+          f"({caller / total * 1e6:.2f} us/call), queue drained after {drained:.2f}s")
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--events', type=int, default=200000)
+    parser.add_argument('--threads', type=int, default=4)
+    args = parser.parse_args()
+
+    handler = logging.StreamHandler(open(os.devnull, 'w'))
+    for name in ('bms', 'bms.inline'):
+        target = logging.getLogger(name)
+        target.addHandler(handler)
+        target.setLevel(logging.INFO)
+        target.propagate = False
+
+    run('inline', inline_logger(), args.events, args.threads)
+    run('pipeline', pipeline_logger, args.events, args.threads, flush=flush_logs)
+    stats = log_stats()
+    print(f"pipeline: {stats['written']:,} written, {stats['dropped']:,} dropped (queue full)")
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,48 @@
+"""Compare ORM + to_dict() listings with the Core row serializer.
+
+Usage: python benchmarks/bench_serializer.py --size 100000
+"""
+import argparse
+import os
+import tempfile
+import time
+
+from common import make_app, seed_accounts
+from app.db import db
+
+
+def time_listing(client, url, repeat):
+    best = float('inf')
+    for _ in range(repeat):
+        start = time.perf_counter()
+        response = client.get(url)
+        body = response.get_data()
+        best = min(best, time.perf_counter() - start)
+    return best, body
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--size', type=int, default=100_000, help="Accounts to list")
+    parser.add_argument('--repeat', type=int, default=3, help="Runs per path (best is reported)")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        app = make_app(os.path.join(tmp, 'bench.db'))
+        with app.app_context():
+            seed_accounts(args.size)
+        client = app.test_client()
+
+        results = {}
+        for label, fast in (('orm', False), ('core', True)):
+            app.config['FAST_READS'] = fast
+            results[label] = time_listing(client, '/api/accounts', args.repeat)
+            elapsed = results[label][0]
+            print(f"{label:>5}: {args.size:,} accounts in {elapsed:.3f}s "
+                  f"({elapsed / args.size * 1e6:.2f} us/row)")
+        assert results['orm'][1] == results['core'][1], "responses differ"
+        print(f"speedup: {results['orm'][0] / results['core'][0]:.1f}x (responses identical)")
+        with app.app_context():
+            db.engine.dispose()
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,86 @@
+"""Memory per account and refresh time of the columnar AccountSnapshot.
+
+Compares the Python memory held by a list of ORM accounts, a list of
+SimpleNamespace copies and a snapshot (tracemalloc), then times a full
+load against an incremental refresh after `--changed` accounts are updated.
+
+Usage: python benchmarks/bench_snapshot.py --size 200000 --changed 1000
+"""
+import argparse
+import os
+import tempfile
+import time
+import tracemalloc
+from datetime import datetime
+from types import SimpleNamespace
+
+from sqlalchemy import bindparam, update
+
+from common import make_app, seed_accounts
+from app.db import db
+from app.models import Account
+from app.snapshot import AccountSnapshot, np
+
+
+def held(build):
+    """(object, bytes still allocated once `build` returns, seconds)"""
+    db.session.expunge_all()
+    tracemalloc.start()
+    start = time.perf_counter()
+    obj = build()
+    elapsed = time.perf_counter() - start
+    size = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    return obj, size, elapsed
+
+def timed(fn, repeat=5):
+    start = time.perf_counter()
+    for _ in range(repeat):
+        fn()
+    return (time.perf_counter() - start) / repeat * 1000
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--size', type=int, default=200_000)
+    parser.add_argument('--changed', type=int, default=1000, help="Accounts updated before the refresh")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        app = make_app(os.path.join(tmp, 'bench.db'), SNAPSHOT_REFRESH_OVERLAP=0)
+        with app.app_context():
+            print(f"seeded {args.size:,} accounts in {seed_accounts(args.size):.2f}s")
+
+            def namespaces():
+                return [SimpleNamespace(id=a.id, name=a.name, number=a.number, balance=float(a.balance))
+                        for a in Account.query.all()]
+
+            for name, build in (('orm', lambda: Account.query.all()), ('namespace', namespaces),
+                                ('snapshot', AccountSnapshot.load)):
+                obj, size, elapsed = held(build)
+                print(f"{name:>10}: {size / args.size:>7.0f} bytes/account, built in {elapsed:.2f}s")
+                del obj
+            db.session.expunge_all()
+
+            snapshot = AccountSnapshot.load()
+            print(f"operations (numpy={'yes' if np is not None else 'no'}): "
+                  f"sum {timed(snapshot.total):.2f} ms, "
+                  f"filter {timed(lambda: snapshot.filter(min_balance=50000, min_rate=4)):.2f} ms, "
+                  f"top-100 {timed(lambda: snapshot.top(100)):.2f} ms")
+
+            time.sleep(0.01)
+            table = Account.__table__
+            db.session.execute(
+                update(table).where(table.c.id == bindparam('b_id'))
+                .values(balance=table.c.balance + 1, updated_at=bindparam('b_updated_at')),
+                [{'b_id': i, 'b_updated_at': datetime.utcnow()} for i in range(1, args.size + 1, args.size // args.changed)])
+            db.session.commit()
+            start = time.perf_counter()
+            summary = snapshot.refresh()
+            refresh_ms = (time.perf_counter() - start) * 1000
+            load_ms = timed(AccountSnapshot.load, 1)
+            print(f"refresh after {summary['updated']:,} changes: {refresh_ms:.1f} ms; full load {load_ms:.1f} ms")
+            db.session.remove()
+            db.engine.dispose()
+
+if __name__ == '__main__':
+    main()
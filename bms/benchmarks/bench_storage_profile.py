@@ -0,0 +1,80 @@
+"""Mixed read/write throughput under the default and tuned SQLite storage profiles.
+
+Usage: python benchmarks/bench_storage_profile.py --readers 8 --writers 4 --seconds 5
+"""
+import argparse
+import os
+import random
+import tempfile
+import threading
+import time
+
+from common import make_app, seed_accounts
+from app.db import db
+from app.crud import get_account, update_account
+
+PROFILES = {
+    # SQLite out of the box: rollback journal, full fsync, no lock retries
+    'default': {'SQLITE_JOURNAL_MODE': 'DELETE', 'SQLITE_SYNCHRONOUS': 'FULL',
+                'SQLITE_CACHE_SIZE': '', 'SQLITE_MMAP_SIZE': '', 'SQLITE_BUSY_TIMEOUT': '',
+                'DB_LOCK_RETRIES': 0},
+    # The shipped Config profile
+    'tuned': {},
+}
+
+def run_profile(name, args):
+    counts = {'reads': 0, 'writes': 0, 'errors': 0}
+    lock = threading.Lock()
+    stop = threading.Event()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        app = make_app(os.path.join(tmp, 'bench.db'), **PROFILES[name])
+        with app.app_context():
+            seed_accounts(args.accounts)
+
+        def worker(kind):
+            rng = random.Random()
+            done = errors = 0
+            with app.app_context():
+                while not stop.is_set():
+                    account_id = rng.randint(1, args.accounts)
+                    try:
+                        if kind == 'reads':
+                            get_account(account_id)
+                        else:
+                            update_account(account_id, balance=rng.randint(0, 100000) / 100)
+                        done += 1
+                    except Exception:
+                        errors += 1
+                    db.session.remove()
+            with lock:
+                counts[kind] += done
+                counts['errors'] += errors
+
+        threads = ([threading.Thread(target=worker, args=('reads',)) for _ in range(args.readers)]
+                   + [threading.Thread(target=worker, args=('writes',)) for _ in range(args.writers)])
+        for thread in threads:
+            thread.start()
+        time.sleep(args.seconds)
+        stop.set()
+        for thread in threads:
+            thread.join()
+        with app.app_context():
+            db.engine.dispose()
+
+    print(f"{name:>8}: {counts['reads'] / args.seconds:>9,.0f} reads/s "
+          f"{counts['writes'] / args.seconds:>8,.0f} writes/s "
+          f"{counts['errors']:>6} errors")
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--accounts', type=int, default=10000)
+    parser.add_argument('--readers', type=int, default=8)
+    parser.add_argument('--writers', type=int, default=4)
+    parser.add_argument('--seconds', type=float, default=5.0)
+    args = parser.parse_args()
+    for name in PROFILES:
+        run_profile(name, args)
+
+if __name__ == '__main__':
+    main()
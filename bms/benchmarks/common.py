@@ -0,0 +1,53 @@
+"""Shared helpers for the benchmark scripts"""
+import os
+import random
+import sys
+import time
+from datetime import datetime
+
+# Add the project root directory to Python path
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from app import create_app
+from app.config import Config
+from app.db import db
+from app.models import Account
+from app.aggregates import reconcile_aggregates
+
+
+def bench_config(db_path, **overrides):
+    """Config class bound to an on-disk database so commits hit fsync.
+
+    Admission control is off: rate limits and concurrency caps would turn
+    benchmark load into 429/503 answers instead of measuring the code path.
+    """
+    Config.EMAIL_TEST_MODE = True
+    settings = {'SQLALCHEMY_DATABASE_URI': f"sqlite:///{db_path}", 'EMAIL_TEST_MODE': True,
+                'ADMISSION_ENABLED': False}
+    settings.update(overrides)
+    return type('BenchConfig', (Config,), settings)
+
+def make_app(db_path, **overrides):
+    """Create an app bound to an on-disk database so commits hit fsync"""
+    return create_app(bench_config(db_path, **overrides))
+
+def seed_accounts(count, chunk_size=50000, seed=42):
+    """Bulk-load `count` accounts with raw executemany, bypassing the ORM"""
+    rng = random.Random(seed)
+    now = datetime.utcnow()
+    table = Account.__table__
+    start = time.perf_counter()
+    for lo in range(0, count, chunk_size):
+        rows = [{'name': f"User {i}",
+                 'number': f"ACC{i:010d}",
+                 'balance': rng.randint(0, 10_000_000) / 100,
+                 'interest_rate': rng.randint(0, 800) / 100,
+                 'created_at': now,
+                 'updated_at': now}
+                for i in range(lo, min(lo + chunk_size, count))]
+        db.session.execute(table.insert(), rows)
+        db.session.commit()
+    elapsed = time.perf_counter() - start
+    # Raw inserts bypass the balance aggregates; rebuild them outside the timing
+    reconcile_aggregates(fix=True)
+    return elapsed
@@ -0,0 +1,240 @@
+"""Reproducible performance suite for the API and batch engines.
+
+Seeds a fresh SQLite database per size, drives the API through the Flask
+test client and times the batch processors, then writes the results as
+JSON. With --baseline, exits non-zero when any metric regresses past the
+tolerance or a benchmark has no baseline numbers.
+
+Usage:
+    python benchmarks/suite.py --sizes 1000,100000 --output results.json
+    python benchmarks/suite.py --baseline benchmarks/baseline.json
+    python benchmarks/suite.py --baseline benchmarks/baseline.json --update-baseline
+"""
+import argparse
+import asyncio
+import json
+import os
+import platform
+import random
+import sys
+import tempfile
+import time
+from datetime import datetime
+
+from common import make_app, seed_accounts
+from app.db import db
+from app.models import Account
+from app.batch_calc import process_batch_threaded, process_batch_async, process_batch_sql, process_batch_stream
+
+
+def percentile(samples, pct):
+    """Nearest-rank percentile of a list of numbers"""
+    ordered = sorted(samples)
+    rank = max(0, min(len(ordered) - 1, int(round(pct / 100 * len(ordered))) - 1))
+    return ordered[rank]
+
+def measure(fn, iterations, warmup=0):
+    """Run `fn(i)` `iterations` times; throughput plus p50/p99 latency in ms"""
+    for i in range(warmup):
+        fn(i)
+    latencies = []
+    start = time.perf_counter()
+    for i in range(iterations):
+        t0 = time.perf_counter()
+        fn(i)
+        latencies.append((time.perf_counter() - t0) * 1000)
+    elapsed = time.perf_counter() - start
+    return {
+        'ops_per_sec': round(iterations / elapsed, 2),
+        'p50_ms': round(percentile(latencies, 50), 4),
+        'p99_ms': round(percentile(latencies, 99), 4),
+        'iterations': iterations,
+    }
+
+def expect(response, status):
+    if response.status_code != status:
+        raise AssertionError(f"{response.request.path}: expected {status}, got {response.status_code}")
+    return response
+
+def bench_routes(client, size, iterations, batch_size, page_size):
+    rng = random.Random(1234)
+    ids = [rng.randint(1, size) for _ in range(iterations)]
+    results = {}
+
+    results['get_account'] = measure(
+        lambda i: expect(client.get(f'/api/accounts/{ids[i]}'), 200), iterations, warmup=10)
+    results['get_account_by_number'] = measure(
+        lambda i: expect(client.get(f'/api/accounts/number/ACC{ids[i] - 1:010d}'), 200), iterations, warmup=10)
+    results['create_account'] = measure(
+        lambda i: expect(client.post('/api/accounts', json={
+            'name': f"Bench {i}", 'number': f"NEW{i:010d}", 'balance': 100.0}), 201), iterations)
+    results['update_account'] = measure(
+        lambda i: expect(client.put(f'/api/accounts/{ids[i]}', json={'balance': float(i)}), 200), iterations)
+    results['delete_account'] = measure(
+        lambda i: expect(client.delete(f'/api/accounts/{size + i + 1}'), 204), iterations)
+
+    batches = max(1, iterations // 10)
+    results['create_batch'] = measure(
+        lambda i: expect(client.post('/api/accounts/batch', json=[
+            {'name': f"Batch {i}-{j}", 'number': f"BAT{i:05d}{j:05d}", 'balance': 1.0}
+            for j in range(batch_size)]), 201), batches)
+    results['create_batch']['accounts_per_sec'] = round(results['create_batch']['ops_per_sec'] * batch_size, 2)
+
+    results['summary'] = measure(
+        lambda i: expect(client.get('/api/accounts/summary'), 200), iterations, warmup=10)
+
+    pages = max(1, min(iterations, size // page_size))
+    cursors = [rng.randint(0, max(0, size - page_size)) for _ in range(pages)]
+    results['list_page'] = measure(
+        lambda i: expect(client.get(f'/api/accounts?after={cursors[i]}&limit={page_size}'), 200), pages)
+
+    prefixes = [f"User {rng.randint(1, max(1, size // 100))}" for _ in range(iterations)]
+    results['search_name_prefix'] = measure(
+        lambda i: expect(client.get(f'/api/accounts/search?name={prefixes[i]}&limit={page_size}'), 200),
+        iterations, warmup=10)
+    results['search_balance_range'] = measure(
+        lambda i: expect(client.get(f'/api/accounts/search?min_balance={ids[i] % 90000}'
+                                    f'&max_balance={ids[i] % 90000 + 100}&sort=balance&limit={page_size}'), 200),
+        iterations, warmup=10)
+
+    def stream_all(_):
+        response = expect(client.get('/api/accounts?format=ndjson'), 200)
+        for _chunk in response.response:
+            pass
+    results['list_stream'] = measure(stream_all, 1)
+    results['list_stream']['rows_per_sec'] = round(results['list_stream']['ops_per_sec'] * size, 2)
+    return results
+
+def bench_batch(app, repeat):
+    with app.app_context():
+        accounts = Account.query.all()
+        loop = asyncio.new_event_loop()
+        try:
+            return {
+                'batch_threaded': measure(lambda _: process_batch_threaded(accounts), repeat, warmup=1),
+                'batch_async': measure(lambda _: loop.run_until_complete(process_batch_async(accounts)),
+                                       repeat, warmup=1),
+                'batch_sql': measure(lambda _: process_batch_sql(), repeat, warmup=1),
+                'batch_stream': measure(lambda _: process_batch_stream(), repeat, warmup=1),
+            }
+        finally:
+            loop.close()
+            db.session.remove()
+
+def run_size(size, args):
+    with tempfile.TemporaryDirectory() as tmp:
+        app = make_app(os.path.join(tmp, 'bench.db'), **dict(args.config))
+        with app.app_context():
+            seed_seconds = seed_accounts(size)
+        print(f"[{size:,}] seeded in {seed_seconds:.2f}s", file=sys.stderr)
+
+        results = {'seed': {'rows_per_sec': round(size / seed_seconds, 2)}}
+        results.update(bench_routes(app.test_client(), size, args.iterations,
+                                    args.batch_size, args.page_size))
+        results.update(bench_batch(app, args.batch_repeat))
+        with app.app_context():
+            db.engine.dispose()
+    return results
+
+def compare(results, baseline, tolerance, min_delta_ms, p99_tolerance=None):
+    """List the metrics that regressed past `tolerance` relative to `baseline`.
+
+    Tail latency is far noisier than throughput or medians (one fsync stall
+    moves it), so p99 gets its own, looser `p99_tolerance`. Seeding is setup
+    and too short to time reliably, so it is reported only.
+    """
+    p99_tolerance = tolerance if p99_tolerance is None else p99_tolerance
+    regressions = []
+    for size, benches in results.items():
+        for bench, metrics in benches.items():
+            if bench == 'seed':
+                continue
+            base_metrics = baseline.get(size, {}).get(bench, {})
+            for metric, value in metrics.items():
+                base = base_metrics.get(metric)
+                if base is None or metric == 'iterations':
+                    continue
+                if metric.endswith('_ms'):
+                    allowed = p99_tolerance if metric.startswith('p99') else tolerance
+                    worse = value > base * (1 + allowed) and value - base > min_delta_ms
+                else:
+                    worse = value < base * (1 - tolerance)
+                if worse:
+                    regressions.append(f"{size}/{bench}/{metric}: {value} vs baseline {base}")
+    return regressions
+
+def missing_from_baseline(results, baseline):
+    """size/bench of every benchmark in `results` that `baseline` has no numbers for"""
+    return [f"{size}/{bench}" for size, benches in results.items() for bench in benches
+            if bench != 'seed' and bench not in baseline.get(size, {})]
+
+def parse_config(pairs):
+    """KEY=VALUE overrides for the app config (values parsed as JSON when possible)"""
+    config = []
+    for pair in pairs:
+        key, _, value = pair.partition('=')
+        try:
+            value = json.loads(value)
+        except ValueError:
+            pass
+        config.append((key, value))
+    return config
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--sizes', default='1000,10000', help="Comma-separated account counts to seed")
+    parser.add_argument('--iterations', type=int, default=200, help="Requests per CRUD benchmark")
+    parser.add_argument('--batch-size', type=int, default=100, help="Accounts per /accounts/batch request")
+    parser.add_argument('--page-size', type=int, default=100, help="Accounts per listing page")
+    parser.add_argument('--batch-repeat', type=int, default=5, help="Runs per batch processor")
+    parser.add_argument('--config', nargs='*', default=[], help="App config overrides, e.g. FAST_READS=true")
+    parser.add_argument('--output', help="Write results JSON here")
+    parser.add_argument('--baseline', help="Baseline JSON to compare against")
+    parser.add_argument('--tolerance', type=float, default=0.5, help="Allowed relative regression")
+    parser.add_argument('--p99-tolerance', type=float, default=2.0, help="Allowed relative p99 regression")
+    parser.add_argument('--min-delta-ms', type=float, default=1.0,
+                        help="Ignore latency regressions smaller than this many ms")
+    parser.add_argument('--update-baseline', action='store_true', help="Overwrite the baseline with these results")
+    args = parser.parse_args()
+    args.config = parse_config(args.config)
+
+    results = {str(size): run_size(int(size), args) for size in args.sizes.split(',')}
+    report = {
+        'meta': {
+            'timestamp': datetime.utcnow().isoformat(),
+            'python': platform.python_version(),
+            'platform': platform.platform(),
+            'config': dict(args.config),
+        },
+        'results': results,
+    }
+    text = json.dumps(report, indent=2, sort_keys=True)
+    if args.output:
+        with open(args.output, 'w') as f:
+            f.write(text + '\n')
+    else:
+        print(text)
+
+    if args.baseline:
+        if args.update_baseline or not os.path.exists(args.baseline):
+            with open(args.baseline, 'w') as f:
+                f.write(text + '\n')
+            print(f"baseline written to {args.baseline}", file=sys.stderr)
+            return
+        with open(args.baseline) as f:
+            baseline = json.load(f)['results']
+        # A benchmark without baseline numbers would never be checked; refuse rather than skip it
+        missing = missing_from_baseline(results, baseline)
+        for name in missing:
+            print(f"No baseline for {name}; rerun with --update-baseline", file=sys.stderr)
+        regressions = compare(results, baseline, args.tolerance, args.min_delta_ms, args.p99_tolerance)
+        if regressions:
+            print("Performance regressions:", file=sys.stderr)
+            for line in regressions:
+                print(f"  {line}", file=sys.stderr)
+        if missing or regressions:
+            sys.exit(1)
+        print("No regressions against baseline", file=sys.stderr)
+
+if __name__ == '__main__':
+    main()
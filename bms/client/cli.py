@@ -1,19 +1,163 @@
 import argparse
+import contextlib
+import csv
 import json
+import math
+import os
+import sys
+import time
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from itertools import islice
 import requests
-from typing import Dict, Any
+from requests.adapters import HTTPAdapter
+from typing import Dict, Any, Iterable, Iterator, List, Optional, TextIO
+
+# Columns written by `export --format csv`, in order
+EXPORT_FIELDS = ['id', 'name', 'number', 'balance', 'interest_rate', 'created_at', 'updated_at']
+
+# Statuses retried by import/export: database busy, rate limited, gateway errors
+RETRY_STATUSES = {429, 502, 503, 504}
+
+
+def retry_after_seconds(value: Optional[str], default: float) -> float:
+    """Delay from a Retry-After header in seconds; `default` when it is absent or an HTTP date"""
+    try:
+        delay = float(value)
+    except (TypeError, ValueError):
+        return default
+    return delay if math.isfinite(delay) and delay >= 0 else default
+
+
+class Progress:
+    """Throttled progress line on stderr with rows/s throughput"""
+
+    def __init__(self, label: str, stream: TextIO = sys.stderr, interval: float = 0.5):
+        self.label = label
+        self.stream = stream
+        self.interval = interval
+        self.rows = 0
+        self.errors = 0
+        self.start = time.perf_counter()
+        self._last = 0.0
+
+    def update(self, rows: int, errors: int = 0) -> None:
+        self.rows += rows
+        self.errors += errors
+        now = time.perf_counter()
+        if now - self._last >= self.interval:
+            self._last = now
+            self.stream.write(f"\r{self._line()}")
+            self.stream.flush()
+
+    def finish(self) -> Dict[str, Any]:
+        self.stream.write(f"\r{self._line()}\n")
+        self.stream.flush()
+        elapsed = time.perf_counter() - self.start
+        return {'rows': self.rows, 'errors': self.errors, 'seconds': round(elapsed, 3),
+                'rows_per_sec': round(self.rows / elapsed, 2) if elapsed else 0.0}
+
+    def _line(self) -> str:
+        elapsed = time.perf_counter() - self.start
+        rate = self.rows / elapsed if elapsed else 0.0
+        return f"{self.label} {self.rows:,} rows ({self.errors:,} errors) {rate:,.0f} rows/s"
+
+
+def read_rows(path: str, fmt: str) -> Iterator[Dict[str, Any]]:
+    """Stream account rows from a CSV (header: name,number,balance) or NDJSON file"""
+    with open(path, newline='', encoding='utf-8') as f:
+        if fmt == 'csv':
+            yield from csv.DictReader(f)
+        else:
+            for line in f:
+                if line.strip():
+                    yield json.loads(line)
+
+def _chunks(rows: Iterable[Dict[str, Any]], size: int) -> Iterator[List[Dict[str, Any]]]:
+    rows = iter(rows)
+    while True:
+        chunk = list(islice(rows, size))
+        if not chunk:
+            return
+        yield chunk
+
+def _guess_format(path: str, fmt: Optional[str]) -> str:
+    if fmt:
+        return fmt
+    return 'csv' if path.lower().endswith('.csv') else 'ndjson'
+
+def _load_checkpoint(path: str, expected: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+    """Saved progress for the same job, or None; refuses a checkpoint of another job"""
+    if not os.path.exists(path):
+        return None
+    with open(path, encoding='utf-8') as f:
+        checkpoint = json.load(f)
+    for key, value in expected.items():
+        if checkpoint.get(key) != value:
+            raise ValueError(f"Checkpoint {path} was written with {key}={checkpoint.get(key)!r}, "
+                             f"not {value!r}; delete it to start over")
+    return checkpoint
+
+def _save_checkpoint(path: str, checkpoint: Dict[str, Any]) -> None:
+    # Write then rename so a crash never leaves a torn checkpoint
+    tmp = f"{path}.tmp"
+    with open(tmp, 'w', encoding='utf-8') as f:
+        json.dump(checkpoint, f)
+    os.replace(tmp, path)
+
 
 class BMSClient:
-    def __init__(self, base_url: str = "http://127.0.0.1:5000/api"):
+    def __init__(self, base_url: str = "http://127.0.0.1:5000/api", verbose: bool = True,
+                 pool_size: int = 10, timeout: float = 5, retries: int = 3, backoff: float = 0.5):
         self.base_url = base_url.rstrip('/')
-        print(f"Connecting to {self.base_url}")
-    
+        self.verbose = verbose
+        self.timeout = timeout
+        self.retries = retries
+        self.backoff = backoff
+        # One keep-alive session; the pool is sized for concurrent bulk requests
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=pool_size)
+        self.session.mount('http://', adapter)
+        self.session.mount('https://', adapter)
+        self._log(f"Connecting to {self.base_url}")
+
+    def _log(self, message: str) -> None:
+        if self.verbose:
+            print(message)
+
+    def _request(self, method: str, path: str, **kwargs) -> requests.Response:
+        url = f"{self.base_url}{path}"
+        self._log(f"Sending {method} request to {url}")
+        try:
+            response = self.session.request(method, url, timeout=self.timeout, **kwargs)
+            self._log(f"Response status: {response.status_code}")
+            self._log(f"Response content: {response.text}")
+            return response
+        except requests.exceptions.RequestException as e:
+            self._log(f"Request failed: {str(e)}")
+            raise
+
+    def _request_with_retry(self, method: str, path: str, **kwargs) -> requests.Response:
+        """Retry connection errors and busy/gateway statuses with exponential backoff"""
+        attempt = 0
+        while True:
+            try:
+                response = self._request(method, path, **kwargs)
+                if response.status_code not in RETRY_STATUSES or attempt >= self.retries:
+                    return response
+                delay = retry_after_seconds(response.headers.get('Retry-After'), self.backoff * 2 ** attempt)
+            except (requests.exceptions.ConnectionError, requests.exceptions.Timeout):
+                if attempt >= self.retries:
+                    raise
+                delay = self.backoff * 2 ** attempt
+            attempt += 1
+            time.sleep(delay)
+
     def _handle_response(self, response: requests.Response) -> Dict[str, Any]:
         """Handle API response and return JSON data"""
         try:
             if response.status_code == 204:  # No content
                 return {'message': 'Operation successful'}
-            
+
             data = response.json()
             if response.ok:
                 return data
@@ -24,96 +168,188 @@ class BMSClient:
 
     def create_account(self, name: str, number: str, balance: float = 0.0) -> Dict[str, Any]:
         """Create a new account"""
-        url = f"{self.base_url}/accounts"
-        print(f"Sending POST request to {url}")
-        try:
-            response = requests.post(
-                url,
-                json={'name': name, 'number': number, 'balance': balance},
-                timeout=5
-            )
-            print(f"Response status: {response.status_code}")
-            print(f"Response content: {response.text}")
-            return self._handle_response(response)
-        except requests.exceptions.RequestException as e:
-            print(f"Request failed: {str(e)}")
-            raise
-    
+        response = self._request('POST', '/accounts',
+                                 json={'name': name, 'number': number, 'balance': balance})
+        return self._handle_response(response)
+
     def get_account(self, account_id: int) -> Dict[str, Any]:
         """Get account by ID"""
-        url = f"{self.base_url}/accounts/{account_id}"
-        print(f"Sending GET request to {url}")
-        try:
-            response = requests.get(url, timeout=5)
-            print(f"Response status: {response.status_code}")
-            print(f"Response content: {response.text}")
-            return self._handle_response(response)
-        except requests.exceptions.RequestException as e:
-            print(f"Request failed: {str(e)}")
-            raise
-    
+        return self._handle_response(self._request('GET', f'/accounts/{account_id}'))
+
     def list_accounts(self) -> Dict[str, Any]:
         """List all accounts"""
-        url = f"{self.base_url}/accounts"
-        print(f"Sending GET request to {url}")
-        try:
-            response = requests.get(url, timeout=5)
-            print(f"Response status: {response.status_code}")
-            print(f"Response content: {response.text}")
-            return self._handle_response(response)
-        except requests.exceptions.RequestException as e:
-            print(f"Request failed: {str(e)}")
-            raise
-    
+        return self._handle_response(self._request('GET', '/accounts'))
+
     def delete_account(self, account_id: int) -> Dict[str, Any]:
         """Delete an account"""
-        url = f"{self.base_url}/accounts/{account_id}"
-        print(f"Sending DELETE request to {url}")
+        return self._handle_response(self._request('DELETE', f'/accounts/{account_id}'))
+
+    def create_accounts_batch(self, rows: List[Dict[str, Any]]) -> Dict[str, Any]:
+        """POST one chunk to /accounts/batch; per-row failures come back in 'errors'"""
+        response = self._request_with_retry('POST', '/accounts/batch', json=rows)
+        if response.status_code == 400:
+            data = response.json()
+            if 'errors' in data:  # every row in the chunk was rejected
+                return data
+        return self._handle_response(response)
+
+    def list_accounts_page(self, after: int, limit: int) -> Dict[str, Any]:
+        """One keyset page of the account listing"""
+        response = self._request_with_retry('GET', '/accounts', params={'after': after, 'limit': limit})
+        return self._handle_response(response)
+
+    def import_accounts(self, path: str, fmt: str = None, chunk_size: int = 500, workers: int = 4,
+                        checkpoint_path: str = None, errors_path: str = None,
+                        progress: Progress = None) -> Dict[str, Any]:
+        """Stream a CSV/NDJSON file into /accounts/batch, `workers` chunks in flight.
+
+        Completed chunk numbers are saved to `checkpoint_path` (default
+        `<path>.progress`), so rerunning after a failure skips them. Rows the
+        API rejects are appended to `errors_path` as NDJSON.
+        """
+        fmt = _guess_format(path, fmt)
+        checkpoint_path = checkpoint_path or f"{path}.progress"
+        job = {'job': 'import', 'source': os.path.abspath(path), 'chunk_size': chunk_size}
+        checkpoint = _load_checkpoint(checkpoint_path, job) or dict(job, done=[])
+        done = set(checkpoint['done'])
+        progress = progress or Progress('imported')
+        errors_file = open(errors_path, 'a', encoding='utf-8') if errors_path else None
+
+        def finished(future, number, chunk):
+            result = future.result()
+            for error in result.get('errors', []):
+                if errors_file:
+                    errors_file.write(json.dumps({'chunk': number, 'row': number * chunk_size + error['index'],
+                                                  'data': chunk[error['index']], 'error': error['error']}) + '\n')
+            progress.update(len(result.get('success', [])), len(result.get('errors', [])))
+            done.add(number)
+            checkpoint['done'] = sorted(done)
+            _save_checkpoint(checkpoint_path, checkpoint)
+
+        in_flight = {}
         try:
-            response = requests.delete(url, timeout=5)
-            print(f"Response status: {response.status_code}")
-            print(f"Response content: {response.text}")
-            return self._handle_response(response)
-        except requests.exceptions.RequestException as e:
-            print(f"Request failed: {str(e)}")
-            raise
+            with ThreadPoolExecutor(max_workers=workers) as pool:
+                try:
+                    for number, chunk in enumerate(_chunks(read_rows(path, fmt), chunk_size)):
+                        if number in done:
+                            continue
+                        if len(in_flight) >= workers:
+                            completed, _ = wait(in_flight, return_when=FIRST_COMPLETED)
+                            for future in completed:
+                                finished(future, *in_flight.pop(future))
+                        in_flight[pool.submit(self.create_accounts_batch, chunk)] = (number, chunk)
+                    for future in list(in_flight):
+                        finished(future, *in_flight.pop(future))
+                except BaseException:
+                    # Checkpoint the chunks that still land so a resume does not resend them
+                    for future, (number, chunk) in in_flight.items():
+                        if future.exception() is None:
+                            finished(future, number, chunk)
+                    raise
+        finally:
+            if errors_file:
+                errors_file.close()
+            summary = progress.finish()
+        with contextlib.suppress(FileNotFoundError):  # nothing was checkpointed
+            os.remove(checkpoint_path)
+        return summary
+
+    def export_accounts(self, path: str, fmt: str = None, page_size: int = 1000,
+                        checkpoint_path: str = None, progress: Progress = None) -> Dict[str, Any]:
+        """Page through the account listing into a CSV/NDJSON file.
+
+        After each page the cursor and file size are saved to `checkpoint_path`
+        (default `<path>.progress`); rerunning after a failure truncates any
+        partial page and continues from the saved cursor.
+        """
+        fmt = _guess_format(path, fmt)
+        checkpoint_path = checkpoint_path or f"{path}.progress"
+        job = {'job': 'export', 'target': os.path.abspath(path), 'format': fmt}
+        checkpoint = _load_checkpoint(checkpoint_path, job) or dict(job, after=0, offset=0)
+        progress = progress or Progress('exported')
+
+        with open(path, 'a+', newline='', encoding='utf-8') as f:
+            f.truncate(checkpoint['offset'])
+            f.seek(checkpoint['offset'])
+            writer = csv.DictWriter(f, fieldnames=EXPORT_FIELDS, extrasaction='ignore') if fmt == 'csv' else None
+            if writer and checkpoint['offset'] == 0:
+                writer.writeheader()
+            try:
+                after = checkpoint['after']
+                while after is not None:
+                    page = self.list_accounts_page(after, page_size)
+                    for account in page['accounts']:
+                        if writer:
+                            writer.writerow(account)
+                        else:
+                            f.write(json.dumps(account) + '\n')
+                    f.flush()
+                    after = page['next_after']
+                    checkpoint.update(after=after, offset=f.tell())
+                    _save_checkpoint(checkpoint_path, checkpoint)
+                    progress.update(len(page['accounts']))
+            finally:
+                summary = progress.finish()
+        with contextlib.suppress(FileNotFoundError):  # nothing was checkpointed
+            os.remove(checkpoint_path)
+        return summary
 
 def main():
     parser = argparse.ArgumentParser(description="BMS CLI Client")
-    parser.add_argument('action', choices=['create', 'get', 'list', 'delete'],
+    parser.add_argument('action', choices=['create', 'get', 'list', 'delete', 'import', 'export'],
                        help="Action to perform")
+    parser.add_argument('path', nargs='?', help="File to import from or export to")
     parser.add_argument('--name', help="Account holder name")
     parser.add_argument('--number', help="Account number")
     parser.add_argument('--balance', type=float, help="Initial balance")
     parser.add_argument('--id', type=int, help="Account ID")
-    
+    parser.add_argument('--url', default="http://127.0.0.1:5000/api", help="API base URL")
+    parser.add_argument('--format', choices=['csv', 'ndjson'], help="File format (default: from the extension)")
+    parser.add_argument('--chunk-size', type=int, default=500, help="Accounts per import request")
+    parser.add_argument('--workers', type=int, default=4, help="Concurrent import requests")
+    parser.add_argument('--page-size', type=int, default=1000, help="Accounts per export page")
+    parser.add_argument('--checkpoint', help="Progress file for resuming (default: <path>.progress)")
+    parser.add_argument('--errors', help="Append rejected import rows to this NDJSON file")
+
     args = parser.parse_args()
-    client = BMSClient()
-    
+    bulk = args.action in ('import', 'export')
+    if bulk and not args.path:
+        parser.error(f"a file path is required for {args.action}")
+    client = BMSClient(args.url, verbose=not bulk, pool_size=max(args.workers, 1), timeout=30 if bulk else 5)
+
     try:
         if args.action == 'create':
             if not all([args.name, args.number]):
                 raise ValueError("Name and number are required for account creation")
             result = client.create_account(args.name, args.number, args.balance or 0.0)
-        
+
         elif args.action == 'get':
             if not args.id:
                 raise ValueError("Account ID is required")
             result = client.get_account(args.id)
-        
+
         elif args.action == 'list':
             result = client.list_accounts()
-        
+
         elif args.action == 'delete':
             if not args.id:
                 raise ValueError("Account ID is required")
             result = client.delete_account(args.id)
-        
+
+        elif args.action == 'import':
+            result = client.import_accounts(args.path, args.format, args.chunk_size, args.workers,
+                                            args.checkpoint, args.errors)
+
+        elif args.action == 'export':
+            result = client.export_accounts(args.path, args.format, args.page_size, args.checkpoint)
+
         print(json.dumps(result, indent=2))
-    
+
     except Exception as e:
         print(f"Error: {str(e)}")
+        if bulk:
+            print("Progress was saved; rerun the same command to resume")
         exit(1)
 
 if __name__ == '__main__':
-    main()
\ No newline at end of file
+    main()
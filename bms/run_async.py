@@ -0,0 +1,7 @@
+from aiohttp import web
+from app.async_app import create_async_app
+
+app = create_async_app()
+
+if __name__ == '__main__':
+    web.run_app(app, host='127.0.0.1', port=5000)
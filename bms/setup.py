@@ -11,8 +11,14 @@ setup(
         "beautifulsoup4",
         "python-dotenv",
         "aiohttp",
+        "aiosqlite",
+        "greenlet",
+        "aiosmtplib",
         "asyncio",
         "selenium",
         "structlog"
     ],
+    entry_points={
+        "console_scripts": ["startup-report=app.startup_report:main"],
+    },
 )
\ No newline at end of file
@@ -0,0 +1,55 @@
+import os
+import pytest
+
+# Never talk to a real SMTP server from the test suite
+os.environ.setdefault("EMAIL_TEST_MODE", "true")
+
+from app import create_app  # noqa: E402  (Config reads the environment on import)
+from app.config import Config  # noqa: E402
+from app.db import db  # noqa: E402
+
+
+class TestConfig(Config):
+    TESTING = True
+    SQLALCHEMY_DATABASE_URI = 'sqlite:///:memory:'
+    EMAIL_TEST_MODE = True
+
+
+@pytest.fixture
+def make_config(tmp_path):
+    """Build a TestConfig subclass from overrides; `db_file` puts the database in a file under tmp_path"""
+    def make(db_file=None, **overrides):
+        if db_file:
+            overrides['SQLALCHEMY_DATABASE_URI'] = f"sqlite:///{tmp_path / db_file}"
+        return type('TestConfig', (TestConfig,), overrides)
+    return make
+
+@pytest.fixture
+def make_app(make_config):
+    """Create Flask apps like `make_config`, each with its app context pushed until the test ends"""
+    created = []
+
+    def make(db_file=None, **overrides):
+        app = create_app(make_config(db_file, **overrides))
+        context = app.app_context()
+        context.push()
+        created.append((app, context))
+        return app
+
+    yield make
+    for app, context in reversed(created):
+        writer = app.extensions.get('group_commit')
+        if writer is not None:
+            writer.close(5)
+        db.session.remove()
+        db.engine.dispose()  # a private in-memory database goes with its connection
+        context.pop()
+
+@pytest.fixture
+def app(make_app):
+    """Application on a private in-memory database; modules override this for settings or seed data"""
+    return make_app()
+
+@pytest.fixture
+def client(app):
+    return app.test_client()
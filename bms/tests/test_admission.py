@@ -0,0 +1,89 @@
+import threading
+import time
+import pytest
+from app.admission import ConcurrencyLimiter, RateLimiter
+
+ADMISSION_SETTINGS = {
+    'RATE_LIMIT_PER_SECOND': 1,
+    'RATE_LIMIT_BURST': 3,
+    'MAX_CONCURRENT_WRITES': 1,
+    'ADMISSION_QUEUE_SIZE': 0,
+    'ADMISSION_RETRY_AFTER': 2,
+    'ADMISSION_CLIENT_HEADER': 'X-API-Key',
+}
+
+
+@pytest.fixture
+def app(make_app):
+    """Create application with a tight rate limit and a single write slot"""
+    return make_app(**ADMISSION_SETTINGS)
+
+def test_token_bucket_refills_at_rate():
+    """Test a client gets its burst, then one request per 1/rate seconds"""
+    now = [0.0]
+    limiter = RateLimiter(rate=2, burst=2, max_clients=2, clock=lambda: now[0])
+    assert limiter.acquire('a') == 0 and limiter.acquire('a') == 0
+    assert limiter.acquire('a') == pytest.approx(0.5)
+    now[0] = 0.5
+    assert limiter.acquire('a') == 0
+    assert limiter.acquire('b') == 0  # buckets are per client
+
+    # Past max_clients the least recently seen bucket is dropped and starts full again
+    limiter.acquire('c')
+    assert list(limiter._buckets) == ['b', 'c']
+
+def test_concurrency_limiter_queue():
+    """Test callers wait in a bounded queue, time out, and are refused when it is full"""
+    limiter = ConcurrencyLimiter(limit=1, queue_size=1, timeout=0.05)
+    assert limiter.acquire() is None
+    assert limiter.acquire() == 'queue_timeout'
+
+    limiter.timeout = 5
+    results = []
+    waiter = threading.Thread(target=lambda: results.append(limiter.acquire()))
+    waiter.start()
+    while not limiter.waiting:
+        time.sleep(0.001)
+    assert limiter.acquire() == 'queue_full'
+    limiter.release()
+    waiter.join()
+    assert results == [None] and limiter.in_flight == 1 and limiter.waiting == 0
+
+def test_rate_limit_answers_429(client):
+    """Test a client over its rate gets 429 with Retry-After while others and probes are served"""
+    statuses = [client.get('/api/accounts', headers={'X-API-Key': 'k1'}).status_code for _ in range(4)]
+    assert statuses == [200, 200, 200, 429]
+    response = client.get('/api/accounts', headers={'X-API-Key': 'k1'})
+    assert response.status_code == 429 and response.headers['Retry-After'] == '1'
+    assert client.get('/api/accounts', headers={'X-API-Key': 'k2'}).status_code == 200
+    assert client.get('/api/health', headers={'X-API-Key': 'k1'}).status_code == 200
+
+def test_write_overflow_answers_503(app, client):
+    """Test writes beyond their cap are shed with 503 while reads keep their own slots"""
+    controller = app.extensions['admission']
+
+    def create(key):  # a fresh client each time, so the rate limit stays out of the way
+        return client.post('/api/accounts', json={'name': "A", 'number': "ADM1"}, headers={'X-API-Key': key})
+
+    assert controller.admit('other', write=True) is None  # a write in flight elsewhere
+    response = create('w1')
+    assert response.status_code == 503 and response.headers['Retry-After'] == '2'
+    assert client.get('/api/accounts', headers={'X-API-Key': 'r1'}).status_code == 200
+
+    controller.release(write=True)
+    assert create('w2').status_code == 201
+    assert create('w3').status_code == 409
+    stats = controller.stats()
+    assert (stats['writes_in_flight'], stats['reads_in_flight']) == (0, 0)  # released after errors too
+    assert (stats['queue_full'], stats['rejected']) == (1, 1)
+
+    body = client.get('/api/metrics').get_data(as_text=True)
+    assert 'bms_admission_queue_full_total 1' in body
+    assert 'bms_admission_writes_in_flight 0' in body
+    assert 'bms_http_request_duration_seconds_count{route="/api/accounts",method="POST",status="503"} 1' in body
+
+def test_admission_can_be_disabled(make_app):
+    """Test ADMISSION_ENABLED=false leaves the API unguarded"""
+    client = make_app(**ADMISSION_SETTINGS, ADMISSION_ENABLED=False).test_client()
+    assert all(client.get('/api/accounts').status_code == 200 for _ in range(5))
+    assert 'bms_admission' not in client.get('/api/metrics').get_data(as_text=True)
@@ -0,0 +1,148 @@
+import asyncio
+import random
+import sqlite3
+import threading
+import pytest
+from aiohttp.test_utils import TestClient, TestServer
+import app.async_crud as async_crud
+from app.async_app import create_async_app
+from app.async_db import async_database_url
+
+
+@pytest.fixture
+def app(make_config):
+    """Create the aiohttp application on an in-memory database"""
+    return create_async_app(make_config())
+
+@pytest.fixture
+def file_app(make_config):
+    """Create the aiohttp application on a database file, for real concurrent connections"""
+    return create_async_app(make_config('async.db'))
+
+def test_async_database_url():
+    """Test sync database URLs are mapped onto their asyncio drivers"""
+    assert async_database_url('sqlite:///bms.db') == 'sqlite+aiosqlite:///bms.db'
+    assert async_database_url('sqlite+aiosqlite:///:memory:') == 'sqlite+aiosqlite:///:memory:'
+    assert async_database_url('postgresql://u:p@db/bms') == 'postgresql+asyncpg://u:p@db/bms'
+    with pytest.raises(ValueError):
+        async_database_url('mysql://db/bms')
+
+@pytest.mark.asyncio
+async def test_account_routes(app):
+    """Test the async routes answer like the Flask ones"""
+    async with TestClient(TestServer(app)) as client:
+        response = await client.post('/api/accounts', json={'name': "Async", 'number': "ASY1", 'balance': 50.0})
+        assert response.status == 201
+        created = await response.json()
+        assert (created['id'], created['balance']) == (1, 50.0)
+        assert (await client.post('/api/accounts', json={'name': "Dup", 'number': "ASY1"})).status == 409
+        assert (await client.post('/api/accounts', json={'name': "No number"})).status == 400
+
+        response = await client.post('/api/accounts/batch', json=[
+            {'name': "B", 'number': "ASY2", 'balance': 5.0}, {'name': "C", 'number': "ASY1"}, {'name': "D"}])
+        body = await response.json()
+        assert response.status == 201
+        assert [account['number'] for account in body['success']] == ["ASY2"]
+        assert [error['index'] for error in body['errors']] == [1, 2]
+
+        assert (await (await client.get('/api/accounts/1')).json())['name'] == "Async"
+        assert (await (await client.get('/api/accounts/number/ASY2')).json())['id'] == 2
+        assert (await client.get('/api/accounts/99')).status == 404
+
+        response = await client.put('/api/accounts/2', json={'name': "Renamed", 'balance': 7.5})
+        assert (await response.json())['balance'] == 7.5
+        # The cached copy was invalidated by the update
+        assert (await (await client.get('/api/accounts/2')).json())['name'] == "Renamed"
+
+        response = await client.patch('/api/accounts/bulk', json=[
+            {'id': 1, 'fields': {'interest_rate': 2.5}}, {'id': 42, 'fields': {'name': "Ghost"}}])
+        assert await response.json() == {'updated': 1, 'not_found': [{'index': 1, 'id': 42}], 'errors': []}
+
+        page = await (await client.get('/api/accounts?limit=1')).json()
+        assert [account['id'] for account in page['accounts']] == [1] and page['next_after'] == 1
+        lines = (await (await client.get('/api/accounts?format=ndjson')).text()).splitlines()
+        assert len(lines) == 2
+
+        found = await (await client.get('/api/accounts/search?name=ren&q=renamed&sort=balance')).json()
+        assert [account['id'] for account in found['accounts']] == [2] and found['next_cursor'] is None
+        assert (await client.get('/api/accounts/search?sort=nope')).status == 400
+
+        assert await (await client.get('/api/accounts/summary')).json() == {
+            'accounts': 2, 'total_balance': 57.5, 'bucket_size': 10}
+        assert (await client.delete('/api/accounts/2')).status == 204
+        assert (await client.delete('/api/accounts/2')).status == 404
+        assert (await (await client.get('/api/accounts/summary')).json())['accounts'] == 1
+
+@pytest.mark.asyncio
+async def test_transfer_routes_and_metrics(app):
+    """Test transfers, the ledger listing and per-route query accounting"""
+    async with TestClient(TestServer(app)) as client:
+        await client.post('/api/accounts/batch', json=[
+            {'name': f"U{i}", 'number': f"TRA{i}", 'balance': 100.0} for i in range(2)])
+        response = await client.post('/api/transfers', json={'from_id': 1, 'to_id': 2, 'amount': 40.25})
+        assert response.status == 201
+        assert (await response.json())['from_balance'] == 59.75
+        assert (await client.post('/api/transfers', json={'from_id': 1, 'to_id': 2, 'amount': 500})).status == 409
+        assert (await client.post('/api/transfers', json={'from_id': 1, 'to_id': 9, 'amount': 1})).status == 404
+        assert (await client.post('/api/transfers', json={'from_id': 1, 'to_id': 1, 'amount': 1})).status == 400
+
+        ledger = await (await client.get('/api/accounts/2/ledger')).json()
+        assert [entry['amount'] for entry in ledger['entries']] == [40.25]
+
+        metrics = await (await client.get('/api/metrics')).text()
+        assert 'bms_http_request_duration_seconds_count{route="/api/transfers",method="POST",status="201"} 1' in metrics
+        queries = [line for line in metrics.splitlines()
+                   if line.startswith('bms_db_queries_per_route_total{route="/api/transfers"}')]
+        assert queries and int(queries[0].split()[-1]) > 0
+
+@pytest.mark.asyncio
+async def test_concurrent_transfers_conserve_money(file_app):
+    """Test many concurrent requests moving money between hot accounts lose nothing"""
+    async with TestClient(TestServer(file_app)) as client:
+        await client.post('/api/accounts/batch', json=[
+            {'name': f"Hot {i}", 'number': f"HOT{i}", 'balance': 100.0} for i in range(4)])
+
+        async def transfer(seed):
+            rng = random.Random(seed)
+            from_id, to_id = rng.sample(range(1, 5), 2)
+            response = await client.post('/api/transfers', json={
+                'from_id': from_id, 'to_id': to_id, 'amount': rng.choice((5, 30, 75))})
+            return response.status
+
+        statuses = await asyncio.gather(*(transfer(seed) for seed in range(100)))
+        assert set(statuses) <= {201, 409}
+
+        accounts = await (await client.get('/api/accounts')).json()
+        balances = [account['balance'] for account in accounts]
+        assert sum(balances) == 400.0 and min(balances) >= 0
+        summary = await (await client.get('/api/accounts/summary')).json()
+        assert summary['total_balance'] == 400.0
+
+@pytest.mark.asyncio
+async def test_balance_update_locks_before_reading(file_app, tmp_path, monkeypatch):
+    """Test a writer arriving while an update reads the balance waits for its commit"""
+    def rename():
+        with sqlite3.connect(tmp_path / 'async.db', timeout=5) as conn:
+            conn.execute("UPDATE accounts SET name = 'Renamed' WHERE id = 1")
+
+    writers = []
+    real_current_balance = async_crud._current_balance
+
+    async def current_balance(session, account_id):
+        balance = await real_current_balance(session, account_id)
+        if not writers:
+            writers.append(threading.Thread(target=rename))
+            writers[0].start()
+            writers[0].join(0.2)
+            assert writers[0].is_alive()  # blocked on the write lock
+        return balance
+
+    monkeypatch.setattr(async_crud, '_current_balance', current_balance)
+    async with TestClient(TestServer(file_app)) as client:
+        await client.post('/api/accounts', json={'name': "A", 'number': "LCK1", 'balance': 100.0})
+        response = await client.put('/api/accounts/1', json={'balance': 40.0})
+        writers[0].join(5)
+        assert response.status == 200
+        summary = await (await client.get('/api/accounts/summary')).json()
+        assert summary['total_balance'] == 40.0
+        assert (await (await client.get('/api/accounts/1')).json())['name'] == "Renamed"
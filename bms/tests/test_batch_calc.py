@@ -3,11 +3,16 @@ from concurrent.futures import ThreadPoolExecutor
 import asyncio
 from app import create_app
 from app.db import db
+from app.aggregates import get_summary
 from app.models import Account
 from app.batch_calc import (
     calculate_batch_total,
     process_batch_threaded,
-    process_batch_async
+    process_batch_async,
+    process_batch_sql,
+    process_batch_stream,
+    stream_batches,
+    iter_batch_aggregates
 )
 
 @pytest.fixture
@@ -72,6 +77,48 @@ def test_process_batch_threaded(sample_accounts):
     assert results[1][1] == 7000.0  # Batch 1: 3000 + 4000
     assert results[2][1] == 5000.0  # Batch 2: 5000
 
+def test_process_batch_sql(app, sample_accounts):
+    """Test SQL-pushdown batches match the in-memory batch totals"""
+    with app.app_context():
+        assert process_batch_sql() == process_batch_threaded(sample_accounts)
+        # One batch per query exercises the id-range partitioning
+        aggregates = list(iter_batch_aggregates(batches_per_query=1))
+        assert aggregates == [(0, 2, 3000.0), (1, 2, 7000.0), (2, 1, 5000.0)]
+
+def test_process_batch_stream(app, sample_accounts):
+    """Test the streaming pipeline matches the in-memory batch totals for any chunking"""
+    with app.app_context():
+        expected = process_batch_threaded(sample_accounts)
+        assert process_batch_stream() == expected
+        for chunk_size, workers, prefetch in ((1, 1, 1), (2, 3, 2), (4, 2, 1), (100, 4, 8)):
+            assert list(stream_batches(chunk_size=chunk_size, workers=workers, prefetch=prefetch)) == expected
+
+def test_stream_batches_bounded_and_pluggable(app, sample_accounts):
+    """Test fetching stays `prefetch` chunks ahead, custom functions get rows, failures are skipped"""
+    with app.app_context():
+        for i in range(5, 40):
+            db.session.add(Account(name=f"User {i}", number=f"ACC{i}", balance=1.0, interest_rate=i))
+        db.session.commit()
+
+        started = []
+        def max_rate(rows):
+            started.append(rows[0].id)
+            if rows[0].id == 3:
+                raise ValueError("bad batch")
+            return max(row.interest_rate or 0 for row in rows)
+
+        stream = stream_batches(max_rate, columns=(Account.interest_rate,), chunk_size=4, workers=2, prefetch=2)
+        assert next(stream) == (0, 0)
+        # Two chunks of two batches were fetched; nothing beyond them was computed
+        assert len(started) <= 4
+        results = [(0, 0)] + list(stream)
+        assert [num for num, _ in results] == [0] + list(range(2, 20))
+        assert results[-1] == (19, 39)
+
+        stream = stream_batches(chunk_size=2, workers=1, prefetch=1)
+        next(stream)
+        stream.close()
+
 @pytest.mark.asyncio
 async def test_process_batch_async(sample_accounts):
     """Test processing accounts in batches using asyncio"""
@@ -121,4 +168,71 @@ async def test_async_stress():
         tasks = [process_batch_async(accounts) for _ in range(10)]
         results = await asyncio.gather(*tasks)
         
-        assert all(len(r) == 3 for r in results)  # Each should have 3 batches
\ No newline at end of file
+        assert all(len(r) == 3 for r in results)  # Each should have 3 batches
+
+def test_compute_accrual_cents():
+    """Test fixed-point interest rounds half away from zero, with and without numpy"""
+    import app.batch_calc as batch_calc
+    balances = [100000, 3650000, -3650000, 1, 0]
+    rates = [500, 1000, 1000, 99999, 250]
+    expected = [14, 1000, -1000, 0, 0]
+    assert list(batch_calc.compute_accrual_cents(balances, rates)) == expected
+    numpy = batch_calc.np
+    batch_calc.np = None
+    try:
+        assert batch_calc.compute_accrual_cents(balances, rates) == expected
+    finally:
+        batch_calc.np = numpy
+
+@pytest.fixture
+def memory_app(make_app):
+    """Create an application backed by a private in-memory database"""
+    return make_app()
+
+def test_accrue_interest_resumes_after_failure(memory_app, monkeypatch):
+    """Test an interrupted accrual resumes from its checkpoint without double-counting"""
+    import app.batch_calc as batch_calc
+    with memory_app.app_context():
+        for i in range(5):
+            db.session.add(Account(name=f"User {i}", number=f"ACC{i}",
+                                   balance=3650.0, interest_rate=10.0))
+        db.session.commit()
+
+        original = batch_calc.compute_accrual_cents
+        calls = []
+        def failing(*args, **kwargs):
+            calls.append(1)
+            if len(calls) == 2:
+                raise RuntimeError("interrupted")
+            return original(*args, **kwargs)
+        monkeypatch.setattr(batch_calc, 'compute_accrual_cents', failing)
+        with pytest.raises(RuntimeError):
+            batch_calc.accrue_interest(run_key="2024-01-01", chunk_size=2)
+        monkeypatch.setattr(batch_calc, 'compute_accrual_cents', original)
+
+        summary = batch_calc.accrue_interest(run_key="2024-01-01", chunk_size=2)
+        assert summary['resumed_from'] == 2
+        assert summary['accounts'] == 3
+        assert batch_calc.accrue_interest(run_key="2024-01-01")['accounts'] == 0
+
+        db.session.expire_all()
+        assert [float(a.balance) for a in Account.query.order_by(Account.id)] == [3651.0] * 5
+
+def test_accrue_interest_keeps_concurrent_writes(memory_app, monkeypatch):
+    """Test a balance change committed between a chunk's read and its update is not overwritten"""
+    import app.batch_calc as batch_calc
+    from app.crud import create_account, transfer_funds, update_account
+    with memory_app.app_context():
+        for i in range(2):
+            update_account(create_account(f"User {i}", f"ACC{i}", 3650.0).id, interest_rate=10.0)
+
+        original = batch_calc.compute_accrual_cents
+        def with_transfer(*args, **kwargs):
+            transfer_funds(1, 2, 7.0)  # commits after the chunk was read
+            return original(*args, **kwargs)
+        monkeypatch.setattr(batch_calc, 'compute_accrual_cents', with_transfer)
+        batch_calc.accrue_interest(run_key="2024-01-01")
+
+        db.session.expire_all()
+        assert [float(a.balance) for a in Account.query.order_by(Account.id)] == [3644.0, 3658.0]
+        assert get_summary()['total_balance'] == 7302.0
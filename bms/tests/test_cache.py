@@ -0,0 +1,45 @@
+import time
+from app.cache import AccountCache
+
+
+def account(account_id, number=None, balance=0.0):
+    return {'id': account_id, 'number': number or f"ACC{account_id}", 'balance': balance}
+
+def test_cache_lookup_by_id_and_number():
+    """Test entries are reachable by id and by number"""
+    cache = AccountCache(max_size=10)
+    cache.put(account(1), cache.generation)
+    assert cache.get(1)['number'] == "ACC1"
+    assert cache.get_by_number("ACC1")['id'] == 1
+    assert cache.get(2) is None
+    stats = cache.stats()
+    assert (stats['hits'], stats['misses'], stats['size']) == (2, 1, 1)
+
+def test_cache_lru_eviction():
+    """Test the least recently used entry is evicted at the size cap"""
+    cache = AccountCache(max_size=2)
+    cache.put(account(1), cache.generation)
+    cache.put(account(2), cache.generation)
+    cache.get(1)
+    cache.put(account(3), cache.generation)
+    assert cache.get(2) is None
+    assert cache.get_by_number("ACC2") is None
+    assert cache.get(1) is not None and cache.get(3) is not None
+    assert cache.stats()['evictions'] == 1
+
+def test_cache_ttl_expiry():
+    """Test entries expire after the TTL"""
+    cache = AccountCache(max_size=10, ttl=0.01)
+    cache.put(account(1), cache.generation)
+    time.sleep(0.02)
+    assert cache.get(1) is None
+
+def test_cache_invalidation_rejects_stale_put():
+    """Test invalidation drops both keys and blocks puts from older reads"""
+    cache = AccountCache(max_size=10)
+    cache.put(account(1), cache.generation)
+    stale_generation = cache.generation
+    cache.invalidate(1)
+    assert cache.get(1) is None and cache.get_by_number("ACC1") is None
+    cache.put(account(1, balance=5.0), stale_generation)
+    assert cache.get(1) is None
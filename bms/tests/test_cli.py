@@ -0,0 +1,99 @@
+import csv
+import io
+import json
+import threading
+import pytest
+from werkzeug.serving import make_server
+from app.db import db
+from app.models import Account
+from client.cli import BMSClient, Progress, retry_after_seconds
+
+
+@pytest.fixture
+def server(make_app):
+    """Serve a fresh app over real HTTP on a free port.
+
+    An in-memory database would share one connection between the server's
+    request threads, so concurrent imports need a file.
+    """
+    app = make_app('cli.db')
+    http = make_server('127.0.0.1', 0, app, threaded=True)
+    thread = threading.Thread(target=http.serve_forever, daemon=True)
+    thread.start()
+    http.app = app
+    http.base_url = f"http://127.0.0.1:{http.server_port}/api"
+    yield http
+    http.shutdown()
+    http.server_close()
+
+def quiet():
+    return Progress('test', stream=io.StringIO())
+
+def test_import_csv_resumes_and_reports_errors(server, tmp_path):
+    """Test import sends chunks concurrently, skips checkpointed chunks and logs rejected rows"""
+    source = tmp_path / 'accounts.csv'
+    with open(source, 'w', newline='') as f:
+        writer = csv.writer(f)
+        writer.writerow(['name', 'number', 'balance'])
+        for i in range(10):
+            writer.writerow([f"Holder {i}", f"IMP{i:04d}", i * 10])
+        writer.writerow(["Duplicate", "IMP0009", 5])
+
+    # Chunks 0 and 1 (rows 0-5) were sent by an earlier, interrupted run
+    checkpoint = tmp_path / 'accounts.csv.progress'
+    checkpoint.write_text(json.dumps({'job': 'import', 'source': str(source), 'chunk_size': 3, 'done': [0, 1]}))
+
+    client = BMSClient(server.base_url, verbose=False, pool_size=3)
+    errors = tmp_path / 'errors.ndjson'
+    summary = client.import_accounts(str(source), chunk_size=3, workers=3, errors_path=str(errors),
+                                     progress=quiet())
+
+    assert (summary['rows'], summary['errors']) == (4, 1)
+    assert not checkpoint.exists()
+    rejected = [json.loads(line) for line in errors.read_text().splitlines()]
+    assert [(error['row'], error['data']['number']) for error in rejected] == [(10, "IMP0009")]
+    with server.app.app_context():
+        numbers = sorted(number for (number,) in db.session.query(Account.number))
+    assert numbers == [f"IMP{i:04d}" for i in range(6, 10)]
+
+def test_import_empty_files(server, tmp_path):
+    """Test importing a header-only CSV or an empty NDJSON file is a 0-row import, not an error"""
+    client = BMSClient(server.base_url, verbose=False)
+    (tmp_path / 'empty.csv').write_text("name,number,balance\n")
+    (tmp_path / 'empty.ndjson').write_text("")
+    for name in ('empty.csv', 'empty.ndjson'):
+        summary = client.import_accounts(str(tmp_path / name), progress=quiet())
+        assert (summary['rows'], summary['errors']) == (0, 0)
+        assert not (tmp_path / f"{name}.progress").exists()
+
+def test_export_pages_and_resumes(server, tmp_path):
+    """Test export pages through the listing and continues a partial file from its checkpoint"""
+    client = BMSClient(server.base_url, verbose=False)
+    client.create_accounts_batch([{'name': f"Holder {i}", 'number': f"EXP{i:04d}", 'balance': i}
+                                  for i in range(7)])
+
+    target = tmp_path / 'accounts.ndjson'
+    first_page = client.list_accounts_page(0, 3)['accounts']
+    target.write_text(''.join(json.dumps(a) + '\n' for a in first_page) + '{"torn": ')
+    offset = len(target.read_text()) - len('{"torn": ')
+    (tmp_path / 'accounts.ndjson.progress').write_text(json.dumps(
+        {'job': 'export', 'target': str(target), 'format': 'ndjson', 'after': first_page[-1]['id'],
+         'offset': offset}))
+
+    summary = client.export_accounts(str(target), page_size=3, progress=quiet())
+    assert summary['rows'] == 4
+    exported = [json.loads(line) for line in target.read_text().splitlines()]
+    assert [a['number'] for a in exported] == [f"EXP{i:04d}" for i in range(7)]
+
+    csv_target = tmp_path / 'accounts.csv'
+    client.export_accounts(str(csv_target), page_size=3, progress=quiet())
+    with open(csv_target, newline='') as f:
+        rows = list(csv.DictReader(f))
+    assert [row['number'] for row in rows] == [f"EXP{i:04d}" for i in range(7)]
+
+def test_retry_after_seconds():
+    """Test numeric Retry-After values are used and HTTP dates fall back to the backoff"""
+    assert retry_after_seconds('2', 0.5) == 2.0
+    assert retry_after_seconds(None, 0.5) == 0.5
+    assert retry_after_seconds('Wed, 21 Oct 2026 07:28:00 GMT', 0.5) == 0.5
+    assert retry_after_seconds('-1', 0.5) == 0.5 and retry_after_seconds('inf', 0.5) == 0.5
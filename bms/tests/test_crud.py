@@ -4,7 +4,8 @@ from app.db import db
 from app.models import Account
 from app.crud import (
     create_account, get_account, get_account_by_number,
-    list_accounts, update_account, delete_account
+    list_accounts, update_account, delete_account, create_accounts_bulk,
+    get_account_dict, get_account_dict_by_number
 )
 from app.exceptions import AccountNotFoundError, DuplicateAccountError
 
@@ -49,6 +50,14 @@ def test_get_account(app):
         assert retrieved.id == account.id
         assert retrieved.name == account.name
 
+def test_get_account_dict_matches_orm(app):
+    """Test the Core read path serializes exactly like Account.to_dict()"""
+    with app.app_context():
+        account = create_account("Test User", "123456", 0.1 + 0.2)
+        expected = get_account(account.id).to_dict()
+        assert get_account_dict(account.id) == expected
+        assert get_account_dict_by_number("123456") == expected
+
 def test_get_nonexistent_account(app):
     """Test getting non-existent account"""
     with app.app_context():
@@ -77,4 +86,18 @@ def test_list_accounts(app):
         create_account("User 1", "111111", 1000.0)
         create_account("User 2", "222222", 2000.0)
         accounts = list_accounts()
-        assert len(accounts) == 2
\ No newline at end of file
+        assert len(accounts) == 2
+
+def test_create_accounts_bulk(app):
+    """Test bulk creation reports duplicates by index without aborting the batch"""
+    with app.app_context():
+        create_account("Existing", "111111", 500.0)
+        created, errors = create_accounts_bulk([
+            {'name': "User 1", 'number': "111111", 'balance': 1000.0},
+            {'name': "User 2", 'number': "222222", 'balance': 2000.0},
+            {'name': "User 3", 'number': "222222", 'balance': 3000.0},
+            {'name': "User 4", 'number': "444444", 'balance': 4000.0},
+        ])
+        assert [account['number'] for account in created] == ["222222", "444444"]
+        assert [idx for idx, _ in errors] == [0, 2]
+        assert len(list_accounts()) == 3
@@ -0,0 +1,111 @@
+import sqlite3
+import threading
+import pytest
+from sqlalchemy import text
+from sqlalchemy.exc import OperationalError
+import app.crud as crud
+from app.aggregates import get_summary
+from app.config import Config
+from app.crud import create_account, create_accounts_bulk, transfer_funds, update_account
+from app.db import db, retry_on_lock
+from app.exceptions import DatabaseBusyError, InvalidAccountDataError
+from app.models import Account
+
+
+@pytest.fixture
+def file_app(make_app):
+    """Create an application backed by a temporary database file"""
+    return make_app('test.db', DB_POOL_SIZE=3, DB_LOCK_RETRY_BACKOFF=0.001)
+
+def test_storage_profile_pragmas(file_app):
+    """Test every pooled connection gets the configured pragmas"""
+    with file_app.app_context():
+        assert db.session.execute(text("PRAGMA journal_mode")).scalar() == 'wal'
+        assert db.session.execute(text("PRAGMA synchronous")).scalar() == 1  # NORMAL
+        assert db.session.execute(text("PRAGMA busy_timeout")).scalar() == 5000
+        assert db.engine.pool.size() == 3
+
+def locked_error():
+    return OperationalError("UPDATE accounts", {}, sqlite3.OperationalError("database is locked"))
+
+def test_retry_on_lock(file_app):
+    """Test lock errors are retried and then surfaced as DatabaseBusyError"""
+    calls = []
+
+    @retry_on_lock
+    def flaky():
+        calls.append(1)
+        if len(calls) < 3:
+            raise locked_error()
+        return "done"
+
+    @retry_on_lock
+    def always_locked():
+        raise locked_error()
+
+    with file_app.app_context():
+        assert flaky() == "done"
+        assert len(calls) == 3
+        with pytest.raises(DatabaseBusyError):
+            always_locked()
+
+def test_bulk_create_is_one_transaction(file_app, monkeypatch):
+    """Test a failing later chunk rolls back the earlier ones, and a lock retry re-runs them cleanly"""
+    file_app.config['BULK_INSERT_CHUNK_SIZE'] = 2
+    rows = [{'name': f"User {i}", 'number': f"TX{i}", 'balance': 10.0} for i in range(5)]
+    insert_rows = crud._insert_rows
+    calls = []
+
+    def failing_insert(error):
+        def insert(chunk):
+            calls.append(1)
+            if len(calls) == 2:
+                raise error
+            return insert_rows(chunk)
+        return insert
+
+    with file_app.app_context():
+        monkeypatch.setattr(crud, '_insert_rows', failing_insert(ValueError("disk on fire")))
+        with pytest.raises(InvalidAccountDataError):
+            create_accounts_bulk(rows)
+        assert db.session.query(Account).count() == 0
+        assert get_summary()['accounts'] == 0
+
+        calls.clear()
+        monkeypatch.setattr(crud, '_insert_rows', failing_insert(locked_error()))
+        created, errors = create_accounts_bulk(rows)
+        assert (len(created), errors) == (5, [])
+        assert db.session.query(Account).count() == 5
+        assert get_summary() == {'accounts': 5, 'total_balance': 50.0, 'bucket_size': Config.BATCH_SIZE}
+
+def test_balance_update_locks_before_reading(file_app, monkeypatch):
+    """Test a transfer arriving while an update reads the balance waits for its commit"""
+    with file_app.app_context():
+        create_account("A", "LCK1", 100.0)
+        create_account("B", "LCK2", 0.0)
+
+    def transfer():
+        with file_app.app_context():
+            transfer_funds(1, 2, 30.0)
+            db.session.remove()
+
+    reads, transfers = [], []
+    real_get_account = crud.get_account
+
+    def get_account(account_id):
+        account = real_get_account(account_id)
+        reads.append(float(account.balance))
+        if not transfers:
+            transfers.append(threading.Thread(target=transfer))
+            transfers[0].start()
+            transfers[0].join(0.2)
+            assert transfers[0].is_alive()  # blocked on the write lock
+        return account
+
+    monkeypatch.setattr(crud, 'get_account', get_account)
+    with file_app.app_context():
+        update_account(1, balance=500.0)
+        transfers[0].join(5)
+        assert reads == [100.0]  # no lock error forced a second read
+        assert db.session.get(Account, 1).balance == 470.0
+        assert get_summary()['total_balance'] == 500.0
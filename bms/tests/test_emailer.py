@@ -0,0 +1,148 @@
+import asyncio
+import socketserver
+import threading
+import time
+import pytest
+from app.emailer import AsyncEmailSender, EmailDeliveryPool, _build_message
+
+
+class FakeSMTPHandler(socketserver.StreamRequestHandler):
+    """Just enough SMTP to accept messages; records connections and deliveries"""
+
+    def reply(self, line):
+        self.wfile.write(line.encode() + b"\r\n")
+
+    def handle(self):
+        server = self.server
+        with server.lock:
+            server.connections += 1
+        self.reply("220 localhost ready")
+        while True:
+            line = self.rfile.readline()
+            if not line:
+                return
+            command = line.decode().strip().upper()
+            if command.startswith(("EHLO", "HELO")):
+                self.reply("250 localhost")
+            elif command.startswith("RCPT"):
+                with server.lock:
+                    server.rcpt_count += 1
+                    fail = server.rcpt_count <= server.transient_failures
+                self.reply("451 try again later" if fail else "250 OK")
+            elif command.startswith(("MAIL", "RSET", "NOOP")):
+                self.reply("250 OK")
+            elif command == "DATA":
+                self.reply("354 end with .")
+                while self.rfile.readline().rstrip(b"\r\n") != b".":
+                    pass
+                with server.lock:
+                    server.messages += 1
+                self.reply("250 queued")
+            elif command == "QUIT":
+                self.reply("221 bye")
+                return
+            else:
+                self.reply("502 not implemented")
+
+
+@pytest.fixture
+def smtp_server():
+    """Run a local SMTP stand-in on a free port"""
+    server = socketserver.ThreadingTCPServer(("127.0.0.1", 0), FakeSMTPHandler)
+    server.daemon_threads = True
+    server.lock = threading.Lock()
+    server.connections = 0
+    server.messages = 0
+    server.rcpt_count = 0
+    server.transient_failures = 0
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield server
+    server.shutdown()
+    server.server_close()
+
+def make_pool(server, **kwargs):
+    host, port = server.server_address
+    return EmailDeliveryPool(host, port, use_tls=False, retry_backoff=0.01, **kwargs)
+
+def message(i):
+    return _build_message("bms@example.com", f"user{i}@example.com", f"Subject {i}", "Hello")
+
+def test_pool_reuses_connections(smtp_server):
+    """Test a burst of messages is delivered over one connection per worker"""
+    pool = make_pool(smtp_server, workers=2)
+    for i in range(50):
+        assert pool.submit(message(i))
+    assert pool.flush(timeout=10)
+    pool.close(timeout=10)
+
+    stats = pool.stats()
+    assert stats['sent'] == 50
+    assert stats['failed'] == 0
+    assert smtp_server.messages == 50
+    assert smtp_server.connections <= 2
+
+def test_pool_retries_transient_failures(smtp_server):
+    """Test 4xx replies are retried on a fresh connection"""
+    smtp_server.transient_failures = 2
+    pool = make_pool(smtp_server, workers=1, max_retries=3)
+    pool.submit(message(0))
+    assert pool.flush(timeout=10)
+    pool.close(timeout=10)
+
+    stats = pool.stats()
+    assert stats['sent'] == 1
+    assert stats['retried'] == 2
+    assert smtp_server.messages == 1
+
+def test_pool_drops_when_queue_full(smtp_server):
+    """Test a full queue drops the message and counts it instead of blocking"""
+    pool = make_pool(smtp_server, workers=0, queue_size=1, enqueue_timeout=0.01)
+    assert pool.submit(message(0))
+    assert not pool.submit(message(1))
+    assert pool.stats()['dropped'] == 1
+    assert pool.stats()['queued'] == 1
+
+def test_pool_close_gives_up_after_timeout(smtp_server, monkeypatch):
+    """Test close returns within its timeout while a stuck delivery keeps the queue full"""
+    release = threading.Event()
+    pool = make_pool(smtp_server, workers=1, queue_size=1)
+    real_connect = pool._connect
+    monkeypatch.setattr(pool, '_connect', lambda: release.wait(5) and real_connect())
+    pool.submit(message(0))
+    while pool.stats()['queued']:  # the worker holds message 0
+        time.sleep(0.001)
+    assert pool.submit(message(1))
+
+    started = time.monotonic()
+    pool.close(timeout=0.2)
+    assert time.monotonic() - started < 1
+    release.set()
+
+def test_async_sender_delivers_on_the_loop(smtp_server):
+    """Test the async sender delivers from event loop tasks and retries 4xx replies"""
+    pytest.importorskip("aiosmtplib")
+    smtp_server.transient_failures = 1
+    host, port = smtp_server.server_address
+
+    async def run():
+        sender = AsyncEmailSender(host, port, use_tls=False, retry_backoff=0.01,
+                                 from_address="bms@example.com")
+        for i in range(5):
+            assert sender.send(f"user{i}@example.com", f"Subject {i}", "Hello")
+        assert await sender.close(timeout=10)
+        return sender.stats()
+
+    stats = asyncio.run(run())
+    assert (stats['sent'], stats['retried'], stats['queued']) == (5, 1, 0)
+    assert smtp_server.messages == 5
+
+def test_async_sender_test_mode_only_logs():
+    """Test test mode never schedules a delivery"""
+    async def run():
+        sender = AsyncEmailSender("localhost", 1, test_mode=True)
+        assert sender.send("user@example.com", "Subject", "Hello")
+        assert await sender.close(timeout=1)
+        return sender.stats()
+
+    assert asyncio.run(run())['sent'] == 0
@@ -0,0 +1,88 @@
+import json
+import pytest
+from bs4 import BeautifulSoup
+from app.config import Config
+from app.extraction import DEFAULT_SITE, RuleSet, clear_rule_cache, parser_name, rules_for
+
+PAGE = """
+<html><head><meta name="description" content="A  test   bank"></head><body>
+<nav><a href="/rates">Rates</a></nav>
+<header><h1>Example Bank</h1><a href="tel:+15550100">+1 555 0100</a></header>
+<table class="rates">
+  <tr data-product="savings"><td class="rate">4.25% APY</td></tr>
+  <tr data-product="cd"><td class="rate">n/a</td></tr>
+</table>
+<div id="promo"><span class="apy">Earn 1,234.5 points</span></div>
+<footer>Footer text</footer>
+</body></html>
+"""
+
+
+@pytest.fixture
+def rules_file(tmp_path, monkeypatch):
+    """Write a site rules file and point the config at it"""
+    path = tmp_path / 'rules.json'
+    path.write_text(json.dumps({
+        'bank.example': {
+            'interest_rates': {
+                'fields': {
+                    'savings': {'selector': 'table.rates [data-product="savings"] .rate',
+                                'regex': r'(\d+(?:\.\d+)?)', 'type': 'float'},
+                    'points': {'selector': '#promo .apy', 'regex': r'([\d,.]+)', 'type': 'float'},
+                },
+            },
+        },
+    }))
+    monkeypatch.setattr(Config, 'SCRAPER_RULES_FILE', str(path))
+    clear_rule_cache()
+    yield path
+    clear_rule_cache()
+
+def test_default_rules_parse_only_their_scope():
+    """Test the default rules extract typed values from a partial parse"""
+    rates = rules_for('https://unknown.example/rates', 'interest_rates')
+    assert rates.site == DEFAULT_SITE and rates.scope == ['table']
+    assert rates.extract(PAGE) == {'savings': 4.25, 'checking': 0.0, 'cd': 0.0}
+    soup = rates.parse(PAGE)
+    assert soup.find('footer') is None and soup.find('table') is not None
+
+    info = rules_for(None, 'bank_info').extract(PAGE)
+    assert info == {'name': "Example Bank", 'description': "A test bank",
+                    'contact': "+1 555 0100", 'address': ''}
+
+def test_site_rules_are_compiled_once(rules_file):
+    """Test site rules are matched by host, cached, and fall back to the defaults"""
+    rules = rules_for('https://www.bank.example/a', 'interest_rates')
+    assert rules is rules_for('https://bank.example/b', 'interest_rates')
+    assert rules.site == 'bank.example'
+    # "#promo" has no leading tag, so the whole document is parsed
+    assert rules.scope is None
+    assert rules.extract(PAGE) == {'savings': 4.25, 'points': 1234.5}
+    assert rules_for('https://bank.example/', 'bank_info').site == DEFAULT_SITE
+
+def test_sibling_selectors_parse_the_whole_tree():
+    """Test selectors reaching outside their leading tag's subtree are not scoped to it"""
+    page = "<html><body><h2>Savings</h2><table><tr><td>4.5%</td></tr></table></body></html>"
+    for selector in ('h2 + table td', 'h2 ~ table td', 'td:first-child'):
+        rules = RuleSet('site', 'rates', {'fields': {'rate': {'selector': selector}}})
+        assert rules.scope is None, selector
+        assert rules.extract(page) == {'rate': "4.5%"}
+    # "+" and "~" inside attribute values are not combinators
+    rules = RuleSet('site', 'info', {'fields': {'phone': {'selector': 'a[href^="tel:+1"]'}}})
+    assert rules.scope == ['a']
+
+def test_structural_pseudo_classes_match_a_full_parse():
+    """Test sibling-dependent pseudo-classes give the same value as parsing the whole page"""
+    page = ("<html><body><ul><li>one</li></ul><p>intro</p>"
+            "<ol><li>x</li><li>y</li></ol></body></html>")
+    full = BeautifulSoup(page, parser_name())
+    for selector in ('li:nth-of-type(2)', 'li:nth-last-of-type(1)', 'li:first-of-type', 'li:last-of-type',
+                     'li:only-of-type', 'li:first-child', 'li:last-child', 'li:only-child', 'li:nth-child(2)',
+                     'li:nth-last-child(2)', 'ul:has(li)', 'li:root'):
+        rules = RuleSet('site', 'list', {'fields': {'item': {'selector': selector}}})
+        assert rules.scope is None, selector
+        assert rules.extract(page) == rules.extract_soup(full), selector
+    # Pseudo-classes that only look inside the element keep the partial parse
+    rules = RuleSet('site', 'list', {'fields': {'item': {'selector': 'li:not(:empty):-soup-contains("y")'}}})
+    assert rules.scope == ['li']
+    assert rules.extract(page) == rules.extract_soup(full) == {'item': "y"}
@@ -0,0 +1,118 @@
+import threading
+import time
+import pytest
+from sqlalchemy import event
+from app.aggregates import get_summary
+from app.db import db
+from app.exceptions import AccountNotFoundError, DuplicateAccountError
+from app.group_commit import GroupCommitWriter
+from app.models import Account
+
+GROUP_COMMIT_SETTINGS = {
+    'GROUP_COMMIT_ENABLED': True,
+    'GROUP_COMMIT_MAX_DELAY': 0.05,  # long enough for every thread below to join one batch
+    'MAX_CONCURRENT_WRITES': 0,
+}
+
+
+@pytest.fixture
+def app(make_app):
+    """Create application with group commit on a private in-memory database"""
+    return make_app(**GROUP_COMMIT_SETTINGS)
+
+@pytest.fixture
+def file_app(make_app):
+    """Create application with group commit on a database file, where SQLAlchemy sends BEGIN itself"""
+    return make_app('group.db', **GROUP_COMMIT_SETTINGS)
+
+def run_concurrently(fn, count):
+    """Call fn(i) from `count` threads released together; results by i"""
+    barrier = threading.Barrier(count)
+    results = [None] * count
+
+    def worker(i):
+        barrier.wait()
+        results[i] = fn(i)
+
+    threads = [threading.Thread(target=worker, args=(i,)) for i in range(count)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return results
+
+def test_concurrent_creates_share_commits(app, client):
+    """Test concurrent POSTs are committed in a few transactions and a duplicate fails alone"""
+    def create(i):
+        number = "GC0" if i == 7 else f"GC{i}"  # 7 collides with 0
+        return client.post('/api/accounts', json={'name': f"User {i}", 'number': number, 'balance': 10.0})
+
+    responses = run_concurrently(create, 16)
+    statuses = sorted(response.status_code for response in responses)
+    assert statuses == [201] * 15 + [409]
+    created = [response.get_json() for response in responses if response.status_code == 201]
+    assert len({account['id'] for account in created}) == 15
+
+    stats = app.extensions['group_commit'].stats()
+    assert stats['writes'] == 16 and stats['failed'] == 1
+    assert stats['batches'] < 16
+    assert db.session.query(Account).count() == 15
+    assert get_summary()['accounts'] == 15 and get_summary()['total_balance'] == 150.0
+
+    body = client.get('/api/metrics').get_data(as_text=True)
+    assert 'bms_group_commit_writes_total 16' in body
+
+def test_updates_through_writer(app, client):
+    """Test PUTs go through the writer, keep the aggregates right and refresh the cache"""
+    writer = app.extensions['group_commit']
+    account = writer.create_account("Alice", "GC100", 50.0)
+    assert client.get(f"/api/accounts/{account['id']}").get_json()['balance'] == 50.0  # now cached
+
+    responses = run_concurrently(
+        lambda i: client.put(f"/api/accounts/{account['id'] if i == 0 else 999}", json={'balance': 80.0}), 2)
+    assert [response.status_code for response in responses] == [200, 404]
+    assert responses[0].get_json()['balance'] == 80.0
+    assert client.get(f"/api/accounts/{account['id']}").get_json()['balance'] == 80.0
+    assert get_summary()['total_balance'] == 80.0
+
+    with pytest.raises(AccountNotFoundError):
+        writer.update_account(999, name="Nobody")
+    with pytest.raises(DuplicateAccountError):
+        writer.create_account("Copy", "GC100")
+    assert writer.update_account(account['id'], name="Alicia")['name'] == "Alicia"
+
+def test_batch_is_one_transaction(file_app):
+    """Test each batch of writes reaches SQLite as one BEGIN IMMEDIATE ... COMMIT"""
+    statements = []
+    db.engine.dispose()  # connections opened from here on are traced
+
+    @event.listens_for(db.engine, 'connect')
+    def trace(dbapi_connection, connection_record):
+        dbapi_connection.set_trace_callback(statements.append)
+
+    writer = file_app.extensions['group_commit']
+    run_concurrently(lambda i: writer.create_account(f"User {i}", f"GCF{i}", 1.0), 8)
+    writer.update_account(1, balance=5.0)
+
+    batches = writer.stats()['batches']
+    assert batches < 9
+    assert [s for s in statements if s.startswith(('BEGIN', 'COMMIT'))] == ['BEGIN IMMEDIATE', 'COMMIT'] * batches
+    assert get_summary()['total_balance'] == 12.0
+
+def test_close_gives_up_after_timeout(app, monkeypatch):
+    """Test close returns within its timeout while a stuck batch keeps the queue full"""
+    holding, release = threading.Event(), threading.Event()
+    writer = GroupCommitWriter(app, max_batch=1, queue_size=1)
+    monkeypatch.setattr(writer, '_process', lambda batch: holding.set() or release.wait(5))
+    submit = [threading.Thread(target=writer.create_account, args=(f"User {i}", f"GCT{i}"), daemon=True)
+              for i in range(2)]
+    submit[0].start()
+    assert holding.wait(5)  # the writer is stuck on the first write
+    submit[1].start()
+    while not writer.stats()['queued']:
+        time.sleep(0.001)
+
+    started = time.monotonic()
+    writer.close(timeout=0.2)
+    assert time.monotonic() - started < 1
+    release.set()
@@ -0,0 +1,86 @@
+import json
+import logging
+import threading
+import time
+import pytest
+import structlog
+from app.logger import EventSampler, LogPipeline, flush_logs, log_stats, logger, parse_event_settings
+
+
+def test_parse_event_settings():
+    """Test the 'event=value,...' settings format"""
+    assert parse_event_settings("batch_processed=0.1, email_sent=0.5,") == {
+        'batch_processed': 0.1, 'email_sent': 0.5}
+    assert parse_event_settings("batch_processed=100", int) == {'batch_processed': 100}
+    assert parse_event_settings("") == {}
+
+def test_sampler_rates_and_limits():
+    """Test per-event probabilities and per-second caps, leaving other events alone"""
+    sampler = EventSampler(rates={'noisy': 0.0}, limits={'batch_processed': 3})
+    kept = 0
+    for _ in range(10):
+        try:
+            sampler(None, 'info', {'event': 'batch_processed'})
+            kept += 1
+        except structlog.DropEvent:
+            pass
+    with pytest.raises(structlog.DropEvent):
+        sampler(None, 'info', {'event': 'noisy'})
+    assert sampler(None, 'info', {'event': 'account_created'}) == {'event': 'account_created'}
+    # All ten calls land in the same one-second window unless the clock ticks over
+    assert kept in (3, 4, 5, 6)
+    assert sampler.stats()['sampled_out'] == 11 - kept
+
+def test_pipeline_drops_when_full():
+    """Test a full queue drops and counts events instead of blocking the caller"""
+    release = threading.Event()
+    written = []
+
+    def slow_render(event_dict):
+        release.wait(5)
+        written.append(event_dict['event'])
+        return event_dict['event']
+
+    pipeline = LogPipeline(slow_render, logger_name='bms.test', queue_size=2)
+    for i in range(10):
+        pipeline.put({'event': f"e{i}", 'level': 'info'})
+    release.set()
+    assert pipeline.flush(timeout=5)
+    pipeline.close(timeout=5)
+
+    stats = pipeline.stats()
+    # The writer may already hold the first event, leaving room for two more
+    assert stats['written'] == len(written) and stats['written'] in (2, 3)
+    assert stats['dropped'] == 10 - stats['written']
+
+def test_close_gives_up_after_timeout():
+    """Test close returns within its timeout when a stuck writer keeps the queue full"""
+    release = threading.Event()
+    pipeline = LogPipeline(lambda event_dict: release.wait(5) and event_dict['event'],
+                           logger_name='bms.test', queue_size=1)
+    for i in range(3):
+        pipeline.put({'event': f"e{i}", 'level': 'info'})
+    started = time.monotonic()
+    pipeline.close(timeout=0.2)
+    assert time.monotonic() - started < 1
+    release.set()
+
+def test_events_render_on_the_writer_thread(caplog):
+    """Test events reach the stdlib logger as JSON with the caller's traceback"""
+    caplog.set_level(logging.INFO, logger='bms')
+    before = log_stats()['written']
+    logger.info("pipeline_checked", answer=42)
+    try:
+        raise ValueError("boom")
+    except ValueError:
+        logger.exception("pipeline_failed")
+    assert flush_logs(timeout=5)
+
+    records = [record for record in caplog.records if record.name == 'bms']
+    assert {record.threadName for record in records} == {"log-writer"}
+    events = {event['event']: event for event in map(json.loads, (r.getMessage() for r in records))}
+    assert events['pipeline_checked']['answer'] == 42
+    assert events['pipeline_checked']['timestamp'].endswith('Z')
+    assert events['pipeline_failed']['level'] == 'error'
+    assert 'ValueError: boom' in events['pipeline_failed']['exception']
+    assert log_stats()['written'] >= before + 2
@@ -0,0 +1,42 @@
+from app.db import db
+from app.metrics import MetricsRegistry
+
+
+def test_histogram_buckets_are_cumulative():
+    """Test observations land in the right buckets and render cumulatively"""
+    registry = MetricsRegistry(buckets=(0.1, 1.0))
+    registry.observe_request('/api/x', 'GET', 200, 0.05, 2, 0.01)
+    registry.observe_request('/api/x', 'GET', 200, 0.5, 1, 0.02)
+    text = registry.render()
+    labels = 'route="/api/x",method="GET",status="200"'
+    assert f'bms_http_request_duration_seconds_bucket{{{labels},le="0.1"}} 1' in text
+    assert f'bms_http_request_duration_seconds_bucket{{{labels},le="1.0"}} 2' in text
+    assert f'bms_http_request_duration_seconds_bucket{{{labels},le="+Inf"}} 2' in text
+    assert f'bms_http_request_duration_seconds_count{{{labels}}} 2' in text
+    assert 'bms_db_queries_per_route_total{route="/api/x"} 3' in text
+
+def test_metrics_endpoint(client):
+    """Test requests and their queries show up at /api/metrics"""
+    client.post('/api/accounts', json={'name': "User", 'number': "ACC1"})
+    client.get('/api/accounts/1')
+    client.get('/api/accounts/999')
+
+    response = client.get('/api/metrics')
+    assert response.status_code == 200
+    assert response.content_type.startswith('text/plain; version=0.0.4')
+    text = response.get_data(as_text=True)
+    assert 'route="/api/accounts",method="POST",status="201"' in text
+    assert 'route="/api/accounts/<int:account_id>",method="GET",status="404"' in text
+    queries = [line for line in text.splitlines()
+               if line.startswith('bms_db_queries_per_route_total{route="/api/accounts"}')]
+    assert queries and int(queries[0].split()[-1]) >= 1
+    assert 'bms_account_cache_misses_total' in text
+
+def test_failed_queries_are_counted_and_released(client):
+    """Test statements that raise are timed once and leave no start time behind on the connection"""
+    account = {'name': "Dup", 'number': "MET1"}
+    assert client.post('/api/accounts', json=account).status_code == 201
+    for _ in range(3):
+        assert client.post('/api/accounts', json=account).status_code == 409
+    with db.engine.connect() as conn:
+        assert conn.info.get('query_start', []) == []
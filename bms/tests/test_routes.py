@@ -0,0 +1,152 @@
+import math
+import json
+import pytest
+from sqlalchemy import event
+from app.db import db
+from app.models import Account
+
+
+@pytest.fixture
+def app(make_app):
+    """Create application for testing"""
+    return make_app(PAGE_SIZE=2)
+
+@pytest.fixture
+def sample_accounts(app):
+    """Create sample accounts directly, bypassing notifications"""
+    with app.app_context():
+        for i in range(5):
+            db.session.add(Account(name=f"User {i}", number=f"ACC{i}", balance=1000.0 * (i + 1)))
+        db.session.commit()
+
+def test_list_accounts_unpaginated(client, sample_accounts):
+    """Test listing without cursor parameters returns a plain array"""
+    response = client.get('/api/accounts')
+    assert response.status_code == 200
+    assert len(response.get_json()) == 5
+
+def test_list_accounts_keyset_pagination(client, sample_accounts):
+    """Test walking all pages with the returned cursor"""
+    numbers = []
+    after = 0
+    while after is not None:
+        response = client.get(f'/api/accounts?after={after}')
+        assert response.status_code == 200
+        body = response.get_json()
+        assert len(body['accounts']) <= 2
+        numbers.extend(account['number'] for account in body['accounts'])
+        after = body['next_after']
+    assert numbers == [f"ACC{i}" for i in range(5)]
+
+def test_list_accounts_invalid_cursor(client, sample_accounts):
+    """Test bad pagination parameters are rejected"""
+    assert client.get('/api/accounts?after=abc').status_code == 400
+    assert client.get('/api/accounts?limit=0').status_code == 400
+
+def test_list_accounts_ndjson_stream(app, client, sample_accounts):
+    """Test NDJSON streaming matches the JSON listing"""
+    app.config['STREAM_CHUNK_SIZE'] = 2
+    response = client.get('/api/accounts', headers={'Accept': 'application/x-ndjson'})
+    assert response.status_code == 200
+    assert response.mimetype == 'application/x-ndjson'
+    rows = [json.loads(line) for line in response.get_data(as_text=True).splitlines()]
+    assert rows == client.get('/api/accounts').get_json()
+
+    response = client.get('/api/accounts?format=ndjson&after=3')
+    rows = [json.loads(line) for line in response.get_data(as_text=True).splitlines()]
+    assert [row['id'] for row in rows] == [4, 5]
+
+def test_create_multiple_accounts(client, sample_accounts):
+    """Test the bulk endpoint validates everything and reports errors by index"""
+    payload = [
+        {'name': "New 1", 'number': "NEW1", 'balance': 10.0},
+        {'name': "Missing number"},
+        {'name': "Dup", 'number': "ACC0"},
+        {'name': "New 2", 'number': "NEW2", 'balance': "abc"},
+        {'name': "New 3", 'number': "NEW3"},
+    ]
+    response = client.post('/api/accounts/batch', json=payload)
+    assert response.status_code == 201
+    body = response.get_json()
+    assert [account['number'] for account in body['success']] == ["NEW1", "NEW3"]
+    assert [error['index'] for error in body['errors']] == [1, 2, 3]
+    assert len(client.get('/api/accounts').get_json()) == 7
+
+def test_get_account_cache_invalidation(app, client, sample_accounts):
+    """Test cached reads are refreshed after updates and deletes"""
+    cache = app.extensions['account_cache']
+    assert client.get('/api/accounts/1').get_json()['balance'] == 1000.0
+    assert client.get('/api/accounts/number/ACC0').get_json()['id'] == 1
+    assert cache.stats()['hits'] == 1
+
+    client.put('/api/accounts/1', json={'balance': 1500.0})
+    assert client.get('/api/accounts/number/ACC0').get_json()['balance'] == 1500.0
+
+    client.delete('/api/accounts/1')
+    assert client.get('/api/accounts/1').status_code == 404
+    assert client.get('/api/accounts/number/ACC0').status_code == 404
+
+def test_fast_reads_identical_response(app, client, sample_accounts):
+    """Test the Core read path returns byte-identical listings"""
+    with app.app_context():
+        db.session.add(Account(name="Ünïcode \"quoted\"", number="ACC9", balance=0.1 + 0.2))
+        db.session.commit()
+    urls = ['/api/accounts', '/api/accounts?after=2', '/api/accounts?after=4&limit=5',
+            '/api/accounts?format=ndjson']
+    app.config['FAST_READS'] = False
+    expected = [client.get(url).get_data() for url in urls]
+    app.config['FAST_READS'] = True
+    actual = [client.get(url).get_data() for url in urls]
+    assert actual[:3] == expected[:3]
+    ndjson = [json.loads(line) for line in actual[3].decode().splitlines()]
+    assert ndjson == [json.loads(line) for line in expected[3].decode().splitlines()]
+
+def test_bulk_update_accounts(app, client, sample_accounts):
+    """Test bulk PATCH applies grouped changes, merges repeats and reports bad entries by index"""
+    client.get('/api/accounts/2')  # warm the cache so invalidation is exercised
+    queries = []
+    listener = lambda *args: queries.append(args[2])  # noqa: E731
+    event.listen(db.engine, 'before_cursor_execute', listener)
+    try:
+        response = client.patch('/api/accounts/bulk', json=[
+            {'id': 1, 'fields': {'interest_rate': 1.5}},
+            {'id': 2, 'fields': {'interest_rate': 2.5}},
+            {'id': 3, 'fields': {'balance': '10.5', 'name': "Renamed"}},
+            {'id': 99, 'fields': {'balance': 1}},
+            {'id': 2, 'fields': {'balance': 7}},
+            {'id': 4, 'fields': {'number': 'X'}},
+            {'fields': {'balance': 1}},
+        ])
+    finally:
+        event.remove(db.engine, 'before_cursor_execute', listener)
+
+    assert response.status_code == 200
+    assert json.loads(response.data) == {
+        'updated': 3,
+        'not_found': [{'index': 3, 'id': 99}],
+        'errors': [{'index': 5, 'error': "Fields cannot be bulk updated: number"},
+                   {'index': 6, 'error': "'id'"}],
+    }
+    # One id lookup plus one UPDATE per distinct field set
+    assert sum(query.startswith('UPDATE') for query in queries) == 3
+
+    accounts = {a['id']: a for a in json.loads(client.get('/api/accounts').data)}
+    assert accounts[1]['interest_rate'] == 1.5
+    assert (accounts[2]['interest_rate'], accounts[2]['balance']) == (2.5, 7.0)
+    assert (accounts[3]['name'], accounts[3]['balance']) == ("Renamed", 10.5)
+    assert json.loads(client.get('/api/accounts/2').data)['balance'] == 7.0
+
+    response = client.patch('/api/accounts/bulk', json=[{'id': 42, 'fields': {'balance': 1}}])
+    assert response.status_code == 400
+    assert json.loads(response.data)['not_found'] == [{'index': 0, 'id': 42}]
+
+    # NaN and infinities would make the balance totals NaN for good
+    response = client.patch('/api/accounts/bulk', json=[{'id': 1, 'fields': {'balance': 'nan'}},
+                                                        {'id': 1, 'fields': {'interest_rate': 'inf'}}])
+    assert response.status_code == 400
+    assert json.loads(response.data)['errors'] == [
+        {'index': 0, 'error': "balance must be a finite number"},
+        {'index': 1, 'error': "interest_rate must be a finite number"}]
+    assert client.put('/api/accounts/1', json={'balance': 'nan'}).status_code == 400
+    assert client.post('/api/accounts', json={'name': "X", 'number': "NAN1", 'balance': '-inf'}).status_code == 400
+    assert math.isfinite(client.get('/api/accounts/summary').get_json()['total_balance'])
@@ -0,0 +1,131 @@
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+import pytest
+from app.config import Config
+from app.exceptions import ScrapingError
+from app.fetcher import fetch_urls
+from app.page_cache import get_page_cache
+from app.scraper import scrape_bank_info_many, scrape_many, scrape_page
+
+
+class BankPageHandler(BaseHTTPRequestHandler):
+    """Serves tiny bank pages; /flaky fails until `server.flaky_failures` runs out"""
+
+    def log_message(self, format, *args):
+        pass
+
+    def do_GET(self):
+        server = self.server
+        with server.lock:
+            server.in_flight += 1
+            server.max_in_flight = max(server.max_in_flight, server.in_flight)
+            server.requests += 1
+        try:
+            time.sleep(server.delay)
+            if self.path.startswith('/missing'):
+                self.send_error(404)
+                return
+            if self.path.startswith('/flaky'):
+                with server.lock:
+                    fail = server.flaky_failures > 0
+                    server.flaky_failures -= 1
+                if fail:
+                    self.send_error(503)
+                    return
+            if self.path.startswith('/etag') and self.headers.get('If-None-Match') == '"v1"':
+                self.send_response(304)
+                self.end_headers()
+                return
+            body = f"<html><h1>Bank {self.path}</h1></html>".encode()
+            self.send_response(200)
+            if self.path.startswith('/etag'):
+                self.send_header('ETag', '"v1"')
+            self.send_header('Content-Type', 'text/html; charset=utf-8')
+            self.send_header('Content-Length', str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+        finally:
+            with server.lock:
+                server.in_flight -= 1
+
+
+@pytest.fixture(autouse=True)
+def page_cache_dir(tmp_path, monkeypatch):
+    """Keep the page cache out of the instance directory"""
+    monkeypatch.setattr(Config, 'SCRAPER_CACHE_DIR', str(tmp_path / 'scrape_cache'))
+
+@pytest.fixture
+def http_server():
+    """Run a local HTTP server on a free port"""
+    server = ThreadingHTTPServer(('127.0.0.1', 0), BankPageHandler)
+    server.daemon_threads = True
+    server.lock = threading.Lock()
+    server.in_flight = server.max_in_flight = server.requests = 0
+    server.delay = 0.0
+    server.flaky_failures = 0
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    server.base_url = f"http://127.0.0.1:{server.server_address[1]}"
+    yield server
+    server.shutdown()
+    server.server_close()
+
+def test_fetch_respects_per_host_limit(http_server):
+    """Test many URLs are fetched concurrently but never beyond the per-host cap"""
+    http_server.delay = 0.05
+    urls = [f"{http_server.base_url}/bank/{i}" for i in range(20)]
+    results = fetch_urls(urls, concurrency=10, per_host=3, queue_size=5)
+    assert [result.url for result in results] == urls
+    assert all(result.ok and result.status == 200 for result in results)
+    assert 1 < http_server.max_in_flight <= 3
+
+def test_fetch_retries_transient_errors(http_server):
+    """Test 503s are retried with backoff and 404s are reported without retrying"""
+    http_server.flaky_failures = 2
+    flaky, missing = fetch_urls([f"{http_server.base_url}/flaky", f"{http_server.base_url}/missing"],
+                                retries=3, backoff=0.01)
+    assert flaky.ok and flaky.status == 200
+    assert not missing.ok and missing.status == 404
+    assert http_server.requests == 4
+
+def test_scrape_many_parses_results(http_server):
+    """Test the batch API returns parsed results and errors keyed by URL"""
+    good = f"{http_server.base_url}/bank/1"
+    bad = f"{http_server.base_url}/missing"
+    results = scrape_many([good, bad], lambda soup: {'name': soup.h1.get_text()}, retries=0)
+    assert results[good] == {'name': "Bank /bank/1"}
+    assert isinstance(results[bad], ScrapingError)
+
+def test_page_cache_revalidation(http_server):
+    """Test 304s and unchanged bodies reuse the cached extraction without parsing"""
+    parses = []
+    def extract(soup):
+        parses.append(1)
+        return {'name': soup.h1.get_text()}
+    extract.cache_key = 'bank_name'
+
+    etag_url = f"{http_server.base_url}/etag/1"
+    plain_url = f"{http_server.base_url}/bank/1"
+    for _ in range(3):
+        assert scrape_page(etag_url, extract) == {'name': "Bank /etag/1"}
+    assert scrape_many([plain_url], extract)[plain_url] == {'name': "Bank /bank/1"}
+    assert scrape_many([plain_url, etag_url], extract)[plain_url] == {'name': "Bank /bank/1"}
+
+    assert len(parses) == 2
+    stats = get_page_cache().stats()
+    assert (stats['miss'], stats['not_modified'], stats['unchanged']) == (2, 3, 1)
+    assert stats['hit_ratio'] == round(4 / 6, 4)
+
+def test_page_cache_never_mixes_up_lambdas(http_server):
+    """Test extractors without a stable name are re-run instead of reusing another one's result"""
+    url = f"{http_server.base_url}/etag/2"
+    assert scrape_page(url, lambda soup: {'name': soup.h1.get_text()}) == {'name': "Bank /etag/2"}
+    assert scrape_page(url, lambda soup: {'length': len(soup.h1.get_text())}) == {'length': 12}
+    assert get_page_cache().stats()['not_modified'] == 1
+
+def test_scrape_many_with_rule_kind(http_server):
+    """Test a rule kind name resolves compiled rules per page"""
+    url = f"{http_server.base_url}/bank/7"
+    info = scrape_bank_info_many([url])[url]
+    assert info == {'name': "Bank /bank/7", 'description': '', 'contact': '', 'address': ''}
@@ -0,0 +1,140 @@
+import re
+from datetime import datetime, timedelta
+import pytest
+from sqlalchemy import event, text
+from app.db import db
+from app.models import Account
+from app.search import install_search, search_statement
+from app.validation import parse_search
+
+NAMES = ["Alice Smith", "alice Jones", "Bob Smith", "Carol King", "Alan Turing", "Smithers 100%"]
+
+
+@pytest.fixture
+def app(make_app):
+    """Create application with a handful of accounts on a private in-memory database"""
+    app = make_app()
+    start = datetime(2024, 1, 1)
+    for i, name in enumerate(NAMES):
+        db.session.add(Account(name=name, number=f"SRCH{i}", balance=100.0 * i,
+                               created_at=start + timedelta(days=i), updated_at=start + timedelta(days=i)))
+    db.session.commit()
+    return app
+
+def search(client, **params):
+    response = client.get('/api/accounts/search', query_string=params)
+    assert response.status_code == 200, response.get_json()
+    return response.get_json()
+
+def names(body):
+    return [account['name'] for account in body['accounts']]
+
+def test_search_filters(client):
+    """Test name prefix, full-text, balance and date filters, alone and combined"""
+    assert names(search(client, name="ali")) == ["Alice Smith", "alice Jones"]
+    assert names(search(client, name="Smithers 100%")) == ["Smithers 100%"]
+    assert names(search(client, name="%")) == []  # LIKE wildcards are literal
+    assert names(search(client, q="smith")) == ["Alice Smith", "Bob Smith"]
+    assert names(search(client, q="alice smith")) == ["Alice Smith"]
+    assert names(search(client, q='"OR')) == []  # FTS syntax in user text is literal
+    assert names(search(client, min_balance=200, max_balance=400)) == ["Bob Smith", "Carol King", "Alan Turing"]
+    assert names(search(client, created_after="2024-01-03", created_before="2024-01-05")) == [
+        "Bob Smith", "Carol King"]
+    assert names(search(client, updated_after="2024-01-05T00:00:00+00:00")) == ["Alan Turing", "Smithers 100%"]
+    assert names(search(client, name="a", min_balance=100)) == ["alice Jones", "Alan Turing"]
+
+    for params in ({'sort': 'nope'}, {'order': 'up'}, {'min_balance': 'x'}, {'created_after': 'yesterday'},
+                   {'cursor': 'garbage'}, {'limit': 0}):
+        response = client.get('/api/accounts/search', query_string=params)
+        assert response.status_code == 400, params
+
+@pytest.mark.parametrize('sort', ['id', 'name', 'balance', 'created_at', 'updated_at'])
+@pytest.mark.parametrize('order', ['asc', 'desc'])
+def test_search_keyset_pagination(client, sort, order):
+    """Test every sort walks all matches once, in order, through the cursors"""
+    expected = names(search(client, sort=sort, order=order, limit=100))
+    assert len(expected) == len(NAMES)
+    if sort == 'name':
+        assert expected == sorted(NAMES, key=str.lower, reverse=order == 'desc')
+
+    seen, cursor = [], None
+    while True:
+        body = search(client, sort=sort, order=order, limit=4, **({'cursor': cursor} if cursor else {}))
+        seen += names(body)
+        cursor = body['next_cursor']
+        if cursor is None:
+            break
+    assert seen == expected
+
+def test_fts_index_follows_writes(app, client):
+    """Test the triggers keep the full-text index in step with renames and deletes"""
+    with app.app_context():
+        account = db.session.get(Account, 4)
+        account.name = "Carol Queen"
+        db.session.commit()
+        assert names(search(client, q="king")) == []
+        assert names(search(client, q="queen")) == ["Carol Queen"]
+        db.session.delete(account)
+        db.session.commit()
+        assert names(search(client, q="carol")) == []
+
+        # Rows written while the triggers were missing are indexed when they are reinstalled
+        for name in ('accounts_fts_insert', 'accounts_fts_delete', 'accounts_fts_update'):
+            db.session.execute(text(f"DROP TRIGGER {name}"))
+        db.session.add(Account(name="Dana Late", number="SRCH9"))
+        db.session.commit()
+        assert install_search(db.session.connection()) is True
+        db.session.commit()
+        assert names(search(client, q="dana")) == ["Dana Late"]
+
+def query_plan(stmt) -> list:
+    """EXPLAIN QUERY PLAN details for a statement, with its real bound parameters"""
+    captured = []
+
+    def capture(conn, cursor, statement, parameters, context, executemany):
+        captured.append((statement, parameters))
+
+    event.listen(db.engine, 'before_cursor_execute', capture)
+    try:
+        db.session.execute(stmt).all()
+    finally:
+        event.remove(db.engine, 'before_cursor_execute', capture)
+    statement, parameters = captured[-1]
+    return [row[3] for row in db.session.connection().exec_driver_sql(
+        "EXPLAIN QUERY PLAN " + statement, parameters)]
+
+@pytest.mark.parametrize('params', [
+    {'name': "ali"},
+    {'q': "smith"},
+    {'min_balance': "100"},
+    {'max_balance': "100"},
+    {'created_after': "2024-01-02", 'created_before': "2024-01-04"},
+    {'updated_after': "2024-01-02"},
+    {'name': "a", 'sort': 'balance', 'order': 'desc'},
+    {'min_balance': "10", 'sort': 'balance'},
+    {'created_after': "2024-01-02", 'sort': 'created_at'},
+    {'updated_before': "2024-01-04", 'sort': 'updated_at', 'order': 'desc'},
+])
+def test_filtered_search_uses_indexes(app, params):
+    """Test every filter is answered by an index search, never a scan of accounts"""
+    with app.app_context():
+        criteria, limit = parse_search(params, 10, 100)
+        plan = query_plan(search_statement(criteria, limit))
+        assert any(line.startswith('SEARCH accounts USING') for line in plan), plan
+        assert not any(re.match(r'SCAN accounts( |$)', line) for line in plan), plan
+
+@pytest.mark.parametrize('sort', ['name', 'balance', 'created_at', 'updated_at'])
+@pytest.mark.parametrize('order', ['asc', 'desc'])
+def test_sorted_search_uses_indexes(app, sort, order):
+    """Test unfiltered sorts read an index in order, and later pages seek into it"""
+    with app.app_context():
+        criteria, limit = parse_search({'sort': sort, 'order': order}, 2, 100)
+        plan = query_plan(search_statement(criteria, limit))
+        assert any(line.startswith('SCAN accounts USING') and 'INDEX' in line for line in plan), plan
+        assert not any('TEMP B-TREE' in line for line in plan), plan
+
+        rows = db.session.execute(search_statement(criteria, limit)).all()
+        criteria['cursor'] = (getattr(rows[-1], sort), rows[-1].id)
+        plan = query_plan(search_statement(criteria, limit))
+        assert any(line.startswith('SEARCH accounts USING INDEX') for line in plan), plan
+        assert not any('TEMP B-TREE' in line for line in plan), plan
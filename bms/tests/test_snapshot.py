@@ -0,0 +1,75 @@
+import pytest
+import app.snapshot as snapshot_module
+from app.batch_calc import process_batch_async, process_batch_sql, process_batch_threaded
+from app.db import db
+from app.models import Account
+from app.snapshot import AccountSnapshot
+
+
+@pytest.fixture
+def app(make_app):
+    """Create application with five accounts on a private in-memory database"""
+    app = make_app(BATCH_SIZE=2, SNAPSHOT_REFRESH_OVERLAP=0)
+    for i in range(5):
+        db.session.add(Account(name=f"User {i}", number=f"SNAP{i}",
+                               balance=1000.25 * (i + 1), interest_rate=i * 0.5))
+    db.session.commit()
+    return app
+
+@pytest.fixture(params=['numpy', 'python'])
+def backend(request, monkeypatch):
+    """Run a test with numpy and with the plain-Python fallback"""
+    if request.param == 'numpy' and snapshot_module.np is None:
+        pytest.skip("numpy not installed")
+    if request.param == 'python':
+        monkeypatch.setattr(snapshot_module, 'np', None)
+    return request.param
+
+def test_snapshot_operations(app, backend):
+    """Test sums, filters, top-N and lookups on a loaded snapshot"""
+    with app.app_context():
+        snapshot = AccountSnapshot.load()
+        assert list(snapshot.ids) == [1, 2, 3, 4, 5]
+        assert snapshot.total_cents() == 1500375 and snapshot.total() == 15003.75
+        assert snapshot.filter(min_balance=2000.50) == [2, 3, 4, 5]
+        assert snapshot.filter(max_balance=3000.75, min_rate=1.0) == [3]
+        assert snapshot.top(2) == [(5, 5001.25), (4, 4001.0)]
+        assert snapshot.top(3, by='interest_rate') == [(5, 2.0), (4, 1.5), (3, 1.0)]
+        assert snapshot.top(10)[-1] == (1, 1000.25)
+        assert snapshot.get('SNAP2')['balance'] == 3000.75
+        assert snapshot.get('missing') is None
+        assert snapshot.batch_totals(2) == [(0, 3000.75), (1, 7001.75), (2, 5001.25)]
+        assert snapshot[1:3].total() == 5001.25 and snapshot[1:3].get('SNAP2') is not None
+
+def test_snapshot_refresh(app, backend):
+    """Test refresh applies updates, inserts and deletions without a full reload"""
+    with app.app_context():
+        snapshot = AccountSnapshot.load()
+        account = db.session.get(Account, 2)
+        account.balance = 1.5
+        account.number = "SNAP1B"
+        db.session.delete(db.session.get(Account, 4))
+        db.session.add(Account(name="New", number="SNAP9", balance=9.0))
+        db.session.commit()
+
+        summary = snapshot.refresh()
+        assert (summary['added'], summary['removed']) == (1, 1)
+        assert list(snapshot.ids) == [1, 2, 3, 5, 6]
+        assert snapshot.get('SNAP1') is None and snapshot.get('SNAP1B')['balance'] == 1.5
+        assert snapshot.get('SNAP9')['id'] == 6 and snapshot.get('SNAP3') is None
+        assert snapshot.get('SNAP4')['id'] == 5  # positions re-indexed after the delete
+
+        fresh = AccountSnapshot.load()
+        for name in ('ids', 'balance_cents', 'rates_bp', 'numbers'):
+            assert list(getattr(snapshot, name)) == list(getattr(fresh, name))
+        assert snapshot.refresh()['added'] == 0
+
+@pytest.mark.asyncio
+async def test_batch_processors_accept_snapshot(app):
+    """Test the batch processors take a snapshot directly and agree with SQL aggregation"""
+    with app.app_context():
+        snapshot = AccountSnapshot.load()
+        expected = process_batch_sql()
+        assert process_batch_threaded(snapshot) == expected
+        assert await process_batch_async(snapshot) == expected
+        assert snapshot.batch_totals(2) == expected
@@ -0,0 +1,88 @@
+import json
+import os
+import subprocess
+import sys
+import pytest
+from sqlalchemy import text
+from app import create_app
+from app.db import db, ensure_schema
+from app.startup_report import by_package, main, parse_importtime
+
+PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Cold import + create_app must stay under this many seconds (generous for slow CI machines)
+STARTUP_BUDGET = float(os.getenv('BMS_STARTUP_BUDGET', '3.0'))
+
+# Modules that only the scraping, email and async subsystems need
+HEAVY_MODULES = ('selenium', 'requests', 'bs4', 'smtplib', 'email.mime.multipart', 'aiohttp', 'aiosmtplib')
+
+
+def run_python(code):
+    env = dict(os.environ, DATABASE_URL='sqlite:///:memory:', EMAIL_TEST_MODE='true')
+    result = subprocess.run([sys.executable, '-c', code], cwd=PROJECT_ROOT, env=env,
+                            capture_output=True, text=True, check=True)
+    return json.loads(result.stdout.strip().splitlines()[-1])
+
+def test_cold_start_budget():
+    """Test a fresh interpreter imports the app and runs create_app within the budget"""
+    elapsed = run_python(
+        "import json, time\n"
+        "started = time.perf_counter()\n"
+        "from app import create_app\n"
+        "app = create_app()\n"
+        "print(json.dumps(time.perf_counter() - started))\n")
+    assert elapsed < STARTUP_BUDGET, f"cold start took {elapsed:.2f}s (budget {STARTUP_BUDGET}s)"
+
+def test_heavy_subsystems_load_lazily():
+    """Test booting the API and importing the scraper and emailer pulls in none of their dependencies"""
+    loaded = run_python(
+        "import json, sys\n"
+        "from app import create_app\n"
+        "import app.crud, app.emailer, app.scraper\n"
+        "create_app()\n"
+        f"print(json.dumps([name for name in {HEAVY_MODULES!r} if name in sys.modules]))\n")
+    assert loaded == []
+
+def test_schema_ddl_skipped_when_current(make_config, monkeypatch):
+    """Test create_all runs on the first boot of a database and is skipped afterwards"""
+    config = make_config('startup.db')
+
+    calls = []
+    create_all = db.create_all
+    monkeypatch.setattr(db, 'create_all', lambda *args, **kwargs: calls.append(1) or create_all(*args, **kwargs))
+
+    for boot in range(2):
+        app = create_app(config)
+        assert set(app.extensions['startup_timings']) == {
+            'init_db', 'init_search', 'init_aggregates', 'init_cache', 'init_admission', 'init_group_commit', 'total'}
+        with app.app_context():
+            db.engine.dispose()
+    assert len(calls) == 1
+
+    # A stale fingerprint (e.g. after a model change) runs the DDL again
+    with app.app_context():
+        db.session.execute(text("UPDATE schema_version SET fingerprint = 'old'"))
+        db.session.commit()
+        assert ensure_schema() is True
+        assert ensure_schema() is False
+        db.session.remove()
+        db.engine.dispose()
+    assert len(calls) == 2
+
+def test_parse_importtime():
+    """Test -X importtime output is parsed and grouped by top-level package"""
+    stderr = ("import time: self [us] | cumulative | imported package\n"
+              "import time:       120 |        120 |   sqlalchemy.util\n"
+              "import time:       300 |        420 | sqlalchemy\n"
+              "import time:        50 |         50 | app.config\n")
+    timings = parse_importtime(stderr)
+    assert [(timing.module, timing.depth) for timing in timings] == [
+        ('sqlalchemy.util', 1), ('sqlalchemy', 0), ('app.config', 0)]
+    assert by_package(timings) == {'sqlalchemy': 420, 'app': 50}
+
+def test_startup_report(capsys):
+    """Test the report prints the create_app steps and the slowest imports"""
+    main(['--top', '3', '--database', 'sqlite:///:memory:'])
+    output = capsys.readouterr().out
+    assert output.startswith("cold start:")
+    assert "init_db" in output and "slowest imports" in output
@@ -0,0 +1,102 @@
+import random
+import threading
+import pytest
+from sqlalchemy import func
+from app.crud import transfer_funds
+from app.db import db
+from app.exceptions import AccountNotFoundError, InsufficientFundsError
+from app.models import Account, LedgerEntry
+
+
+@pytest.fixture
+def app(make_app):
+    """Create application for testing with three funded accounts"""
+    app = make_app()
+    for i, balance in enumerate((100.0, 50.0, 0.0)):
+        db.session.add(Account(name=f"User {i}", number=f"TRF{i}", balance=balance))
+    db.session.commit()
+    return app
+
+@pytest.fixture
+def file_app(make_app):
+    """Create an application backed by a database file, for real concurrent connections"""
+    return make_app('transfers.db')
+
+def test_transfer_moves_money_and_records_ledger(app):
+    """Test a transfer updates both balances and appends one entry per leg"""
+    transfer = transfer_funds(1, 3, 40.25, memo="rent")
+    assert (transfer['from_balance'], transfer['to_balance']) == (59.75, 40.25)
+
+    entries = LedgerEntry.query.order_by(LedgerEntry.id).all()
+    assert [(e.account_id, float(e.amount), float(e.balance_after)) for e in entries] == [
+        (1, -40.25, 59.75), (3, 40.25, 40.25)]
+    assert {e.transfer_id for e in entries} == {transfer['transfer_id']}
+
+def test_transfer_rejections_leave_no_trace(app):
+    """Test overdrafts and unknown accounts roll back without touching balances or the ledger"""
+    with pytest.raises(InsufficientFundsError):
+        transfer_funds(2, 1, 50.01)
+    # The credit to account 1 runs first (lower id) and must be rolled back too
+    with pytest.raises(AccountNotFoundError):
+        transfer_funds(99, 1, 1)
+    with pytest.raises(AccountNotFoundError):
+        transfer_funds(1, 99, 1)
+    assert [float(a.balance) for a in Account.query.order_by(Account.id)] == [100.0, 50.0, 0.0]
+    assert LedgerEntry.query.count() == 0
+
+def test_transfer_routes(client):
+    """Test the transfer endpoint status codes and the ledger listing"""
+    assert client.post('/api/transfers', json={'from_id': 1, 'to_id': 2, 'amount': 10}).status_code == 201
+    assert client.post('/api/transfers', json={'from_id': 3, 'to_id': 2, 'amount': 10}).status_code == 409
+    assert client.post('/api/transfers', json={'from_id': 1, 'to_id': 42, 'amount': 10}).status_code == 404
+    assert client.post('/api/transfers', json={'from_id': 1, 'to_id': 2, 'amount': -5}).status_code == 400
+    assert client.post('/api/transfers', json={'from_id': 1, 'to_id': 1, 'amount': 5}).status_code == 400
+    assert client.post('/api/transfers', json={'from_id': 1, 'amount': 5}).status_code == 400
+    assert client.post('/api/transfers', json={'from_id': 1, 'to_id': 2, 'amount': 'nan'}).status_code == 400
+    assert client.post('/api/transfers', json={'from_id': 1, 'to_id': 2, 'amount': 'inf'}).status_code == 400
+
+    assert client.get('/api/accounts/2').get_json()['balance'] == 60.0
+    ledger = client.get('/api/accounts/1/ledger').get_json()
+    assert [entry['amount'] for entry in ledger['entries']] == [-10.0]
+    assert ledger['next_after'] is None
+
+def test_concurrent_transfers_conserve_money(file_app):
+    """Test many threads moving money between hot accounts never overdraw or lose updates"""
+    with file_app.app_context():
+        for i in range(4):
+            db.session.add(Account(name=f"Hot {i}", number=f"HOT{i}", balance=100.0))
+        db.session.commit()
+
+    outcomes = {'ok': 0, 'insufficient': 0}
+    lock = threading.Lock()
+
+    def worker(seed):
+        rng = random.Random(seed)
+        with file_app.app_context():
+            for _ in range(25):
+                from_id, to_id = rng.sample(range(1, 5), 2)
+                try:
+                    transfer_funds(from_id, to_id, rng.choice((5, 30, 75)))
+                    result = 'ok'
+                except InsufficientFundsError:
+                    result = 'insufficient'
+                with lock:
+                    outcomes[result] += 1
+            db.session.remove()
+
+    threads = [threading.Thread(target=worker, args=(seed,)) for seed in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    with file_app.app_context():
+        balances = [float(a.balance) for a in Account.query.order_by(Account.id)]
+        assert sum(balances) == 400.0 and min(balances) >= 0
+        assert outcomes['ok'] + outcomes['insufficient'] == 200
+        assert LedgerEntry.query.count() == 2 * outcomes['ok']
+        # Replaying the ledger reproduces every balance
+        for account_id, balance in enumerate(balances, start=1):
+            delta = db.session.scalar(db.select(func.sum(LedgerEntry.amount))
+                                      .where(LedgerEntry.account_id == account_id)) or 0
+            assert round(100.0 + float(delta), 2) == balance